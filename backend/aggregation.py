@@ -0,0 +1,142 @@
+import heapq
+import logging
+from dataclasses import dataclass, field
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from models import BankStatement, ContinuityIssue, TransactionModel
+
+BALANCE_TOLERANCE = 0.01
+
+
+@dataclass
+class MergeReport:
+    continuity_issues: List[ContinuityIssue] = field(default_factory=list)
+    duplicates_removed: int = 0
+
+
+def _account(statement: BankStatement) -> str:
+    return statement.account_number or ""
+
+
+def _balance_before(statement: BankStatement, date: str) -> float:
+    balance = statement.opening_balance or 0.0
+    for txn in statement.transactions:
+        if txn.date >= date:
+            break
+        balance = txn.balance
+    return balance
+
+
+def continuity_issues(statements: List[BankStatement]) -> List[ContinuityIssue]:
+    """Check each statement opens where the previous one for the account closed."""
+    issues = []
+    by_account: Dict[str, List[BankStatement]] = {}
+    for s in statements:
+        by_account.setdefault(_account(s), []).append(s)
+    for account, group in by_account.items():
+        group.sort(key=lambda s: (s.period_start, s.period_end))
+        for prev, nxt in zip(group, group[1:]):
+            if prev.closing_balance is None or nxt.opening_balance is None:
+                continue
+            candidates = [prev.closing_balance]
+            if nxt.period_start <= prev.period_end:
+                # Overlapping periods: the next statement opens part-way
+                # through the previous one.
+                candidates.append(_balance_before(prev, nxt.period_start))
+            if not any(np.isclose(c, nxt.opening_balance, rtol=0, atol=BALANCE_TOLERANCE) for c in candidates):
+                issues.append(ContinuityIssue(
+                    account_number=account,
+                    previous_filename=prev.filename,
+                    next_filename=nxt.filename,
+                    closing_balance=prev.closing_balance,
+                    opening_balance=nxt.opening_balance,
+                    gap=round(nxt.opening_balance - prev.closing_balance, 2),
+                ))
+    return issues
+
+
+def _tagged(statement: BankStatement, source: int) -> Iterator[Tuple[str, int, int, str, TransactionModel]]:
+    # heapq.merge needs each stream date ordered; the position keeps same-day
+    # rows in their original order through the merge.
+    transactions = statement.transactions
+    if any(a.date > b.date for a, b in zip(transactions, transactions[1:])):
+        transactions = sorted(transactions, key=lambda t: t.date)
+    for position, txn in enumerate(transactions):
+        yield txn.date, source, position, _account(statement), txn
+
+
+def merge_transactions(statements: List[BankStatement], report: Optional[MergeReport] = None) -> Iterator[TransactionModel]:
+    """K-way merge of several statements' transactions by date.
+
+    Rows repeated across two statements of the same account (overlapping
+    periods) are emitted once. Only the current day's keys are remembered, so
+    the merge itself holds no more than the busiest day; it is the consumer
+    that decides whether the whole series is kept.
+    With several accounts, each emitted row's balance is the combined
+    balance across all accounts at that point.
+    """
+    report = report or MergeReport()
+    balances: Dict[str, float] = {}
+    for s in sorted(statements, key=lambda s: s.period_start, reverse=True):
+        if s.opening_balance is not None:
+            balances[_account(s)] = s.opening_balance
+    total = sum(balances.values())
+
+    current_day = None
+    seen: Dict[tuple, int] = {}
+    streams = [_tagged(s, i) for i, s in enumerate(statements)]
+    for date, source, _, account, txn in heapq.merge(*streams, key=lambda item: (item[0], item[1], item[2])):
+        if date != current_day:
+            current_day = date
+            seen.clear()
+        key = (account, txn.description.strip().lower(), round(txn.credit or 0, 2), round(txn.debit or 0, 2), round(txn.balance, 2))
+        first_source = seen.setdefault(key, source)
+        if first_source != source:
+            report.duplicates_removed += 1
+            continue
+
+        # An account without a known opening balance joins the total at its
+        # first row's balance.
+        total += txn.balance - balances.get(account, 0.0)
+        balances[account] = txn.balance
+        yield txn.model_copy(update={"balance": round(total, 2)})
+
+
+def combine_statements(statements: List[BankStatement]) -> Tuple[BankStatement, MergeReport]:
+    """Merge N statements, possibly for several accounts, into one series.
+
+    The merged transactions are built into a list in full, since the
+    combined BankStatement (and the analysis run on it) needs all of them.
+    """
+    if not statements:
+        raise ValueError("No statements to combine")
+    report = MergeReport(continuity_issues=continuity_issues(statements))
+    transactions = list(merge_transactions(statements, report))
+
+    by_account: Dict[str, List[BankStatement]] = {}
+    for s in statements:
+        by_account.setdefault(_account(s), []).append(s)
+    opening = closing = 0.0
+    for group in by_account.values():
+        group.sort(key=lambda s: (s.period_start, s.period_end))
+        opening += group[0].opening_balance or 0.0
+        closing += group[-1].closing_balance if group[-1].closing_balance is not None else 0.0
+
+    if report.duplicates_removed:
+        logging.info("Removed %d duplicated rows across overlapping statements", report.duplicates_removed)
+
+    combined = BankStatement(
+        filename=", ".join(s.filename for s in statements),
+        account_number=", ".join(by_account),
+        period_start=min(s.period_start for s in statements),
+        period_end=max(s.period_end for s in statements),
+        opening_balance=opening,
+        closing_balance=closing,
+        money_in=sum(t.credit or 0 for t in transactions),
+        money_out=sum(t.debit or 0 for t in transactions),
+        currency=next((s.currency for s in statements if s.currency), None),
+        transactions=transactions,
+    )
+    return combined, report
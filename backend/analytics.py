@@ -0,0 +1,163 @@
+import os
+from typing import List, Optional
+
+import numpy as np
+import pandas as pd
+
+from models import (
+    AnalysisResult, BalanceTrends, BankStatement, CashFlowStability, HighTicketTransactions,
+    IncomeAnalysis, LoanAffordabilityIndicators, MonthlyVariability, RiskFlags, SpendingBehavior,
+    TopSpendingCategory, TransactionModel,
+)
+from recurring import income_sources
+from risk import assess_risk
+
+HIGH_TICKET_THRESHOLD = float(os.getenv("HIGH_TICKET_THRESHOLD", "1000"))
+LOW_BALANCE_THRESHOLD = float(os.getenv("LOW_BALANCE_THRESHOLD", "100"))
+# Share of days ending below LOW_BALANCE_THRESHOLD that counts as "frequent".
+LOW_BALANCE_FREQUENCY = 0.2
+TOP_CATEGORIES = 5
+
+
+def transactions_frame(transactions: List[TransactionModel]) -> pd.DataFrame:
+    df = pd.DataFrame(
+        [(t.date, t.description, t.credit, t.debit, t.balance) for t in transactions],
+        columns=["date", "description", "credit", "debit", "balance"],
+    )
+    df["date"] = pd.to_datetime(df["date"], errors="coerce", format="mixed")
+    for col in ("credit", "debit", "balance"):
+        df[col] = pd.to_numeric(df[col], errors="coerce").fillna(0.0)
+    return df
+
+
+def monthly_totals(df: pd.DataFrame) -> pd.DataFrame:
+    dated = df.dropna(subset=["date"])
+    if dated.empty:
+        return pd.DataFrame(columns=["credit", "debit", "balance"], dtype=float)
+    month = dated["date"].dt.to_period("M")
+    grouped = dated.groupby(month).agg(credit=("credit", "sum"), debit=("debit", "sum"), balance=("balance", "mean"))
+    # Months without any activity still count towards averages and variability.
+    months = pd.period_range(month.min(), month.max(), freq="M")
+    grouped = grouped.reindex(months)
+    grouped[["credit", "debit"]] = grouped[["credit", "debit"]].fillna(0.0)
+    grouped["balance"] = grouped["balance"].ffill()
+    return grouped
+
+
+def _round(value: float) -> float:
+    return round(float(value), 2) if np.isfinite(value) else 0.0
+
+
+def top_spending_categories(debit: np.ndarray, categories: List[str]) -> List[TopSpendingCategory]:
+    totals = pd.Series(debit).groupby(pd.Series(categories, dtype=object)).sum()
+    totals = totals[totals > 0].nlargest(TOP_CATEGORIES)
+    return [TopSpendingCategory(category=c.title(), total_spent=_round(v)) for c, v in totals.items()]
+
+
+def compute_analysis(summary: BankStatement, transactions: List[TransactionModel],
+                     qualitative: Optional[AnalysisResult] = None,
+                     categories: Optional[List[str]] = None) -> AnalysisResult:
+    """Compute AnalysisResult from the transactions.
+
+    ``categories`` (one per transaction, from the categorizer) gives the top
+    spending categories, income sources come from the recurring-payment
+    detector and risk flags and irregular activity from the risk engine.
+    Only the savings behaviour text is taken from ``qualitative`` when given
+    (see merge_qualitative).
+    """
+    df = transactions_frame(transactions)
+    monthly = monthly_totals(df)
+
+    credit = df["credit"].to_numpy()
+    debit = df["debit"].to_numpy()
+    balance = df["balance"].to_numpy()
+
+    total_in = credit.sum()
+    total_out = debit.sum()
+    net = total_in - total_out
+
+    opening = summary.opening_balance
+    if opening is None:
+        opening = balance[0] - credit[0] + debit[0] if len(df) else 0.0
+    closing = summary.closing_balance
+    if closing is None:
+        closing = balance[-1] if len(df) else opening
+
+    balances = np.append(balance, opening)
+    minimum_balance = balances.min()
+
+    avg_income = monthly["credit"].mean() if len(monthly) else total_in
+    avg_expenses = monthly["debit"].mean() if len(monthly) else total_out
+    avg_balance = monthly["balance"].mean() if len(monthly) else balances.mean()
+    income_std = monthly["credit"].std(ddof=0) if len(monthly) else 0.0
+    expenses_std = monthly["debit"].std(ddof=0) if len(monthly) else 0.0
+    coverage = max(closing, 0.0) / avg_expenses if avg_expenses > 0 else 0.0
+    risk = assess_risk(df, LOW_BALANCE_THRESHOLD, LOW_BALANCE_FREQUENCY)
+
+    result = AnalysisResult(
+        income_analysis=IncomeAnalysis(
+            total_money_in=_round(total_in),
+            average_monthly_income=_round(avg_income),
+            income_sources=income_sources(transactions),
+        ),
+        spending_behavior=SpendingBehavior(
+            total_money_out=_round(total_out),
+            average_monthly_expenses=_round(avg_expenses),
+            top_spending_categories=top_spending_categories(debit, categories) if categories else [],
+            high_ticket_transactions=HighTicketTransactions(
+                threshold=HIGH_TICKET_THRESHOLD,
+                count=int((debit >= HIGH_TICKET_THRESHOLD).sum()),
+            ),
+        ),
+        balance_trends=BalanceTrends(
+            opening_balance=_round(opening),
+            closing_balance=_round(closing),
+            average_monthly_balance=_round(avg_balance),
+            minimum_balance=_round(minimum_balance),
+            overdraft_occurred=bool(minimum_balance < 0),
+        ),
+        cash_flow_stability=CashFlowStability(
+            net_cash_flow=_round(net),
+            positive_cash_flow=bool(net > 0),
+            monthly_variability=MonthlyVariability(
+                income_std_dev=_round(income_std),
+                expenses_std_dev=_round(expenses_std),
+            ),
+            irregular_activity=risk.irregular_activity,
+        ),
+        loan_affordability_indicators=LoanAffordabilityIndicators(
+            estimated_disposable_income=_round(net),
+            months_of_expense_coverage=_round(coverage),
+            savings_behavior=_savings_behavior(net, coverage),
+        ),
+        risk_flags=RiskFlags(
+            frequent_low_balance=risk.frequent_low_balance,
+            low_balance_days=risk.low_balance_days,
+            suspicious_transaction_patterns=risk.suspicious_transaction_patterns,
+            use_of_credit=risk.use_of_credit,
+        ),
+    )
+    return merge_qualitative(result, qualitative) if qualitative else result
+
+
+def merge_qualitative(result: AnalysisResult, qualitative: AnalysisResult) -> AnalysisResult:
+    """Copy the free-text fields of an assistant-written analysis onto ``result``.
+
+    Lets the numeric analysis be computed while the assistant is still
+    running. Locally computed income sources and spending categories are kept
+    when there are any.
+    """
+    q = qualitative
+    result = result.model_copy(deep=True)
+    if not result.income_analysis.income_sources:
+        result.income_analysis.income_sources = q.income_analysis.income_sources
+    if not result.spending_behavior.top_spending_categories:
+        result.spending_behavior.top_spending_categories = q.spending_behavior.top_spending_categories
+    result.loan_affordability_indicators.savings_behavior = q.loan_affordability_indicators.savings_behavior
+    return result
+
+
+def _savings_behavior(net: float, coverage: float) -> str:
+    if net > 0:
+        return f"Net positive cash flow; closing balance covers {coverage:.1f} months of expenses."
+    return f"Net negative cash flow; closing balance covers {coverage:.1f} months of expenses."
@@ -0,0 +1,176 @@
+import hashlib
+import json
+import logging
+import os
+import re
+from collections import defaultdict
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+import pdfplumber
+
+from models import BankStatement, TransactionModel
+
+TEMPLATE_DIR = os.getenv("BANK_TEMPLATES_DIR", os.path.join(os.path.dirname(__file__), "bank_templates"))
+COLUMN_ORDER = ["date", "description", "credit", "debit", "balance"]
+AMOUNT_RE = re.compile(r"^\(?-?[£$€]?\s?-?[\d,]+(\.\d+)?\)?(\s?(CR|DR))?$", re.IGNORECASE)
+
+
+@dataclass
+class BankTemplate:
+    """Fixed table layout of one bank's statements.
+
+    ``columns`` maps each of date/description/credit/debit/balance to the
+    header label printed above it and that label's expected x position.
+    """
+    name: str
+    header_keywords: List[str]
+    columns: Dict[str, Dict[str, object]]
+    date_pattern: str = r"^\d{1,2}[ /.-]"
+    x_tolerance: float = 12.0
+    y_tolerance: float = 3.0
+    fields: Dict[str, str] = field(default_factory=dict)
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "BankTemplate":
+        return cls(**data)
+
+    def fingerprint_matches(self, text: str, words: List[dict]) -> bool:
+        lowered = text.lower()
+        if not all(k.lower() in lowered for k in self.header_keywords):
+            return False
+        return all(self._find_header(words, spec) is not None for spec in self.columns.values())
+
+    def _find_header(self, words: List[dict], spec: Dict[str, object]) -> Optional[dict]:
+        label = str(spec["label"]).lower().split()[0]
+        x = float(spec["x"])
+        for w in words:
+            if w["text"].lower() == label and abs(w["x0"] - x) <= self.x_tolerance:
+                return w
+        return None
+
+
+def _parse_amount(text: str) -> float:
+    text = text.strip()
+    if not text:
+        return 0.0
+    negative = text.startswith("(") or text.startswith("-") or text.upper().endswith("DR")
+    number = re.sub(r"[^\d.]", "", text)
+    value = float(number) if number else 0.0
+    return -value if negative else value
+
+
+def _lines(page, y_tolerance: float) -> List[List[dict]]:
+    # Same line rebuilding as pdf_text.page_to_text, but on words so each
+    # token keeps its x position for column assignment.
+    rows = defaultdict(list)
+    for word in page.extract_words(keep_blank_chars=False, use_text_flow=False):
+        rows[round(word["top"] / y_tolerance)].append(word)
+    return [sorted(ws, key=lambda w: w["x0"]) for _, ws in sorted(rows.items())]
+
+
+class TemplateRegistry:
+    def __init__(self, templates: List[BankTemplate]):
+        self.templates = templates
+        payload = json.dumps([t.__dict__ for t in templates], sort_keys=True, default=str)
+        self.version = hashlib.sha256(payload.encode()).hexdigest()[:12]
+
+    @classmethod
+    def from_dir(cls, directory: str = TEMPLATE_DIR) -> "TemplateRegistry":
+        templates = []
+        if os.path.isdir(directory):
+            for name in sorted(os.listdir(directory)):
+                if not name.endswith(".json"):
+                    continue
+                try:
+                    with open(os.path.join(directory, name)) as f:
+                        templates.append(BankTemplate.from_dict(json.load(f)))
+                except Exception as e:
+                    logging.warning("Skipping bank template %s: %s", name, e)
+        return cls(templates)
+
+    def match(self, pdf) -> Optional[BankTemplate]:
+        if not self.templates or not pdf.pages:
+            return None
+        first = pdf.pages[0]
+        text = first.extract_text() or ""
+        words = first.extract_words()
+        for template in self.templates:
+            if template.fingerprint_matches(text, words):
+                return template
+        return None
+
+    def extract(self, file_path: str) -> Optional[BankStatement]:
+        """Extract a statement with a matching template, or None if no template fits."""
+        with pdfplumber.open(file_path) as pdf:
+            template = self.match(pdf)
+            if template is None:
+                return None
+            logging.info("Using bank template %s for %s", template.name, file_path)
+            return extract_with_template(pdf, template, os.path.basename(file_path))
+
+
+def extract_with_template(pdf, template: BankTemplate, filename: str = "") -> BankStatement:
+    order = sorted(COLUMN_ORDER, key=lambda c: float(template.columns[c]["x"]))
+    starts = [float(template.columns[c]["x"]) - template.x_tolerance for c in order]
+    date_re = re.compile(template.date_pattern)
+    header_labels = {str(spec["label"]).lower() for spec in template.columns.values()}
+
+    def column_for(x0: float) -> str:
+        column = order[0]
+        for name, start in zip(order, starts):
+            if x0 >= start:
+                column = name
+        return column
+
+    transactions: List[TransactionModel] = []
+    first_page_text = ""
+    for page_number, page in enumerate(pdf.pages):
+        if page_number == 0:
+            first_page_text = page.extract_text() or ""
+        for words in _lines(page, template.y_tolerance):
+            cells: Dict[str, List[str]] = defaultdict(list)
+            for w in words:
+                cells[column_for(w["x0"])].append(w["text"])
+            row = {c: " ".join(cells.get(c, [])) for c in COLUMN_ORDER}
+            if " ".join(w["text"] for w in words).lower() in header_labels or row["date"].lower() in header_labels:
+                continue
+            amounts_ok = all(not row[c] or AMOUNT_RE.match(row[c]) for c in ("credit", "debit", "balance"))
+            if date_re.match(row["date"]) and row["balance"] and amounts_ok:
+                transactions.append(TransactionModel(
+                    date=row["date"],
+                    description=row["description"],
+                    credit=abs(_parse_amount(row["credit"])),
+                    debit=abs(_parse_amount(row["debit"])),
+                    balance=_parse_amount(row["balance"]),
+                ))
+            elif transactions and row["description"] and not any(row[c] for c in ("date", "credit", "debit", "balance")):
+                # Wrapped description line belonging to the previous row.
+                last = transactions[-1]
+                last.description = f"{last.description} {row['description']}"
+
+    header = {}
+    for name, pattern in template.fields.items():
+        match = re.search(pattern, first_page_text, re.IGNORECASE | re.MULTILINE)
+        header[name] = match.group(1).strip() if match else None
+
+    opening = _parse_amount(header["opening_balance"]) if header.get("opening_balance") else None
+    closing = _parse_amount(header["closing_balance"]) if header.get("closing_balance") else None
+    if opening is None and transactions:
+        t = transactions[0]
+        opening = t.balance - t.credit + t.debit
+    if closing is None and transactions:
+        closing = transactions[-1].balance
+
+    return BankStatement(
+        filename=filename,
+        account_number=header.get("account_number") or "",
+        period_start=header.get("period_start") or (transactions[0].date if transactions else ""),
+        period_end=header.get("period_end") or (transactions[-1].date if transactions else ""),
+        opening_balance=opening,
+        closing_balance=closing,
+        money_in=sum(t.credit for t in transactions),
+        money_out=sum(t.debit for t in transactions),
+        currency=header.get("currency"),
+        transactions=transactions,
+    )
@@ -0,0 +1,53 @@
+"""Compare two benchmark result files and flag regressions.
+
+    python -m benchmarks.compare baseline.json candidate.json --threshold 0.10
+
+Exits with status 1 if any shared benchmark got slower by more than the threshold.
+"""
+import argparse
+import json
+import sys
+from typing import Dict, Optional, Tuple
+
+# The figure compared for each section: micro-benchmarks by median, HTTP scenarios by p95.
+METRICS = {"micro": "median_ms", "e2e": "p95_ms"}
+
+
+def load(path: str) -> dict:
+    with open(path) as f:
+        return json.load(f)
+
+
+def compare(baseline: dict, candidate: dict, threshold: float) -> Tuple[list, bool]:
+    rows, regressed = [], False
+    for section, metric in METRICS.items():
+        old: Dict[str, dict] = baseline.get(section, {})
+        new: Dict[str, dict] = candidate.get(section, {})
+        for name in sorted(set(old) & set(new)):
+            before, after = old[name].get(metric), new[name].get(metric)
+            change: Optional[float] = (after - before) / before if before else None
+            slower = change is not None and change > threshold
+            regressed = regressed or slower
+            rows.append((section, name, metric, before, after, change, slower))
+    return rows, regressed
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Compare two benchmark result files")
+    parser.add_argument("baseline")
+    parser.add_argument("candidate")
+    parser.add_argument("--threshold", type=float, default=0.10, help="allowed slowdown, as a fraction")
+    args = parser.parse_args()
+
+    baseline, candidate = load(args.baseline), load(args.candidate)
+    rows, regressed = compare(baseline, candidate, args.threshold)
+    print(f"{baseline.get('commit')} -> {candidate.get('commit')}")
+    for section, name, metric, before, after, change, slower in rows:
+        delta = f"{change:+.1%}" if change is not None else "n/a"
+        marker = "  REGRESSION" if slower else ""
+        print(f"{section:5} {name:60} {metric:9} {before:10.2f} {after:10.2f} {delta:>8}{marker}")
+    sys.exit(1 if regressed else 0)
+
+
+if __name__ == "__main__":
+    main()
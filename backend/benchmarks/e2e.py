@@ -0,0 +1,202 @@
+import asyncio
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import httpx
+
+from models import BankStatement
+
+from benchmarks.synthetic import make_statement, write_statement_pdf
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# Half answered by the local query engine, half sent to the (fake) assistant.
+QUESTIONS = [
+    "What was my lowest balance?",
+    "What are the recurring payments?",
+    "How much did I spend on groceries last month?",
+    "Can I afford a new car loan?",
+]
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _wait_until_up(url: str, process: subprocess.Popen, timeout: float = 30.0) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"{url} exited with code {process.returncode}")
+        try:
+            httpx.get(url, timeout=1.0)
+            return
+        except httpx.TransportError:
+            time.sleep(0.2)
+    raise RuntimeError(f"{url} did not come up within {timeout:.0f}s")
+
+
+@contextmanager
+def running_servers(latency_ms: float, workdir: str, env_overrides: Optional[Dict[str, str]] = None,
+                    fake_api: bool = True) -> Iterator[str]:
+    """Start the fake OpenAI server (unless ``fake_api`` is off) and the backend; yield the backend URL."""
+    fake_port, backend_port = _free_port(), _free_port()
+    fake_url = f"http://127.0.0.1:{fake_port}/v1"
+    env = {
+        **os.environ,
+        "PYTHONPATH": BACKEND_DIR,
+        "FAKE_OPENAI_LATENCY_MS": str(latency_ms),
+        "OPENAI_API_KEY": "benchmark",
+        "OPENAI_BASE_URL": fake_url,
+        "OPENAI_API_BASE": fake_url,
+        "LITELLM_LOCAL_MODEL_COST_MAP": "True",
+        "DASHBOARD_MODE": "local",
+        "EXTRACTION_CACHE_PATH": os.path.join(workdir, "extraction_cache.sqlite3"),
+        "STATEMENT_DB_PATH": os.path.join(workdir, "finsight.sqlite3"),
+        "PARQUET_DIR": os.path.join(workdir, "parquet"),
+        "OCR_CACHE_DIR": os.path.join(workdir, "ocr"),
+        "CATEGORY_CACHE_PATH": os.path.join(workdir, "categories.sqlite3"),
+        **(env_overrides or {}),
+    }
+    quiet = {"stdout": subprocess.DEVNULL, "stderr": subprocess.DEVNULL}
+    processes = []
+    if fake_api:
+        processes.append(subprocess.Popen(
+            [sys.executable, "-m", "benchmarks.fake_openai", "--port", str(fake_port)],
+            cwd=BACKEND_DIR, env=env, **quiet,
+        ))
+    processes.append(subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(backend_port), "--log-level", "warning"],
+        cwd=workdir, env=env, **quiet,
+    ))
+    try:
+        if fake_api:
+            _wait_until_up(f"{fake_url}/threads/none/messages", processes[0])
+        backend_url = f"http://127.0.0.1:{backend_port}"
+        _wait_until_up(backend_url, processes[-1])
+        yield backend_url
+    finally:
+        for process in reversed(processes):
+            process.terminate()
+            try:
+                process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                process.kill()
+
+
+def summarize(latencies: List[float], errors: int, wall: float) -> Dict[str, float]:
+    ordered = sorted(latencies)
+
+    def pct(p: float) -> float:
+        return round(ordered[min(len(ordered) - 1, int(p * len(ordered)))], 2) if ordered else 0.0
+
+    return {
+        "requests": len(latencies) + errors,
+        "errors": errors,
+        "throughput_rps": round(len(latencies) / wall, 2) if wall else 0.0,
+        "mean_ms": round(statistics.fmean(latencies), 2) if latencies else 0.0,
+        "p50_ms": pct(0.5),
+        "p95_ms": pct(0.95),
+        "p99_ms": pct(0.99),
+        "max_ms": round(ordered[-1], 2) if ordered else 0.0,
+    }
+
+
+async def load(client: httpx.AsyncClient, requests: List[Tuple[str, str, dict]], concurrency: int) -> Tuple[Dict[str, float], List[httpx.Response]]:
+    """Send (method, path, kwargs) requests with at most ``concurrency`` in flight.
+
+    Successful responses come back in request order, so follow-up requests
+    built from them are the same on every run (which replay relies on).
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies: List[float] = []
+    responses: List[Optional[httpx.Response]] = [None] * len(requests)
+    errors = 0
+
+    async def send(i: int, method: str, path: str, kwargs: dict) -> None:
+        nonlocal errors
+        async with semaphore:
+            start = time.perf_counter()
+            try:
+                response = await client.request(method, path, **kwargs)
+            except httpx.HTTPError:
+                errors += 1
+                return
+            if response.status_code >= 400:
+                errors += 1
+            else:
+                latencies.append((time.perf_counter() - start) * 1000)
+                responses[i] = response
+
+    start = time.perf_counter()
+    await asyncio.gather(*(send(i, *r) for i, r in enumerate(requests)))
+    return summarize(latencies, errors, time.perf_counter() - start), [r for r in responses if r is not None]
+
+
+def _finalize_body(statement: BankStatement) -> dict:
+    return {
+        "summary": statement.model_copy(update={"transactions": []}).model_dump(),
+        "finalizedTransactions": [t.model_dump() for t in statement.transactions],
+    }
+
+
+async def run_scenarios(base_url: str, pdfs: List[str], statements: List[BankStatement], count: int, concurrency: int) -> Dict[str, Dict[str, float]]:
+    results: Dict[str, Dict[str, float]] = {}
+    async with httpx.AsyncClient(base_url=base_url, timeout=300.0) as client:
+        def upload(path: str) -> Tuple[str, str, dict]:
+            with open(path, "rb") as f:
+                content = f.read()
+            return ("POST", "/upload-statement/", {"files": {"file": (os.path.basename(path), content, "application/pdf")}})
+
+        results["upload-statement"], _ = await load(client, [upload(p) for p in pdfs[:count]], concurrency)
+        # The same files again: served from the extraction cache.
+        results["upload-statement[cached]"], _ = await load(client, [upload(p) for p in pdfs[:count]], concurrency)
+
+        finalize = [("POST", "/finalize-statement/", {"json": _finalize_body(statements[i % len(statements)])}) for i in range(count)]
+        results["finalize-statement"], responses = await load(client, finalize, concurrency)
+
+        session_ids = [r.json()["session_id"] for r in responses if r.json().get("session_id")]
+        if session_ids:
+            questions = [
+                ("POST", "/ask-question-in-thread/", {"json": {
+                    "question": QUESTIONS[i % len(QUESTIONS)], "session_id": session_ids[i % len(session_ids)],
+                }})
+                for i in range(count)
+            ]
+            results["ask-question-in-thread"], _ = await load(client, questions, concurrency)
+    return results
+
+
+def run_e2e(rows: int, count: int, concurrency: int, latency_ms: float, layout: str = "generic",
+            llm: str = "fake", recordings_dir: Optional[str] = None) -> Dict[str, Dict[str, float]]:
+    """Run every scenario once against a fresh backend.
+
+    ``llm="fake"`` talks to the fake OpenAI server, ``"record"`` does the same
+    while saving responses to ``recordings_dir`` and ``"replay"`` serves them
+    back with no server at all (``latency_ms`` then replaces recorded timings).
+    """
+    env: Dict[str, str] = {}
+    if llm in ("record", "replay"):
+        env.update(LLM_PROVIDER=llm, LLM_RECORDINGS_DIR=os.path.abspath(recordings_dir or "recordings"))
+        if llm == "replay":
+            env["LLM_REPLAY_LATENCY_MS"] = str(latency_ms)
+    with tempfile.TemporaryDirectory(prefix="finsight-bench-") as workdir:
+        statements, pdfs = [], []
+        for seed in range(count):
+            statement, _ = make_statement(rows, seed=seed)
+            path = os.path.join(workdir, f"statement-{seed}.pdf")
+            write_statement_pdf(statement, path, layout=layout)
+            statements.append(statement)
+            pdfs.append(path)
+
+        with running_servers(latency_ms, workdir, env, fake_api=llm != "replay") as base_url:
+            results = asyncio.run(run_scenarios(base_url, pdfs, statements, count, concurrency))
+    return {f"{name}[rows={rows},layout={layout},llm={llm}]": stats for name, stats in results.items()}
@@ -0,0 +1,241 @@
+"""Local stand-in for the parts of the OpenAI API the backend calls.
+
+Chat completions answer extraction prompts by reading the transaction rows
+that benchmarks.synthetic prints back out of the prompt, and JSON-mode
+categorizer prompts by putting every description in "other"; the Assistants
+endpoints keep threads in memory and reply with a canned answer. Every
+response waits ``FAKE_OPENAI_LATENCY_MS`` first, to stand in for model time.
+
+    python -m benchmarks.fake_openai --port 8100 --latency-ms 50
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import re
+import time
+from typing import Dict, List, Optional
+
+from fastapi import FastAPI, Request
+from fastapi.responses import StreamingResponse
+
+from benchmarks.synthetic import INCOME
+
+LATENCY = float(os.getenv("FAKE_OPENAI_LATENCY_MS", "0")) / 1000
+INCOME_NAMES = {name for name, _, _ in INCOME}
+ANSWER = "Based on the statement, your recurring payments are NETFLIX.COM, SPOTIFY and BRITISH GAS."
+
+# Rows may come indented and quoted, depending on how the prompt embeds the document.
+ROW_RE = re.compile(
+    r"^[ \t]*(\d{2}/\d{2}/\d{4}|\d{1,2} [A-Za-z]{3} \d{4})[ \t]+(.+?)[ \t]+((?:-?[\d,]+\.\d\d[ \t]*){1,3})(?=['\"]|$)",
+    re.MULTILINE,
+)
+FIELD_RES = {
+    "account_number": re.compile(r"Account number:?\s*([\d -]+\d)"),
+    "period_start": re.compile(r"Period:?\s*(\S+(?: \w+ \d{4})?)\s+to"),
+    "period_end": re.compile(r"Period:?.*?to\s+(\S+(?: \w+ \d{4})?)"),
+    "opening_balance": re.compile(r"Opening balance:?\s*(-?[\d,.]+)"),
+    "closing_balance": re.compile(r"Closing balance:?\s*(-?[\d,.]+)"),
+    "currency": re.compile(r"Currency:?\s*([A-Z]{3})"),
+}
+
+app = FastAPI()
+ids = itertools.count(1)
+threads: Dict[str, List[dict]] = {}
+runs: Dict[str, dict] = {}
+
+
+def _id(prefix: str) -> str:
+    return f"{prefix}_{next(ids)}"
+
+
+def _text(messages: List[dict]) -> str:
+    parts = []
+    for m in messages:
+        content = m.get("content")
+        if isinstance(content, str):
+            parts.append(content)
+        elif isinstance(content, list):
+            parts.extend(p.get("text", "") for p in content if isinstance(p, dict))
+    return "\n".join(parts)
+
+
+def parse_statement(text: str) -> dict:
+    """Recover the statement fields and rows from rendered synthetic statement text."""
+    fields: Dict[str, Optional[object]] = {}
+    for name, pattern in FIELD_RES.items():
+        match = pattern.search(text)
+        fields[name] = match.group(1).strip() if match else None
+    for name in ("opening_balance", "closing_balance"):
+        if fields[name] is not None:
+            fields[name] = float(str(fields[name]).replace(",", ""))
+
+    transactions = []
+    previous = fields["opening_balance"]
+    for date, description, amounts in ROW_RE.findall(text):
+        values = [float(a.replace(",", "")) for a in amounts.split()]
+        amount, balance = (values[0], values[-1]) if len(values) > 1 else (0.0, values[0])
+        # Rows print only the non-zero side; the balance movement says which
+        # one, or the payee for the first row of a later batch.
+        if previous is None:
+            credit = amount if description in INCOME_NAMES else 0.0
+        else:
+            credit = amount if balance >= previous else 0.0
+        transactions.append({
+            "date": date, "description": description, "credit": credit,
+            "debit": 0.0 if credit else amount, "balance": balance,
+        })
+        previous = balance
+
+    return {
+        "filename": "",
+        "account_number": fields["account_number"] or "",
+        "period_start": fields["period_start"] or "",
+        "period_end": fields["period_end"] or "",
+        "opening_balance": fields["opening_balance"],
+        "closing_balance": fields["closing_balance"],
+        "money_in": round(sum(t["credit"] for t in transactions), 2),
+        "money_out": round(sum(t["debit"] for t in transactions), 2),
+        "currency": fields["currency"],
+        "transactions": transactions,
+    }
+
+
+async def _latency() -> None:
+    if LATENCY:
+        await asyncio.sleep(LATENCY)
+
+
+# --- Chat completions (extraction) ---
+
+def categorize(text: str) -> dict:
+    """Answer a categorizer prompt, placing every description in "other"."""
+    descriptions = re.findall(r"^- (.+)$", text.split("Descriptions:", 1)[-1], re.MULTILINE)
+    return {"assignments": [{"description": d, "category": "other"} for d in descriptions]}
+
+
+@app.post("/v1/chat/completions")
+async def chat_completions(request: Request) -> dict:
+    body = await request.json()
+    await _latency()
+    text = _text(body.get("messages", []))
+    if (body.get("response_format") or {}).get("type") == "json_object":
+        content = json.dumps(categorize(text))
+    else:
+        content = "```json\n" + json.dumps(parse_statement(text)) + "\n```"
+    return {
+        "id": _id("chatcmpl"),
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": body.get("model", "fake"),
+        "choices": [{"index": 0, "finish_reason": "stop", "message": {"role": "assistant", "content": content}}],
+        "usage": {"prompt_tokens": len(content) // 4, "completion_tokens": len(content) // 4, "total_tokens": len(content) // 2},
+    }
+
+
+# --- Assistants ---
+
+@app.post("/v1/assistants")
+async def create_assistant(request: Request) -> dict:
+    body = await request.json()
+    return {"id": _id("asst"), "object": "assistant", "created_at": int(time.time()), "tools": [], **body}
+
+
+@app.post("/v1/threads")
+async def create_thread(request: Request) -> dict:
+    thread_id = _id("thread")
+    threads[thread_id] = list((await request.json() or {}).get("messages", []))
+    return {"id": thread_id, "object": "thread", "created_at": int(time.time()), "metadata": {}}
+
+
+@app.delete("/v1/threads/{thread_id}")
+async def delete_thread(thread_id: str) -> dict:
+    threads.pop(thread_id, None)
+    return {"id": thread_id, "object": "thread.deleted", "deleted": True}
+
+
+def _message(thread_id: str, role: str, text: str, message_id: Optional[str] = None) -> dict:
+    return {
+        "id": message_id or _id("msg"), "object": "thread.message", "created_at": int(time.time()),
+        "thread_id": thread_id, "role": role, "status": "completed", "attachments": [], "metadata": {},
+        "content": [{"type": "text", "text": {"value": text, "annotations": []}}],
+    }
+
+
+@app.post("/v1/threads/{thread_id}/messages")
+async def create_message(thread_id: str, request: Request) -> dict:
+    body = await request.json()
+    message = _message(thread_id, body.get("role", "user"), _text([body]))
+    threads.setdefault(thread_id, []).append(message)
+    return message
+
+
+@app.get("/v1/threads/{thread_id}/messages")
+async def list_messages(thread_id: str) -> dict:
+    # Newest first, like the real API.
+    data = list(reversed(threads.get(thread_id, [])))
+    return {"object": "list", "data": data, "has_more": False}
+
+
+def _run(thread_id: str, assistant_id: str, status: str, run_id: Optional[str] = None) -> dict:
+    return {
+        "id": run_id or _id("run"), "object": "thread.run", "created_at": int(time.time()),
+        "thread_id": thread_id, "assistant_id": assistant_id, "status": status,
+        "instructions": "", "model": "fake", "tools": [], "metadata": {},
+    }
+
+
+def _sse(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+@app.post("/v1/threads/{thread_id}/runs")
+async def create_run(thread_id: str, request: Request):
+    body = await request.json()
+    assistant_id = body.get("assistant_id", "")
+    if not body.get("stream"):
+        await _latency()
+        run = _run(thread_id, assistant_id, "completed")
+        runs[run["id"]] = run
+        threads.setdefault(thread_id, []).append(_message(thread_id, "assistant", ANSWER))
+        return run
+
+    async def events():
+        run = _run(thread_id, assistant_id, "in_progress")
+        yield _sse("thread.run.created", run)
+        await _latency()
+        message = _message(thread_id, "assistant", "")
+        message.update(status="in_progress", content=[])
+        yield _sse("thread.message.created", message)
+        for i, word in enumerate(ANSWER.split(" ")):
+            value = word if i == 0 else " " + word
+            yield _sse("thread.message.delta", {
+                "id": message["id"], "object": "thread.message.delta",
+                "delta": {"content": [{"index": 0, "type": "text", "text": {"value": value, "annotations": []}}]},
+            })
+        completed = _message(thread_id, "assistant", ANSWER, message["id"])
+        threads.setdefault(thread_id, []).append(completed)
+        yield _sse("thread.message.completed", completed)
+        yield _sse("thread.run.completed", _run(thread_id, assistant_id, "completed", run["id"]))
+        yield "event: done\ndata: [DONE]\n\n"
+
+    return StreamingResponse(events(), media_type="text/event-stream")
+
+
+@app.get("/v1/threads/{thread_id}/runs/{run_id}")
+async def retrieve_run(thread_id: str, run_id: str) -> dict:
+    return runs.get(run_id) or _run(thread_id, "", "completed", run_id)
+
+
+if __name__ == "__main__":
+    import uvicorn
+
+    arg_parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    arg_parser.add_argument("--host", default="127.0.0.1")
+    arg_parser.add_argument("--port", type=int, default=8100)
+    arg_parser.add_argument("--latency-ms", type=float, default=None)
+    args = arg_parser.parse_args()
+    if args.latency_ms is not None:
+        LATENCY = args.latency_ms / 1000
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
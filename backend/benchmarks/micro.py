@@ -0,0 +1,96 @@
+import statistics
+import time
+from datetime import date
+from typing import Callable, Dict, List
+
+from analytics import LOW_BALANCE_FREQUENCY, LOW_BALANCE_THRESHOLD, compute_analysis, transactions_frame
+from categorizer import Categorizer, CategoryMemo
+from dates import normalize_statement_dates
+from loans import simulate_loan
+from recurring import detect_recurring
+from risk import assess_risk
+from models import AnalysisResponse, AnalysisResult, LoanScenario
+from reconcile import flag_transactions, suggest_repairs
+
+from benchmarks.synthetic import make_statement
+
+
+def measure(fn: Callable[[], object], repeat: int = 20, setup: Callable[[], None] = None) -> Dict[str, float]:
+    """Time ``fn`` ``repeat`` times (after one warm-up call), in milliseconds."""
+    if setup:
+        setup()
+    fn()
+    samples: List[float] = []
+    for _ in range(repeat):
+        if setup:
+            setup()
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return {
+        "repeat": repeat,
+        "min_ms": round(min(samples), 4),
+        "median_ms": round(statistics.median(samples), 4),
+        "mean_ms": round(statistics.fmean(samples), 4),
+        "max_ms": round(max(samples), 4),
+    }
+
+
+def run_micro(rows_list: List[int], repeat: int = 20, error_rate: float = 0.02) -> Dict[str, Dict[str, float]]:
+    results: Dict[str, Dict[str, float]] = {}
+    for rows in rows_list:
+        statement, _ = make_statement(rows, seed=rows, error_rate=error_rate)
+        flagged = flag_transactions(statement)
+
+        results[f"flag_inconsistencies[rows={rows}]"] = measure(lambda: flag_transactions(statement), repeat)
+        results[f"suggest_repairs[rows={rows}]"] = measure(lambda: suggest_repairs(statement), repeat)
+
+        # Dates as a statement prints them, re-applied before every run since
+        # normalization rewrites the statement in place.
+        display = [date.fromisoformat(t.date).strftime("%d/%m/%Y") for t in statement.transactions]
+        period = [date.fromisoformat(d).strftime("%d/%m/%Y") for d in (statement.period_start, statement.period_end)]
+        target = statement.model_copy(deep=True)
+
+        def reset_dates() -> None:
+            target.period_start, target.period_end = period
+            for txn, value in zip(target.transactions, display):
+                txn.date = value
+
+        results[f"normalize_statement_dates[rows={rows}]"] = measure(
+            lambda: normalize_statement_dates(target), repeat, setup=reset_dates
+        )
+
+        response = AnalysisResponse(summary=statement, flagged=flagged)
+        response_json = response.model_dump_json()
+        results[f"AnalysisResponse.validate[rows={rows}]"] = measure(
+            lambda: AnalysisResponse.model_validate_json(response_json), repeat
+        )
+        results[f"AnalysisResponse.dump[rows={rows}]"] = measure(lambda: response.model_dump_json(), repeat)
+
+        # Card payments carry a per-row reference, as on real statements.
+        descriptions = [f"CARD PAYMENT {t.description} REF{i:08d} {t.date}" for i, t in enumerate(statement.transactions)]
+        categorizer = Categorizer(CategoryMemo(None), llm_fallback=False)
+        results[f"categorize[rows={rows}]"] = measure(lambda: categorizer.categorize_local(descriptions), repeat)
+
+        results[f"detect_recurring[rows={rows}]"] = measure(lambda: detect_recurring(statement.transactions), repeat)
+
+        frame = transactions_frame(statement.transactions)
+        results[f"assess_risk[rows={rows}]"] = measure(
+            lambda: assess_risk(frame, LOW_BALANCE_THRESHOLD, LOW_BALANCE_FREQUENCY), repeat
+        )
+
+        scenario = LoanScenario(monthly_repayment=500, months=36, scenarios=10000, seed=0)
+        results[f"simulate_loan[rows={rows},scenarios=10000,months=36]"] = measure(
+            lambda: simulate_loan(statement, statement.transactions, scenario), repeat
+        )
+
+        analysis = compute_analysis(statement, statement.transactions)
+        analysis_json = analysis.model_dump_json()
+        results[f"compute_analysis[rows={rows}]"] = measure(
+            lambda: compute_analysis(statement, statement.transactions), repeat
+        )
+        results[f"AnalysisResult.validate[rows={rows}]"] = measure(
+            lambda: AnalysisResult.model_validate_json(analysis_json), repeat
+        )
+        results[f"AnalysisResult.dump[rows={rows}]"] = measure(lambda: analysis.model_dump_json(), repeat)
+    return results
@@ -0,0 +1,86 @@
+"""Run the benchmark suite and save the results as JSON.
+
+    python -m benchmarks.run                      # micro + end-to-end
+    python -m benchmarks.run --only micro --rows 200,2000,20000
+    python -m benchmarks.run --only e2e --llm record      # then, offline:
+    python -m benchmarks.run --only e2e --llm replay --concurrency 64
+    python -m benchmarks.compare benchmarks/results/old.json benchmarks/results/new.json
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+
+from benchmarks.e2e import BACKEND_DIR, run_e2e
+from benchmarks.micro import run_micro
+
+RESULTS_DIR = os.path.join(BACKEND_DIR, "benchmarks", "results")
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=BACKEND_DIR, text=True, stderr=subprocess.DEVNULL
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="FinSight backend benchmarks")
+    parser.add_argument("--only", choices=["micro", "e2e"], help="run just one part of the suite")
+    parser.add_argument("--rows", default="200,2000", help="comma-separated transaction counts")
+    parser.add_argument("--repeat", type=int, default=20, help="micro-benchmark repetitions")
+    parser.add_argument("--requests", type=int, default=16, help="requests per end-to-end scenario")
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--latency-ms", type=float, default=50.0, help="simulated model latency of the fake API")
+    parser.add_argument("--llm", choices=["fake", "record", "replay"], default="fake",
+                        help="fake OpenAI server, or record/replay its responses (see llm.RecordReplayProvider)")
+    parser.add_argument("--recordings", default=os.path.join(BACKEND_DIR, "benchmarks", "recordings"),
+                        help="directory for --llm record/replay")
+    parser.add_argument("--layout", choices=["generic", "template"], default="generic")
+    parser.add_argument("--output", help="result file (default: benchmarks/results/<time>-<commit>.json)")
+    args = parser.parse_args()
+
+    rows_list = [int(r) for r in args.rows.split(",") if r]
+    commit = git_commit()
+    report = {
+        "commit": commit,
+        "created_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "args": vars(args),
+        "micro": {},
+        "e2e": {},
+    }
+
+    started = time.perf_counter()
+    if args.only in (None, "micro"):
+        report["micro"] = run_micro(rows_list, repeat=args.repeat)
+    if args.only in (None, "e2e"):
+        for rows in rows_list:
+            report["e2e"].update(run_e2e(
+                rows, args.requests, args.concurrency, args.latency_ms, args.layout, args.llm, args.recordings
+            ))
+    report["duration_s"] = round(time.perf_counter() - started, 2)
+
+    output = args.output or os.path.join(
+        RESULTS_DIR, f"{datetime.now(timezone.utc):%Y%m%dT%H%M%SZ}-{commit}.json"
+    )
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(report, f, indent=2)
+
+    for section in ("micro", "e2e"):
+        for name, stats in report[section].items():
+            value = stats.get("median_ms", stats.get("p50_ms"))
+            print(f"{section:5} {name:60} {value:10.2f} ms")
+    print(f"Saved {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,193 @@
+import random
+from datetime import date, timedelta
+from typing import Dict, List, Optional, Tuple
+
+from models import BankStatement, TransactionModel
+
+MERCHANTS = [
+    ("TESCO STORES", 5, 120), ("SAINSBURYS", 5, 90), ("AMAZON MARKETPLACE", 8, 250),
+    ("SHELL FUEL", 30, 90), ("TFL TRAVEL", 2, 15), ("NETFLIX.COM", 10, 16),
+    ("SPOTIFY", 10, 12), ("BRITISH GAS", 40, 140), ("COUNCIL TAX", 120, 180),
+    ("COSTA COFFEE", 3, 9), ("DELIVEROO", 12, 45), ("ATM WITHDRAWAL", 20, 200),
+]
+INCOME = [("SALARY ACME LTD", 2200, 3200), ("HMRC TAX REFUND", 50, 400), ("TRANSFER FROM SAVINGS", 100, 800)]
+ERROR_KINDS = ["balance_misread", "swap_credit_debit", "sign_flip", "duplicate_row", "missing_row"]
+
+PAGE_SIZE = (595, 842)
+COLUMN_X = {"date": 50, "description": 120, "credit": 330, "debit": 410, "balance": 490}
+TABLE_TOP = 150
+ROW_HEIGHT = 14
+
+
+def make_statement(
+    rows: int = 200,
+    seed: int = 0,
+    error_rate: float = 0.0,
+    start: date = date(2024, 1, 1),
+    account_number: str = "12-34-56 12345678",
+    opening_balance: float = 1500.0,
+) -> Tuple[BankStatement, List[Tuple[int, str]]]:
+    """Build a statement whose running balance is consistent, then inject errors.
+
+    Returns the statement and the (index, kind) of every injected error;
+    indexes refer to the statement after injection.
+    """
+    rng = random.Random(seed)
+    balance = opening_balance
+    day = start
+    transactions: List[TransactionModel] = []
+    for i in range(rows):
+        day += timedelta(days=rng.choice([0, 0, 1, 1, 2]))
+        if rng.random() < 0.08 or (day.day == 25 and i % 20 == 0):
+            name, low, high = rng.choice(INCOME)
+            credit, debit = round(rng.uniform(low, high), 2), 0.0
+        else:
+            name, low, high = rng.choice(MERCHANTS)
+            credit, debit = 0.0, round(rng.uniform(low, high), 2)
+        balance = round(balance + credit - debit, 2)
+        transactions.append(TransactionModel(
+            date=day.isoformat(), description=name, credit=credit, debit=debit, balance=balance,
+        ))
+
+    injected: List[Tuple[int, str]] = []
+    if error_rate > 0 and rows > 2:
+        slots = range(1, rows - 1, 3)
+        # Keep errors apart so each one stays separately detectable.
+        positions = sorted(rng.sample(slots, min(max(1, int(rows * error_rate)), len(slots))))
+        shift = 0
+        for position in positions:
+            index = position + shift
+            kind = rng.choice(ERROR_KINDS)
+            txn = transactions[index]
+            if kind == "balance_misread":
+                txn.balance = round(txn.balance + rng.choice([-1, 1]) * rng.choice([10, 100, 0.9]), 2)
+            elif kind == "swap_credit_debit":
+                txn.credit, txn.debit = txn.debit, txn.credit
+            elif kind == "sign_flip":
+                txn.balance = -txn.balance
+            elif kind == "duplicate_row":
+                transactions.insert(index + 1, txn.model_copy())
+                index += 1
+                shift += 1
+            elif kind == "missing_row":
+                del transactions[index]
+                shift -= 1
+            injected.append((index, kind))
+
+    statement = BankStatement(
+        filename=f"synthetic-{seed}.pdf",
+        account_number=account_number,
+        period_start=start.isoformat(),
+        period_end=(transactions[-1].date if transactions else start.isoformat()),
+        opening_balance=opening_balance,
+        closing_balance=transactions[-1].balance if transactions else opening_balance,
+        money_in=round(sum(t.credit for t in transactions), 2),
+        money_out=round(sum(t.debit for t in transactions), 2),
+        currency="GBP",
+        transactions=transactions,
+    )
+    return statement, injected
+
+
+# --- PDF rendering ---
+
+def _escape(text: str) -> str:
+    return text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+
+def write_pdf(path: str, pages: List[List[Tuple[float, float, str]]], font_size: int = 9) -> None:
+    """Write a minimal text PDF; each page is a list of (x, y_from_top, text)."""
+    width, height = PAGE_SIZE
+    objects: List[bytes] = []
+
+    def add(body: bytes) -> int:
+        objects.append(body)
+        return len(objects)
+
+    font = add(b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>")
+    pages_id = len(objects) + 1 + 2 * len(pages)
+    page_ids = []
+    for items in pages:
+        ops = ["BT", f"/F1 {font_size} Tf"]
+        for x, y, text in items:
+            ops.append(f"1 0 0 1 {x:.2f} {height - y:.2f} Tm ({_escape(text)}) Tj")
+        ops.append("ET")
+        stream = "\n".join(ops).encode("latin-1")
+        content = add(b"<< /Length %d >>\nstream\n" % len(stream) + stream + b"\nendstream")
+        box = f"[0 0 {width} {height}]"
+        page_ids.append(add(
+            f"<< /Type /Page /Parent {pages_id} 0 R /MediaBox {box} /CropBox {box} "
+            f"/Resources << /Font << /F1 {font} 0 R >> >> /Contents {content} 0 R >>".encode()
+        ))
+    kids = " ".join(f"{p} 0 R" for p in page_ids)
+    add(f"<< /Type /Pages /Kids [{kids}] /Count {len(page_ids)} >>".encode())
+    catalog = add(f"<< /Type /Catalog /Pages {pages_id} 0 R >>".encode())
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for i, body in enumerate(objects, 1):
+        offsets.append(len(out))
+        out += f"{i} 0 obj\n".encode() + body + b"\nendobj\n"
+    xref = len(out)
+    out += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode()
+    for offset in offsets:
+        out += f"{offset:010d} 00000 n \n".encode()
+    out += f"trailer\n<< /Size {len(objects) + 1} /Root {catalog} 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode()
+    with open(path, "wb") as f:
+        f.write(bytes(out))
+
+
+def _display_date(iso: str, layout: str) -> str:
+    d = date.fromisoformat(iso)
+    return d.strftime("%d %b %Y") if layout == "template" else d.strftime("%d/%m/%Y")
+
+
+def write_statement_pdf(
+    statement: BankStatement,
+    path: str,
+    rows_per_page: int = 45,
+    layout: str = "generic",
+    pages: Optional[int] = None,
+) -> int:
+    """Render a statement as a text PDF and return its page count.
+
+    ``layout="template"`` prints the header and columns of the bundled
+    example_bank template so extraction takes the template path; the
+    generic layout has no known fingerprint and goes to the LLM. ``pages``
+    spreads the rows over that many pages instead of ``rows_per_page``.
+    """
+    rows = statement.transactions
+    if pages:
+        rows_per_page = max(1, -(-len(rows) // pages))
+    title = "Example Bank plc - Statement of Account" if layout == "template" else "Bank Statement"
+    period = f"{_display_date(statement.period_start, layout)} to {_display_date(statement.period_end, layout)}"
+    header = [
+        (50, 40, title),
+        (50, 60, f"Account number: {statement.account_number}"),
+        (50, 74, f"Period: {period}"),
+        (50, 88, f"Opening balance: {statement.opening_balance:.2f}"),
+        (50, 102, f"Closing balance: {statement.closing_balance:.2f}"),
+        (50, 116, f"Currency: {statement.currency}"),
+    ]
+    labels: Dict[str, str] = {
+        "date": "Date", "description": "Description", "credit": "Paid in", "debit": "Paid out", "balance": "Balance",
+    }
+
+    # Trailing spaces keep cells apart in extracted text without moving the
+    # x position of the words the template path reads.
+    rendered = []
+    for start in range(0, max(len(rows), 1), rows_per_page):
+        items = list(header) if start == 0 else []
+        items += [(COLUMN_X[c], TABLE_TOP - ROW_HEIGHT, label + " ") for c, label in labels.items()]
+        for i, txn in enumerate(rows[start:start + rows_per_page]):
+            y = TABLE_TOP + i * ROW_HEIGHT
+            items.append((COLUMN_X["date"], y, _display_date(txn.date, layout) + " "))
+            items.append((COLUMN_X["description"], y, txn.description + " "))
+            if txn.credit:
+                items.append((COLUMN_X["credit"], y, f"{txn.credit:.2f} "))
+            if txn.debit:
+                items.append((COLUMN_X["debit"], y, f"{txn.debit:.2f} "))
+            items.append((COLUMN_X["balance"], y, f"{txn.balance:.2f}"))
+        rendered.append(items)
+    write_pdf(path, rendered)
+    return len(rendered)
@@ -0,0 +1,146 @@
+import hashlib
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+
+from models import AnalysisResponse
+
+
+def sha256_file(path: str, chunk_size: int = 1 << 20) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class ExtractionCache:
+    """Two-tier cache of extraction results keyed by content hash + version.
+
+    The memory tier is a plain LRU of recent entries. The disk tier is a SQLite
+    table evicted by TTL and by total payload size (least recently used first).
+    """
+
+    def __init__(self, path: Optional[str], version: str, memory_items: int = 128,
+                 max_bytes: int = 256 * 1024 * 1024, ttl_seconds: float = 7 * 24 * 3600):
+        self.version = version
+        self.memory_items = memory_items
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self._memory: "OrderedDict[str, tuple[float, str]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._db: Optional[sqlite3.Connection] = None
+        self.hits_memory = 0
+        self.hits_disk = 0
+        self.misses = 0
+        self.evictions = 0
+
+        if path:
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+            self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute("""
+                CREATE TABLE IF NOT EXISTS extraction_cache (
+                    key TEXT PRIMARY KEY,
+                    value TEXT NOT NULL,
+                    size INTEGER NOT NULL,
+                    created_at REAL NOT NULL,
+                    accessed_at REAL NOT NULL
+                )
+            """)
+            self._db.execute("CREATE INDEX IF NOT EXISTS idx_extraction_cache_accessed ON extraction_cache(accessed_at)")
+
+    @classmethod
+    def from_env(cls, version: str) -> "ExtractionCache":
+        path = os.getenv("EXTRACTION_CACHE_PATH", os.path.join("cache", "extraction_cache.sqlite3"))
+        return cls(
+            path=path or None,
+            version=version,
+            memory_items=int(os.getenv("EXTRACTION_CACHE_MEMORY_ITEMS", "128")),
+            max_bytes=int(os.getenv("EXTRACTION_CACHE_MAX_BYTES", str(256 * 1024 * 1024))),
+            ttl_seconds=float(os.getenv("EXTRACTION_CACHE_TTL_SECONDS", str(7 * 24 * 3600))),
+        )
+
+    def key_for(self, content_hash: str) -> str:
+        return f"{content_hash}:{self.version}"
+
+    def get(self, content_hash: str) -> Optional[AnalysisResponse]:
+        key = self.key_for(content_hash)
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None and now - entry[0] <= self.ttl_seconds:
+                self._memory.move_to_end(key)
+                self.hits_memory += 1
+                return AnalysisResponse.model_validate_json(entry[1])
+            if entry is not None:
+                del self._memory[key]
+
+            if self._db is not None:
+                row = self._db.execute(
+                    "SELECT value, created_at FROM extraction_cache WHERE key = ? AND created_at >= ?",
+                    (key, now - self.ttl_seconds),
+                ).fetchone()
+                if row is not None:
+                    self._db.execute("UPDATE extraction_cache SET accessed_at = ? WHERE key = ?", (now, key))
+                    self._remember(key, row[1], row[0])
+                    self.hits_disk += 1
+                    return AnalysisResponse.model_validate_json(row[0])
+
+            self.misses += 1
+            return None
+
+    def put(self, content_hash: str, response: AnalysisResponse) -> None:
+        key = self.key_for(content_hash)
+        value = response.model_dump_json()
+        now = time.time()
+        with self._lock:
+            self._remember(key, now, value)
+            if self._db is None:
+                return
+            try:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO extraction_cache (key, value, size, created_at, accessed_at) VALUES (?, ?, ?, ?, ?)",
+                    (key, value, len(value), now, now),
+                )
+                self._evict_disk(now)
+            except sqlite3.Error as e:
+                logging.warning("Failed to write extraction cache entry: %s", e)
+
+    def _remember(self, key: str, created_at: float, value: str) -> None:
+        self._memory[key] = (created_at, value)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_items:
+            self._memory.popitem(last=False)
+
+    def _evict_disk(self, now: float) -> None:
+        expired = self._db.execute("DELETE FROM extraction_cache WHERE created_at < ?", (now - self.ttl_seconds,)).rowcount
+        self.evictions += max(expired, 0)
+
+        total = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM extraction_cache").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        for key, size in self._db.execute("SELECT key, size FROM extraction_cache ORDER BY accessed_at ASC").fetchall():
+            self._db.execute("DELETE FROM extraction_cache WHERE key = ?", (key,))
+            self.evictions += 1
+            total -= size
+            if total <= self.max_bytes:
+                break
+
+    def stats(self) -> dict:
+        hits = self.hits_memory + self.hits_disk
+        lookups = hits + self.misses
+        return {
+            "version": self.version,
+            "hits": hits,
+            "hits_memory": self.hits_memory,
+            "hits_disk": self.hits_disk,
+            "misses": self.misses,
+            "hit_ratio": hits / lookups if lookups else 0.0,
+            "evictions": self.evictions,
+            "memory_entries": len(self._memory),
+        }
@@ -0,0 +1,370 @@
+import asyncio
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict, deque
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from pydantic import BaseModel
+
+from llm import get_llm_provider
+
+# Bump to drop memoized categories, e.g. after changing the category list.
+CATEGORIZER_VERSION = "1"
+CATEGORIZER_MODEL = os.getenv("CATEGORIZER_MODEL", "gpt-4o-mini")
+OTHER = "other"
+
+# Merchant names and keywords per spending category. Matched as word
+# prefixes against normalized descriptions; the longest match wins, so
+# "uber eats" is dining while "uber" is transport.
+CATEGORY_KEYWORDS = {
+    "groceries": ["tesco", "sainsbury", "asda", "aldi", "lidl", "morrisons", "waitrose", "co-op", "grocery", "supermarket", "walmart", "kroger", "costco", "ocado", "iceland"],
+    "rent": ["rent", "letting", "landlord", "mortgage"],
+    "utilities": ["electric", "gas ", "water", "energy", "broadband", "utility", "council tax", "octopus", "thames water", "bt group", "virgin media", "vodafone", "ee limited", "o2 "],
+    "transport": ["uber", "tfl", "rail", "train", "bus ", "fuel", "petrol", "shell", "bp ", "esso", "parking", "trainline", "dvla"],
+    "dining": ["restaurant", "cafe", "coffee", "starbucks", "costa", "pret", "greggs", "mcdonald", "kfc", "nando", "deliveroo", "just eat", "uber eats", "pizza"],
+    "entertainment": ["netflix", "spotify", "cinema", "disney", "prime video", "steam", "playstation", "xbox", "apple music", "youtube"],
+    "shopping": ["amazon", "amzn", "ebay", "argos", "primark", "zara", "h&m", "asos", "john lewis", "ikea", "currys"],
+    "gambling": ["bet365", "betfair", "william hill", "paddy power", "casino", "lottery", "ladbrokes", "coral", "skybet"],
+    "health": ["pharmacy", "boots", "dentist", "optician", "gym", "puregym", "nhs"],
+    "insurance": ["insurance", "aviva", "admiral", "direct line", "legal & general"],
+    "cash": ["atm", "cash withdrawal", "cashpoint"],
+    "transfers": ["transfer", "standing order", "faster payment"],
+    "fees": ["fee ", "fees ", "overdraft", "interest charge", "charges "],
+}
+CATEGORIES = sorted(CATEGORY_KEYWORDS) + [OTHER]
+
+
+# --- Normalization ---
+
+_PUNCT_RE = re.compile(r"[^a-z0-9& ]+")
+_MONTH_WORDS = {
+    "jan", "feb", "mar", "apr", "jun", "jul", "aug", "sep", "sept", "oct", "nov", "dec",
+    "january", "february", "march", "april", "june", "july", "august", "september", "october", "november", "december",
+}
+_NOISE_WORDS = {
+    "ref", "reference", "pos", "visa", "mastercard", "contactless", "card", "purchase", "payment", "to",
+    "from", "on", "at", "txn", "trx", "auth", "debit", "dd", "so", "gbp", "usd", "eur",
+} | _MONTH_WORDS
+
+
+def _is_reference(token: str) -> bool:
+    # Card numbers, references, store numbers, dates and times, but not
+    # digits that are part of a name ("bet365", "o2").
+    digits = sum(ch.isdigit() for ch in token)
+    return digits > 0 and (token[0].isdigit() or "*" in token or "#" in token or digits >= 4)
+
+
+def normalize_description(description: str) -> str:
+    """Lower-case ``description`` and drop dates, references and payment-channel noise.
+
+    The result is the memo key, so "CARD PAYMENT TO TESCO STORES 3412 ON 02/01"
+    and "TESCO STORES 2290" both normalize to "tesco stores". Written as a
+    plain token loop rather than a chain of regexes: this runs once per row.
+    """
+    words = []
+    for token in description.lower().split():
+        if token.isalpha():
+            if token not in _NOISE_WORDS:
+                words.append(token)
+        elif not _is_reference(token):
+            words.extend(w for w in _PUNCT_RE.sub(" ", token).split() if w not in _NOISE_WORDS)
+    if words:
+        return " ".join(words)
+    # Channel words only go when something else is left.
+    return " ".join(_PUNCT_RE.sub(" ", description.lower()).split())
+
+
+def _normalize_keyword(keyword: str) -> str:
+    # Same character rules as descriptions, keeping a trailing space that
+    # marks a whole word ("bp ").
+    text = " ".join(_PUNCT_RE.sub(" ", keyword.lower()).split())
+    return text + " " if keyword.endswith(" ") else text
+
+
+# --- Multi-pattern matching ---
+
+class KeywordMatcher:
+    """Aho-Corasick automaton over keywords, matching on word starts.
+
+    One pass over a description finds every keyword in it, however many
+    keywords there are.
+    """
+
+    def __init__(self, keywords: Dict[str, str]):
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        # Per state: (keyword length, category) of keywords ending there.
+        self._out: List[List[Tuple[int, str]]] = [[]]
+        for keyword, category in keywords.items():
+            self._add(keyword, category)
+        self._build()
+
+    def _add(self, keyword: str, category: str) -> None:
+        state = 0
+        for ch in keyword:
+            nxt = self._goto[state].get(ch)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto[state][ch] = nxt
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append([])
+            state = nxt
+        self._out[state].append((len(keyword), category))
+
+    def _build(self) -> None:
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for ch, nxt in self._goto[state].items():
+                queue.append(nxt)
+                fail = self._fail[state]
+                while fail and ch not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[nxt] = self._goto[fail].get(ch, 0) if state else 0
+                self._out[nxt] = self._out[nxt] + self._out[self._fail[nxt]]
+
+    def match(self, text: str) -> Optional[str]:
+        """Category of the longest keyword starting at a word boundary in ``text``."""
+        text = f" {text} "
+        goto, fail, out = self._goto, self._fail, self._out
+        state, best, best_length = 0, None, 0
+        for i, ch in enumerate(text):
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            for length, category in out[state]:
+                if length > best_length and text[i - length] == " ":
+                    best, best_length = category, length
+        return best
+
+
+_KEYWORDS = {
+    _normalize_keyword(keyword): category
+    for category, keywords in CATEGORY_KEYWORDS.items()
+    for keyword in keywords
+}
+_matcher = KeywordMatcher(_KEYWORDS)
+
+
+def match_keywords(normalized: str) -> Optional[str]:
+    return _matcher.match(normalized)
+
+
+# --- Memo ---
+
+class CategoryMemo:
+    """Normalized description -> category as answered by the LLM.
+
+    Entries live in a SQLite table with an LRU of ``memory_items`` in front
+    of it. Dictionary matches are not memoized; matching is already linear
+    and redoing it follows dictionary edits.
+    """
+
+    def __init__(self, path: Optional[str], version: str = CATEGORIZER_VERSION, memory_items: int = 10000):
+        self.version = version
+        self.memory_items = memory_items
+        self._memory: "OrderedDict[str, str]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._db: Optional[sqlite3.Connection] = None
+        self.hits = 0
+        self.misses = 0
+
+        if path:
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+            self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute("""
+                CREATE TABLE IF NOT EXISTS category_memo (
+                    description TEXT NOT NULL,
+                    version TEXT NOT NULL,
+                    category TEXT NOT NULL,
+                    created_at REAL NOT NULL,
+                    PRIMARY KEY (description, version)
+                )
+            """)
+            # Warm the LRU with the newest entries; older ones load on demand.
+            rows = self._db.execute(
+                "SELECT description, category FROM category_memo WHERE version = ? ORDER BY created_at DESC LIMIT ?",
+                (version, memory_items),
+            ).fetchall()
+            self._store(dict(reversed(rows)))
+
+    @classmethod
+    def from_env(cls) -> "CategoryMemo":
+        path = os.getenv("CATEGORY_CACHE_PATH", os.path.join("cache", "categories.sqlite3"))
+        return cls(path=path or None, memory_items=int(os.getenv("CATEGORY_CACHE_MEMORY_ITEMS", "10000")))
+
+    def _store(self, categories: Dict[str, str]) -> None:
+        for description, category in categories.items():
+            self._memory[description] = category
+            self._memory.move_to_end(description)
+        while len(self._memory) > self.memory_items:
+            self._memory.popitem(last=False)
+
+    def get_many(self, descriptions: Iterable[str]) -> Dict[str, str]:
+        with self._lock:
+            found = {}
+            missing = []
+            for d in descriptions:
+                if d in self._memory:
+                    self._memory.move_to_end(d)
+                    found[d] = self._memory[d]
+                else:
+                    missing.append(d)
+            if missing and self._db is not None:
+                loaded = {}
+                try:
+                    # Chunked to stay under SQLite's bound-parameter limit.
+                    for i in range(0, len(missing), 500):
+                        chunk = missing[i:i + 500]
+                        loaded.update(self._db.execute(
+                            f"SELECT description, category FROM category_memo "
+                            f"WHERE version = ? AND description IN ({', '.join('?' * len(chunk))})",
+                            (self.version, *chunk),
+                        ).fetchall())
+                except sqlite3.Error as e:
+                    logging.warning("Failed to read category memo: %s", e)
+                self._store(loaded)
+                found.update(loaded)
+        return found
+
+    def remember(self, categories: Dict[str, str]) -> None:
+        with self._lock:
+            self._store(categories)
+            if self._db is None or not categories:
+                return
+            now = time.time()
+            try:
+                self._db.executemany(
+                    "INSERT OR REPLACE INTO category_memo (description, version, category, created_at) VALUES (?, ?, ?, ?)",
+                    [(d, self.version, c, now) for d, c in categories.items()],
+                )
+            except sqlite3.Error as e:
+                logging.warning("Failed to write category memo: %s", e)
+
+    def record(self, hits: int, misses: int) -> None:
+        self.hits += hits
+        self.misses += misses
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "version": self.version,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / lookups if lookups else 0.0,
+            "entries": len(self._memory),
+        }
+
+
+# --- LLM fallback ---
+
+class CategoryAssignment(BaseModel):
+    description: str
+    category: str
+
+
+class CategoryAssignments(BaseModel):
+    assignments: List[CategoryAssignment]
+
+
+def _categorize_prompt(descriptions: Sequence[str]) -> List[dict]:
+    lines = "\n".join(f"- {d}" for d in descriptions)
+    return [
+        {"role": "system", "content": (
+            "You categorize bank transaction descriptions by spending category. "
+            f"Use exactly one of: {', '.join(CATEGORIES)}. Answer in JSON as "
+            '{"assignments": [{"description": ..., "category": ...}]} with every description copied verbatim.'
+        )},
+        {"role": "user", "content": f"Descriptions:\n{lines}"},
+    ]
+
+
+class Categorizer:
+    """Assigns a spending category to every transaction description.
+
+    Descriptions are normalized, then matched against CATEGORY_KEYWORDS,
+    then looked up in the memo of earlier LLM answers. Whatever is still unknown goes to the LLM in
+    one batched call (the ``llm_max_items`` highest-spend descriptions at
+    most); anything it cannot place is "other".
+    """
+
+    def __init__(self, memo: CategoryMemo, llm_fallback: bool = True, llm_max_items: int = 200,
+                 llm_timeout: float = 20.0):
+        self.memo = memo
+        self.llm_fallback = llm_fallback
+        self.llm_max_items = llm_max_items
+        self.llm_timeout = llm_timeout
+
+    @classmethod
+    def from_env(cls) -> "Categorizer":
+        return cls(
+            memo=CategoryMemo.from_env(),
+            llm_fallback=os.getenv("CATEGORIZER_LLM_FALLBACK", "true").lower() == "true",
+            llm_max_items=int(os.getenv("CATEGORIZER_LLM_MAX_ITEMS", "200")),
+            llm_timeout=float(os.getenv("CATEGORIZER_LLM_TIMEOUT_SECONDS", "20")),
+        )
+
+    def categorize_local(self, descriptions: Sequence[str]) -> Tuple[List[Optional[str]], List[str]]:
+        """Categories from the dictionary and the memo only; None where unknown.
+
+        Also returns the normalized form of each description.
+        """
+        normalized_of = {d: normalize_description(d) for d in set(descriptions)}
+        normalized = [normalized_of[d] for d in descriptions]
+        known = {}
+        unmatched = []
+        for text in set(normalized):
+            category = match_keywords(text)
+            if category is not None:
+                known[text] = category
+            else:
+                unmatched.append(text)
+        if unmatched:
+            remembered = self.memo.get_many(unmatched)
+            self.memo.record(len(remembered), len(unmatched) - len(remembered))
+            known.update(remembered)
+        return [known.get(text) for text in normalized], normalized
+
+    async def categorize(self, descriptions: Sequence[str], amounts: Optional[Sequence[float]] = None) -> List[str]:
+        """One category per description; ``amounts`` ranks unknown ones for the LLM batch.
+
+        The memo lookup and write-back hit SQLite, so they run in worker threads.
+        """
+        categories, normalized = await asyncio.to_thread(self.categorize_local, descriptions)
+        unknown: Dict[str, float] = {}
+        for i, (category, text) in enumerate(zip(categories, normalized)):
+            weight = abs(amounts[i]) if amounts is not None else 1.0
+            # Rows with no amount (income, when amounts are debits) are not worth a prompt line.
+            if category is None and weight:
+                unknown[text] = unknown.get(text, 0.0) + weight
+
+        if unknown and self.llm_fallback:
+            batch = sorted(unknown, key=unknown.get, reverse=True)[:self.llm_max_items]
+            assigned = await self._ask_llm(batch)
+            if assigned:
+                await asyncio.to_thread(self.memo.remember, assigned)
+                categories = [c if c is not None else assigned.get(text) for c, text in zip(categories, normalized)]
+        return [c or OTHER for c in categories]
+
+    async def _ask_llm(self, descriptions: List[str]) -> Dict[str, str]:
+        try:
+            reply = await asyncio.wait_for(
+                get_llm_provider().complete(_categorize_prompt(descriptions), CategoryAssignments, CATEGORIZER_MODEL),
+                timeout=self.llm_timeout,
+            )
+        except Exception as e:
+            logging.warning("LLM categorization of %d descriptions failed: %s", len(descriptions), e)
+            return {}
+        wanted = set(descriptions)
+        allowed = set(CATEGORIES)
+        return {
+            a.description: a.category.lower() if a.category.lower() in allowed else OTHER
+            for a in reply.assignments
+            if a.description in wanted
+        }
@@ -0,0 +1,131 @@
+import csv
+import io
+import logging
+import os
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import Dict, List, Optional
+
+from models import FinalizedStatementRequest, TransactionModel
+from recurring import detect_recurring
+
+QA_CONTEXT_MAX_TOKENS = int(os.getenv("QA_CONTEXT_MAX_TOKENS", "12000"))
+TOKENIZER_MODEL = "gpt-4o-mini"
+
+
+@lru_cache(maxsize=1)
+def _encoding():
+    try:
+        import tiktoken
+        return tiktoken.encoding_for_model(TOKENIZER_MODEL)
+    except Exception as e:
+        logging.warning("tiktoken unavailable, estimating token counts: %s", e)
+        return None
+
+
+def warm_tokenizer() -> None:
+    """Load the encoding up front; tiktoken downloads it on first use."""
+    _encoding()
+
+
+def count_tokens(text: str) -> int:
+    encoding = _encoding()
+    if encoding is None:
+        # Roughly 4 characters per token for English and numeric text.
+        return (len(text) + 3) // 4
+    return len(encoding.encode(text))
+
+
+@dataclass
+class StatementContext:
+    text: str
+    token_count: int
+    summarized_months: List[str] = field(default_factory=list)
+
+
+def _fmt(value: Optional[float]) -> str:
+    if value is None:
+        return ""
+    return f"{value:.2f}".rstrip("0").rstrip(".")
+
+
+def _csv_rows(rows: List[List[str]]) -> str:
+    buffer = io.StringIO()
+    csv.writer(buffer, lineterminator="\n").writerows(rows)
+    return buffer.getvalue()
+
+
+def unique_transactions(transactions: List[TransactionModel]) -> List[TransactionModel]:
+    # Rows carry their running balance, so two identical rows can only be an
+    # extraction duplicate (typically a page break) rather than a real repeat.
+    seen = set()
+    unique = []
+    for t in transactions:
+        key = (t.date, t.description, t.credit, t.debit, t.balance)
+        if key not in seen:
+            seen.add(key)
+            unique.append(t)
+    return unique
+
+
+def build_statement_context(request: FinalizedStatementRequest, max_tokens: int = QA_CONTEXT_MAX_TOKENS) -> StatementContext:
+    """Render a statement as compact text for the Q&A assistant.
+
+    Only the finalized transactions are sent, as CSV grouped by month, after
+    a header, a table of monthly totals and one of detected recurring
+    series. When the result exceeds ``max_tokens``, the oldest months are
+    dropped to their monthly totals until it fits.
+    """
+    summary = request.summary
+    transactions = unique_transactions(request.finalizedTransactions)
+
+    by_month: "OrderedDict[str, List[TransactionModel]]" = OrderedDict()
+    for t in sorted(transactions, key=lambda t: t.date):
+        by_month.setdefault(t.date[:7], []).append(t)
+
+    header = (
+        f"Account: {summary.account_number} | Currency: {summary.currency or ''} | "
+        f"Period: {summary.period_start} to {summary.period_end}\n"
+        f"Opening balance: {_fmt(summary.opening_balance)} | Closing balance: {_fmt(summary.closing_balance)}\n\n"
+    )
+
+    monthly_rows = [["month", "money_in", "money_out", "net", "end_balance", "transactions"]]
+    for month, rows in by_month.items():
+        money_in = sum(t.credit or 0 for t in rows)
+        money_out = sum(t.debit or 0 for t in rows)
+        monthly_rows.append([month, _fmt(money_in), _fmt(money_out), _fmt(money_in - money_out), _fmt(rows[-1].balance), str(len(rows))])
+    monthly = "Monthly totals (CSV):\n" + _csv_rows(monthly_rows) + "\n"
+    recurring_rows = [["description", "direction", "period", "occurrences", "average_amount", "next_expected", "confidence"]]
+    for r in detect_recurring(transactions):
+        recurring_rows.append([r.description, r.direction, r.period, str(r.occurrences), _fmt(r.average_amount),
+                               r.next_expected.isoformat(), f"{r.confidence:.2f}"])
+    if len(recurring_rows) > 1:
+        monthly += "Recurring payments and income (CSV):\n" + _csv_rows(recurring_rows) + "\n"
+
+    tx_header = "Transactions (CSV: date,description,credit,debit,balance):\n"
+    blocks: Dict[str, str] = {
+        month: _csv_rows([[t.date, t.description, _fmt(t.credit), _fmt(t.debit), _fmt(t.balance)] for t in rows])
+        for month, rows in by_month.items()
+    }
+    block_tokens = {month: count_tokens(block) for month, block in blocks.items()}
+
+    fixed_tokens = count_tokens(header + monthly + tx_header)
+    total = fixed_tokens + sum(block_tokens.values())
+    summarized: List[str] = []
+    months = list(blocks)
+    # Keep at least the latest month in full even if it alone is over budget.
+    while total > max_tokens and len(summarized) < len(months) - 1:
+        month = months[len(summarized)]
+        summarized.append(month)
+        total -= block_tokens[month]
+
+    text = header + monthly
+    if summarized:
+        text += f"Transactions up to {summarized[-1]} are only summarised in the monthly totals above.\n\n"
+    text += tx_header + "".join(blocks[m] for m in months[len(summarized):])
+
+    token_count = count_tokens(text)
+    if token_count > max_tokens:
+        logging.warning("Statement context is %d tokens, over the %d token budget", token_count, max_tokens)
+    return StatementContext(text=text, token_count=token_count, summarized_months=summarized)
@@ -0,0 +1,167 @@
+import logging
+import re
+from datetime import date, datetime
+from typing import List, Optional, Sequence, Tuple
+
+import pandas as pd
+from dateutil import parser
+
+# Candidate layouts, in tie-break order. Month-first comes before day-first
+# so an ambiguous statement parses the way dateutil did by default.
+FULL_FORMATS = [
+    "%Y-%m-%d", "%Y/%m/%d",
+    "%m/%d/%Y", "%d/%m/%Y", "%m-%d-%Y", "%d-%m-%Y", "%d.%m.%Y",
+    "%m/%d/%y", "%d/%m/%y", "%m-%d-%y", "%d-%m-%y", "%d.%m.%y",
+    "%d %b %Y", "%d %B %Y", "%d-%b-%Y", "%d-%b-%y", "%d %b %y",
+    "%b %d %Y", "%B %d %Y", "%b %d, %Y", "%B %d, %Y",
+    "%Y-%m-%dT%H:%M:%S",
+]
+# Layouts without a year; the year comes from the statement period.
+YEARLESS_FORMATS = ["%m/%d", "%d/%m", "%d %b", "%d %B", "%b %d", "%B %d", "%d-%b"]
+
+SAMPLE_SIZE = 50
+# Any year works for parsing yearless dates as long as it is a leap year (29 Feb).
+_LEAP_YEAR = "2000"
+
+_ORDINAL = re.compile(r"(?<=\d)(st|nd|rd|th)\b", re.IGNORECASE)
+_SPACES = re.compile(r"\s+")
+
+
+def _clean(values: pd.Series) -> pd.Series:
+    values = values.fillna("").astype(str).str.strip()
+    values = values.str.replace(_ORDINAL, "", regex=True)
+    return values.str.replace(_SPACES, " ", regex=True)
+
+
+def _parse(values: pd.Series, fmt: str) -> pd.Series:
+    if fmt in YEARLESS_FORMATS:
+        return pd.to_datetime(values + " " + _LEAP_YEAR, format=fmt + " %Y", errors="coerce")
+    return pd.to_datetime(values, format=fmt, errors="coerce")
+
+
+def _matches(value: str, fmt: str) -> bool:
+    try:
+        if fmt in YEARLESS_FORMATS:
+            datetime.strptime(f"{value} {_LEAP_YEAR}", f"{fmt} %Y")
+        else:
+            datetime.strptime(value, fmt)
+    except ValueError:
+        return False
+    return True
+
+
+def infer_format(values: Sequence[str], period: Tuple[Optional[date], Optional[date]] = (None, None)) -> Optional[str]:
+    """Pick the layout that parses most of a sample, preferring chronological, in-period results."""
+    sample = pd.Series(list(dict.fromkeys(v for v in values if v)), dtype=object).head(SAMPLE_SIZE)
+    sample = _clean(sample)
+    if sample.empty:
+        return None
+
+    start, end = period
+    best, best_score = None, (0, 0, 0)
+    for fmt in FULL_FORMATS + YEARLESS_FORMATS:
+        # Cheap screen on a few values before parsing the whole sample.
+        if not any(_matches(value, fmt) for value in sample.head(3)):
+            continue
+        parsed = _parse(sample, fmt).dropna()
+        if parsed.empty:
+            continue
+        in_period = len(parsed)
+        if fmt not in YEARLESS_FORMATS and start and end:
+            in_period = int(parsed.between(pd.Timestamp(start), pd.Timestamp(end)).sum())
+        ordered = int((parsed.diff().dropna() >= pd.Timedelta(0)).sum())
+        # Strictly greater, so earlier candidates (full formats before
+        # yearless ones) win ties.
+        score = (len(parsed), in_period, ordered)
+        if score > best_score:
+            best, best_score = fmt, score
+    return best
+
+
+def _fill_years(parsed: pd.Series, period_end: Optional[date]) -> pd.Series:
+    if period_end is None:
+        year = pd.Series(datetime.now().year, index=parsed.index)
+    else:
+        year = pd.Series(period_end.year, index=parsed.index)
+        # A December row on a statement ending in January belongs to the previous year.
+        late = (parsed.dt.month > period_end.month) | (
+            (parsed.dt.month == period_end.month) & (parsed.dt.day > period_end.day)
+        )
+        year = year.where(~late, year - 1)
+    return pd.to_datetime(
+        pd.DataFrame({"year": year, "month": parsed.dt.month, "day": parsed.dt.day}), errors="coerce"
+    )
+
+
+def _fallback(value: str, dayfirst: bool, default: datetime) -> Optional[str]:
+    try:
+        return parser.parse(value, dayfirst=dayfirst, default=default, fuzzy=True).date().isoformat()
+    except (ValueError, OverflowError):
+        return None
+
+
+def normalize_dates(
+    values: Sequence[str],
+    fmt: Optional[str] = None,
+    period: Tuple[Optional[date], Optional[date]] = (None, None),
+) -> Tuple[List[str], List[int]]:
+    """Parse a column of dates to ISO strings in one pass.
+
+    Returns the normalized values and the indexes that could not be parsed
+    (those keep their original text).
+    """
+    raw = pd.Series(list(values), dtype=object)
+    cleaned = _clean(raw)
+    fmt = fmt or infer_format(cleaned, period)
+
+    if fmt is None:
+        parsed = pd.Series(pd.NaT, index=raw.index)
+    else:
+        parsed = _parse(cleaned, fmt)
+        if fmt in YEARLESS_FORMATS:
+            parsed = _fill_years(parsed, period[1])
+
+    result = parsed.dt.strftime("%Y-%m-%d").astype(object)
+    missing = result.isna() & (cleaned != "")
+    dayfirst = fmt is not None and "%d" in fmt and ("%m" not in fmt or fmt.index("%d") < fmt.index("%m"))
+    default = datetime((period[1] or date.today()).year, 1, 1)
+
+    failed = []
+    for i in missing[missing].index:
+        iso = _fallback(cleaned[i], dayfirst, default)
+        if iso is None:
+            failed.append(int(i))
+        result[i] = iso if iso is not None else raw[i]
+    result[cleaned == ""] = raw[cleaned == ""]
+    return result.tolist(), failed
+
+
+def _to_date(value: Optional[str]) -> Optional[date]:
+    try:
+        return date.fromisoformat(value) if value else None
+    except ValueError:
+        return None
+
+
+def normalize_statement_dates(statement) -> None:
+    """Rewrite a statement's period and transaction dates as ISO dates, in place."""
+    txn_dates = [t.date for t in statement.transactions]
+    fmt = infer_format(txn_dates + [statement.period_start, statement.period_end])
+
+    (period_start, period_end), failed = normalize_dates([statement.period_start, statement.period_end], fmt)
+    if failed:
+        logging.warning("Failed to parse statement period %s - %s", statement.period_start, statement.period_end)
+    statement.period_start, statement.period_end = period_start, period_end
+    period = (_to_date(period_start), _to_date(period_end))
+
+    # Re-check the format against the period now that it is known; this is
+    # what settles day/month order for statements where every day is <= 12.
+    fmt = infer_format(txn_dates, period) or fmt
+    dates, failed = normalize_dates(txn_dates, fmt, period)
+    for txn, value in zip(statement.transactions, dates):
+        txn.date = value
+    if failed:
+        logging.warning(
+            "Could not parse %d of %d transaction dates (e.g. %r)",
+            len(failed), len(txn_dates), txn_dates[failed[0]],
+        )
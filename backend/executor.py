@@ -0,0 +1,102 @@
+import asyncio
+import contextvars
+import functools
+import logging
+import os
+import threading
+from concurrent.futures import Executor, Future, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable, Optional
+
+
+class ExecutorBusyError(Exception):
+    pass
+
+
+class ExecutorTimeoutError(Exception):
+    pass
+
+
+class ExtractionExecutor:
+    """Bounded worker pool for blocking extraction jobs.
+
+    At most ``max_workers`` jobs run at once and up to ``max_queue`` more wait
+    for a worker. Submissions beyond that are rejected immediately with
+    ``ExecutorBusyError`` instead of piling up behind the event loop.
+    """
+
+    def __init__(self, kind: str = "thread", max_workers: int = 8, max_queue: int = 32, timeout: Optional[float] = 120.0):
+        if kind not in {"thread", "process"}:
+            raise ValueError(f"Unknown executor kind: {kind}")
+        self.kind = kind
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self.timeout = timeout
+        self._pool: Optional[Executor] = None
+        self._lock = threading.Lock()
+        self._pending = 0
+
+    @classmethod
+    def from_env(cls) -> "ExtractionExecutor":
+        timeout = float(os.getenv("EXTRACTION_TIMEOUT_SECONDS", "120"))
+        return cls(
+            kind=os.getenv("EXTRACTION_POOL", "thread"),
+            max_workers=int(os.getenv("EXTRACTION_WORKERS", "8")),
+            max_queue=int(os.getenv("EXTRACTION_QUEUE_SIZE", "32")),
+            timeout=timeout if timeout > 0 else None,
+        )
+
+    @property
+    def capacity(self) -> int:
+        return self.max_workers + self.max_queue
+
+    @property
+    def pending(self) -> int:
+        return self._pending
+
+    def _get_pool(self) -> Executor:
+        if self._pool is None:
+            if self.kind == "process":
+                self._pool = ProcessPoolExecutor(max_workers=self.max_workers)
+            else:
+                self._pool = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="extract")
+        return self._pool
+
+    def _release(self, _: Future) -> None:
+        with self._lock:
+            self._pending -= 1
+
+    async def run(self, fn: Callable[..., Any], *args: Any, timeout: Optional[float] = None) -> Any:
+        with self._lock:
+            if self._pending >= self.capacity:
+                raise ExecutorBusyError(f"Extraction queue is full ({self.capacity} jobs in flight)")
+            self._pending += 1
+
+        name = getattr(fn, "__name__", fn)
+        if self.kind == "thread":
+            # Carry the request's context (trace ID) into the worker thread.
+            fn = functools.partial(contextvars.copy_context().run, fn)
+        try:
+            future = self._get_pool().submit(fn, *args)
+        except Exception:
+            with self._lock:
+                self._pending -= 1
+            raise
+        # The slot is only freed here, once the future is finished or
+        # cancelled, so a timed out job that is still running keeps counting
+        # against the capacity.
+        future.add_done_callback(self._release)
+
+        timeout = timeout if timeout is not None else self.timeout
+        try:
+            return await asyncio.wait_for(asyncio.wrap_future(future), timeout=timeout)
+        except asyncio.TimeoutError:
+            # Drops the job if it is still queued; one already running cannot
+            # be interrupted and holds its slot until it returns.
+            future.cancel()
+            logging.warning("Extraction job %s timed out after %ss", name, timeout)
+            raise ExecutorTimeoutError(f"Extraction timed out after {timeout}s")
+
+    def shutdown(self) -> None:
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
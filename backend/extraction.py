@@ -0,0 +1,217 @@
+import contextvars
+import hashlib
+import json
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional
+
+
+from models import AnalysisResponse, BankStatement, StatementChunk, TransactionModel
+from bank_templates import TemplateRegistry
+from dates import normalize_statement_dates
+from llm import get_llm_provider
+from metrics import stage
+from ocr import ocr_pages, scanned_pages
+from pdf_text import extract_from_pdf_in_batches, page_count, page_texts
+from reconcile import BALANCE_TOLERANCE, flag_transactions
+
+EXTRACTION_MODEL = "gpt-4o-mini"
+# Bump whenever extraction or post-processing changes what a PDF turns into,
+# so cached results from the previous pipeline are no longer served.
+EXTRACTOR_VERSION = "6"
+
+CHUNK_PAGES = int(os.getenv("EXTRACTION_CHUNK_PAGES", "5"))
+CHUNK_CONCURRENCY = int(os.getenv("EXTRACTION_CHUNK_CONCURRENCY", "8"))
+# How many rows at a batch boundary are compared when removing duplicates.
+CHUNK_OVERLAP_ROWS = 5
+
+template_registry = TemplateRegistry.from_dir()
+
+
+def extraction_cache_version() -> str:
+    schema = json.dumps(AnalysisResponse.model_json_schema(), sort_keys=True)
+    schema_hash = hashlib.sha256(schema.encode()).hexdigest()[:12]
+    return f"{EXTRACTOR_VERSION}:{EXTRACTION_MODEL}:{CHUNK_PAGES}:{template_registry.version}:{schema_hash}"
+
+
+# Runs inside the extraction executor (thread or process pool), so everything
+# here must stay synchronous and importable at module level.
+def extract_statement(file_path: str) -> BankStatement:
+    with stage("template_extract"):
+        result = extract_with_known_template(file_path)
+    if result is not None:
+        with stage("normalize_dates"):
+            normalize_statement_dates(result)
+        return result
+
+    with stage("pdf_load"):
+        scanned = scanned_pages(file_path)
+        pages = page_count(file_path)
+    if scanned:
+        # Scanned pages have no text layer for pdfplumber, so the LLM works
+        # from page text with those pages filled in by OCR.
+        with stage("ocr"):
+            ocr_text = ocr_pages(file_path, scanned)
+        with stage("pdf_load"):
+            texts = page_texts(file_path, overrides=ocr_text)
+        if CHUNK_PAGES > 0 and len(texts) > CHUNK_PAGES:
+            batches = ["".join(texts[i:i + CHUNK_PAGES]) for i in range(0, len(texts), CHUNK_PAGES)]
+            result = extract_batches(batches, CHUNK_CONCURRENCY, os.path.basename(file_path))
+        else:
+            result = extract_text_statement("".join(texts))
+            result.filename = os.path.basename(file_path)
+    elif CHUNK_PAGES > 0 and pages > CHUNK_PAGES:
+        result = extract_statement_chunked(file_path, CHUNK_PAGES, CHUNK_CONCURRENCY)
+    else:
+        with stage("llm_extract"):
+            result = get_llm_provider().extract(file_path, BankStatement, EXTRACTION_MODEL, loader="pdf")
+
+    with stage("normalize_dates"):
+        normalize_statement_dates(result)
+    return result
+
+
+def extract_with_known_template(file_path: str) -> Optional[BankStatement]:
+    try:
+        result = template_registry.extract(file_path)
+    except Exception as e:
+        logging.warning("Bank template extraction failed for %s: %s", file_path, e)
+        return None
+    if result is None:
+        return None
+    # A template that reads the layout wrong shows up as balance mismatches;
+    # let the LLM have a go instead of handing those to the underwriter.
+    if not result.transactions or flag_transactions(result):
+        logging.info("Template output for %s failed balance checks, falling back to LLM", file_path)
+        return None
+    return result
+
+
+# --- Chunked extraction ---
+
+def extract_chunk(text: str) -> StatementChunk:
+    with stage("llm_extract"):
+        return get_llm_provider().extract(text, StatementChunk, EXTRACTION_MODEL, loader="text")
+
+
+def extract_text_statement(text: str) -> BankStatement:
+    with stage("llm_extract"):
+        return get_llm_provider().extract(text, BankStatement, EXTRACTION_MODEL, loader="text")
+
+
+def extract_statement_chunked(file_path: str, batch_size: int, concurrency: int) -> BankStatement:
+    with stage("pdf_load"):
+        batches = list(extract_from_pdf_in_batches(file_path, batch_size=batch_size))
+    logging.info("Extracting %s in %d batches of %d pages", file_path, len(batches), batch_size)
+    return extract_batches(batches, concurrency, os.path.basename(file_path))
+
+
+def extract_batches(batches: List[str], concurrency: int, filename: str) -> BankStatement:
+    # Each worker gets its own copy of the caller's context (trace ID).
+    context = contextvars.copy_context()
+    with ThreadPoolExecutor(max_workers=max(1, min(concurrency, len(batches)))) as pool:
+        # map() keeps results in batch order regardless of completion order.
+        chunks = list(pool.map(lambda batch: context.copy().run(extract_chunk, batch), batches))
+    return merge_chunks(chunks, filename=filename)
+
+
+def _row_key(txn: TransactionModel) -> tuple:
+    # Descriptions are left out on purpose: the LLM often renders the same
+    # row slightly differently in two batches, while the amounts and the
+    # running balance are what actually identify it.
+    return (txn.date, round(txn.credit or 0, 2), round(txn.debit or 0, 2), round(txn.balance, 2))
+
+
+def _balance_before(chunk: StatementChunk, j: int) -> Optional[float]:
+    """Running balance just before ``chunk.transactions[j]`` as the chunk itself reports it."""
+    rows = chunk.transactions
+    if j > 0:
+        return rows[j - 1].balance
+    if chunk.opening_balance is not None:
+        return chunk.opening_balance
+    if rows:
+        return rows[0].balance - (rows[0].credit or 0) + (rows[0].debit or 0)
+    return None
+
+
+def _continues(balance: Optional[float], expected: float) -> bool:
+    return balance is not None and abs(balance - expected) <= BALANCE_TOLERANCE
+
+
+def _amounts_match(merged: List[TransactionModel], incoming: List[TransactionModel], k: int) -> bool:
+    # Dates and descriptions are re-rendered between batches often enough
+    # that only the amounts and balances are compared here.
+    return all(_row_key(a)[1:] == _row_key(b)[1:] for a, b in zip(merged[-k:], incoming[:k]))
+
+
+def _boundary_overlap(merged: List[TransactionModel], expected: Optional[float], chunk: StatementChunk) -> int:
+    """Number of leading rows of ``chunk`` that repeat the tail of ``merged``.
+
+    ``expected`` is the balance the previous batch ended on. The overlap is
+    the one after which the chunk's running balance carries on from it; rows
+    that only look alike are not dropped when the balances say otherwise.
+    Without a balance to go on, identical rows at the boundary are dropped.
+    """
+    incoming = chunk.transactions
+    limit = min(CHUNK_OVERLAP_ROWS, len(merged), len(incoming))
+    by_rows = next((k for k in range(limit, 0, -1)
+                    if [_row_key(t) for t in merged[-k:]] == [_row_key(t) for t in incoming[:k]]), 0)
+    if expected is None:
+        return by_rows
+    continuous = [k for k in range(limit + 1) if _continues(_balance_before(chunk, k), expected)]
+    if by_rows in continuous:
+        return by_rows
+    return next((k for k in continuous if k == 0 or _amounts_match(merged, incoming, k)), by_rows)
+
+
+def merge_chunks(chunks: List[StatementChunk], filename: str = "") -> BankStatement:
+    def first(attr: str) -> Optional[object]:
+        return next((getattr(c, attr) for c in chunks if getattr(c, attr) is not None), None)
+
+    def last(attr: str) -> Optional[object]:
+        return next((getattr(c, attr) for c in reversed(chunks) if getattr(c, attr) is not None), None)
+
+    transactions: List[TransactionModel] = []
+    previous: Optional[StatementChunk] = None
+    for i, chunk in enumerate(chunks):
+        # The balance the statement has reached so far: the last row kept,
+        # or the previous batch's closing balance if nothing is kept yet.
+        expected = transactions[-1].balance if transactions else (previous.closing_balance if previous else None)
+        overlap = _boundary_overlap(transactions, expected, chunk)
+        if overlap:
+            logging.info("Dropping %d duplicated rows at batch boundary %d", overlap, i)
+        if expected is not None and overlap < len(chunk.transactions):
+            start = _balance_before(chunk, overlap)
+            if not _continues(start, expected):
+                # Rows between the batches were lost or misread; the gap also
+                # shows up as a balance flag on the first row of this batch.
+                logging.warning(
+                    "Balance gap at batch boundary %d of %s: previous batch ends at %.2f, next starts from %s",
+                    i, filename or "statement", expected, "unknown" if start is None else f"{start:.2f}",
+                )
+        transactions.extend(chunk.transactions[overlap:])
+        previous = chunk
+
+    # Stitch the running balance: the statement's opening balance is the
+    # balance before the first row, the closing balance is the last row's.
+    opening_balance = first("opening_balance")
+    if opening_balance is None and transactions:
+        t = transactions[0]
+        opening_balance = t.balance - (t.credit or 0) + (t.debit or 0)
+    closing_balance = last("closing_balance")
+    if closing_balance is None and transactions:
+        closing_balance = transactions[-1].balance
+
+    return BankStatement(
+        filename=filename,
+        account_number=first("account_number") or "",
+        period_start=first("period_start") or (transactions[0].date if transactions else ""),
+        period_end=last("period_end") or (transactions[-1].date if transactions else ""),
+        opening_balance=opening_balance,
+        closing_balance=closing_balance,
+        money_in=sum(t.credit or 0 for t in transactions),
+        money_out=sum(t.debit or 0 for t in transactions),
+        currency=first("currency"),
+        transactions=transactions,
+    )
@@ -0,0 +1,123 @@
+import asyncio
+import logging
+import os
+import time
+import uuid
+from collections import OrderedDict
+from typing import Awaitable, Callable, List, Optional, Set, Tuple
+
+from executor import ExecutorBusyError
+from models import AnalysisResponse, JobFileResult, JobStatus
+
+# Batch jobs retry when the shared extraction executor is full instead of
+# failing, so interactive uploads keep priority.
+BUSY_RETRY_DELAY = 2.0
+BUSY_MAX_RETRIES = 30
+
+
+class JobQueueFullError(Exception):
+    pass
+
+
+class Job:
+    def __init__(self, job_id: str, filenames: List[str]):
+        self.job_id = job_id
+        self.created_at = time.time()
+        self.files = [JobFileResult(filename=name, status="queued") for name in filenames]
+        self.done = asyncio.Event()
+
+    @property
+    def status(self) -> str:
+        statuses = {f.status for f in self.files}
+        if statuses <= {"done", "failed"}:
+            return "failed" if statuses == {"failed"} else "done"
+        if statuses == {"queued"}:
+            return "queued"
+        return "running"
+
+    def to_status(self, include_results: bool = False) -> JobStatus:
+        finished = sum(f.status in {"done", "failed"} for f in self.files)
+        return JobStatus(
+            job_id=self.job_id,
+            status=self.status,
+            total=len(self.files),
+            completed=finished,
+            failed=sum(f.status == "failed" for f in self.files),
+            progress=finished / len(self.files) if self.files else 1.0,
+            files=[f if include_results else f.model_copy(update={"result": None}) for f in self.files],
+        )
+
+
+class JobQueue:
+    """Runs batch uploads in the background with bounded concurrency.
+
+    ``handler(path, filename, content_hash)`` processes one file and returns
+    its AnalysisResponse. Finished jobs are kept for ``ttl_seconds`` and at most
+    ``max_jobs`` are retained; when all of them are still running, submit
+    raises JobQueueFullError.
+    """
+
+    def __init__(self, handler: Callable[[str, str, Optional[str]], Awaitable[AnalysisResponse]],
+                 concurrency: int = 4, max_jobs: int = 200, ttl_seconds: float = 3600):
+        self.handler = handler
+        self.max_jobs = max_jobs
+        self.ttl_seconds = ttl_seconds
+        self._semaphore = asyncio.Semaphore(concurrency)
+        self._jobs: "OrderedDict[str, Job]" = OrderedDict()
+        self._tasks: Set[asyncio.Task] = set()
+
+    @classmethod
+    def from_env(cls, handler: Callable[[str, str, Optional[str]], Awaitable[AnalysisResponse]]) -> "JobQueue":
+        return cls(
+            handler=handler,
+            concurrency=int(os.getenv("BATCH_JOB_CONCURRENCY", "4")),
+            max_jobs=int(os.getenv("BATCH_MAX_JOBS", "200")),
+            ttl_seconds=float(os.getenv("BATCH_JOB_TTL_SECONDS", "3600")),
+        )
+
+    def submit(self, files: List[Tuple[str, str, Optional[str]]]) -> Job:
+        """Queue ``(path, filename, content_hash)`` entries; the hash may be None."""
+        self._prune()
+        job = Job(uuid.uuid4().hex, [filename for _, filename, _ in files])
+        self._jobs[job.job_id] = job
+        for i, (path, _, content_hash) in enumerate(files):
+            task = asyncio.create_task(self._run_file(job, i, path, content_hash))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        return self._jobs.get(job_id)
+
+    async def _run_file(self, job: Job, i: int, path: str, content_hash: Optional[str]) -> None:
+        entry = job.files[i]
+        async with self._semaphore:
+            entry.status = "running"
+            for attempt in range(BUSY_MAX_RETRIES + 1):
+                try:
+                    entry.result = await self.handler(path, entry.filename, content_hash)
+                    entry.status = "done"
+                    break
+                except ExecutorBusyError as e:
+                    if attempt == BUSY_MAX_RETRIES:
+                        entry.status, entry.error = "failed", str(e)
+                    else:
+                        await asyncio.sleep(BUSY_RETRY_DELAY)
+                except Exception as e:
+                    logging.error("Batch job %s failed on %s: %s", job.job_id, entry.filename, e)
+                    entry.status, entry.error = "failed", str(e)
+                    break
+        if job.status in {"done", "failed"}:
+            job.done.set()
+
+    def _prune(self) -> None:
+        cutoff = time.time() - self.ttl_seconds
+        for job_id in [jid for jid, j in self._jobs.items() if j.done.is_set() and j.created_at < cutoff]:
+            del self._jobs[job_id]
+        # Past the limit, finished jobs go first, oldest first; running jobs
+        # are never dropped.
+        finished = [jid for jid, j in self._jobs.items() if j.done.is_set()]
+        while len(self._jobs) >= self.max_jobs and finished:
+            del self._jobs[finished.pop(0)]
+        if len(self._jobs) >= self.max_jobs:
+            raise JobQueueFullError(f"Too many batch jobs in progress ({self.max_jobs})")
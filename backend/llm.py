@@ -0,0 +1,378 @@
+import asyncio
+import functools
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from abc import ABC, abstractmethod
+from typing import AsyncIterator, Dict, List, Optional, Type, TypeVar
+
+from pydantic import BaseModel
+
+from metrics import record_tokens, stage
+
+T = TypeVar("T", bound=BaseModel)
+
+# Run polling for non-streaming assistant runs.
+RUN_POLL_INITIAL_DELAY = 0.2
+RUN_POLL_MAX_DELAY = 2.0
+RUN_POLL_BACKOFF = 1.5
+
+
+class LLMRunError(Exception):
+    pass
+
+
+class ReplayMissError(LookupError):
+    pass
+
+
+class LLMProvider(ABC):
+    """Everything the backend asks of a language model.
+
+    ``extract`` is synchronous because it runs inside the extraction
+    executor; the assistant calls are async and used from request handlers.
+    ``loader`` says whether ``source`` is a PDF path ("pdf") or plain text ("text").
+    """
+
+    @abstractmethod
+    def extract(self, source: str, response_model: Type[T], model: str, loader: str = "pdf") -> T:
+        raise NotImplementedError
+
+    @abstractmethod
+    async def complete(self, messages: List[dict], response_model: Type[T], model: str) -> T:
+        """One chat completion whose JSON reply is parsed into ``response_model``."""
+        raise NotImplementedError
+
+    @abstractmethod
+    async def create_assistant(self, name: str, instructions: str, model: str) -> str:
+        raise NotImplementedError
+
+    @abstractmethod
+    async def create_thread(self, messages: Optional[List[dict]] = None) -> str:
+        raise NotImplementedError
+
+    @abstractmethod
+    async def delete_thread(self, thread_id: str) -> None:
+        raise NotImplementedError
+
+    @abstractmethod
+    async def add_message(self, thread_id: str, content: str) -> None:
+        raise NotImplementedError
+
+    @abstractmethod
+    def stream_run(self, thread_id: str, assistant_id: str) -> AsyncIterator[str]:
+        """Run the assistant on the thread and yield its reply as text deltas."""
+        raise NotImplementedError
+
+    @abstractmethod
+    async def run(self, thread_id: str, assistant_id: str) -> Optional[str]:
+        """Run the assistant on the thread and return its reply."""
+        raise NotImplementedError
+
+
+class OpenAIProvider(LLMProvider):
+    """OpenAI Assistants for chat, extract_thinker (via LiteLLM) for extraction."""
+
+    def __init__(self, client=None):
+        if client is None:
+            from openai import AsyncOpenAI
+            client = AsyncOpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+        self.client = client
+        _count_litellm_tokens()
+
+    def extract(self, source: str, response_model: Type[T], model: str, loader: str = "pdf") -> T:
+        from extract_thinker import DocumentLoaderData, DocumentLoaderPdfPlumber, Extractor
+
+        extractor = Extractor()
+        extractor.load_document_loader(DocumentLoaderPdfPlumber() if loader == "pdf" else DocumentLoaderData())
+        extractor.load_llm(model)
+        return extractor.extract(source, response_model)
+
+    async def complete(self, messages: List[dict], response_model: Type[T], model: str) -> T:
+        import litellm
+
+        response = await litellm.acompletion(model=model, messages=messages, response_format={"type": "json_object"})
+        # The success callback only sees sync calls, so count this one here.
+        usage = getattr(response, "usage", None)
+        record_tokens("complete", getattr(usage, "prompt_tokens", None), getattr(usage, "completion_tokens", None))
+        return response_model.model_validate_json(response.choices[0].message.content)
+
+    async def create_assistant(self, name: str, instructions: str, model: str) -> str:
+        assistant = await self.client.beta.assistants.create(name=name, instructions=instructions, tools=[], model=model)
+        return assistant.id
+
+    async def create_thread(self, messages: Optional[List[dict]] = None) -> str:
+        thread = await self.client.beta.threads.create(messages=messages or [])
+        return thread.id
+
+    async def delete_thread(self, thread_id: str) -> None:
+        await self.client.beta.threads.delete(thread_id)
+
+    async def add_message(self, thread_id: str, content: str) -> None:
+        await self.client.beta.threads.messages.create(
+            thread_id=thread_id,
+            role="user",
+            content=[{"type": "text", "text": content}]
+        )
+
+    async def stream_run(self, thread_id: str, assistant_id: str) -> AsyncIterator[str]:
+        async with self.client.beta.threads.runs.stream(thread_id=thread_id, assistant_id=assistant_id) as stream:
+            async for delta in stream.text_deltas:
+                yield delta
+            run = await stream.get_final_run()
+        _record_run_usage(run)
+        if run.status != "completed":
+            raise LLMRunError(f"Run failed: {run.status}")
+
+    async def run(self, thread_id: str, assistant_id: str) -> Optional[str]:
+        run = await self.client.beta.threads.runs.create(thread_id=thread_id, assistant_id=assistant_id)
+        with stage("run_poll"):
+            _record_run_usage(await self._wait_for_run(thread_id, run.id))
+        messages = await self.client.beta.threads.messages.list(thread_id=thread_id)
+        for message in reversed(messages.data):
+            if message.role == "assistant":
+                return message.content[0].text.value
+        return None
+
+    async def _wait_for_run(self, thread_id: str, run_id: str):
+        # Runs usually finish within a couple of seconds, so poll quickly at first
+        # and back off for the long ones instead of sleeping a flat second.
+        delay = RUN_POLL_INITIAL_DELAY
+        while True:
+            status = await self.client.beta.threads.runs.retrieve(thread_id=thread_id, run_id=run_id)
+            if status.status == "completed":
+                return status
+            elif status.status in {"failed", "cancelled", "expired"}:
+                raise LLMRunError(f"Run failed: {status.status}")
+            await asyncio.sleep(delay)
+            delay = min(delay * RUN_POLL_BACKOFF, RUN_POLL_MAX_DELAY)
+
+
+def _record_run_usage(run) -> None:
+    usage = getattr(run, "usage", None)
+    record_tokens("assistant_run", getattr(usage, "prompt_tokens", None), getattr(usage, "completion_tokens", None))
+
+
+def _litellm_success(kwargs, response, start_time, end_time) -> None:
+    usage = getattr(response, "usage", None)
+    record_tokens("extract", getattr(usage, "prompt_tokens", None), getattr(usage, "completion_tokens", None))
+
+
+def _count_litellm_tokens() -> None:
+    # extract_thinker goes through LiteLLM and only hands back the parsed
+    # model, so token usage is picked up from LiteLLM's success callback.
+    import litellm
+
+    if _litellm_success not in litellm.success_callback:
+        litellm.success_callback.append(_litellm_success)
+
+
+# --- Record / replay ---
+
+def _digest(*parts: object) -> str:
+    payload = json.dumps(parts, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode()).hexdigest()[:24]
+
+
+def _file_digest(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class RecordReplayProvider(LLMProvider):
+    """Records another provider's responses to disk, or replays them offline.
+
+    Each call is keyed on what the model would see: the document (or its
+    content hash) and target schema for extraction, and the assistant plus
+    the full thread history for runs. In replay mode calls are answered from
+    ``directory`` with the recorded duration (times ``latency_scale``), or a
+    fixed ``latency_ms`` when one is set. With ``strict`` off, a call with no
+    recording gets another recording of the same kind, so varied synthetic
+    traffic can be replayed from a small recorded set.
+    """
+
+    def __init__(self, directory: str, inner: Optional[LLMProvider] = None, latency_ms: Optional[float] = None,
+                 latency_scale: float = 1.0, strict: bool = True):
+        self.directory = directory
+        self.inner = inner
+        self.latency_ms = latency_ms
+        self.latency_scale = latency_scale
+        self.strict = strict
+        # Assistant id -> stable key, and thread id -> messages so far; these
+        # stand in for server-side state when replaying.
+        self._assistants: Dict[str, str] = {}
+        self._threads: Dict[str, List[dict]] = {}
+        self._recordings: Dict[str, dict] = {}
+        self._by_kind: Dict[str, List[str]] = {}
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+        self._load()
+
+    @property
+    def recording(self) -> bool:
+        return self.inner is not None
+
+    @classmethod
+    def from_env(cls, inner: Optional[LLMProvider]) -> "RecordReplayProvider":
+        latency = os.getenv("LLM_REPLAY_LATENCY_MS")
+        return cls(
+            directory=os.getenv("LLM_RECORDINGS_DIR", "recordings"),
+            inner=inner,
+            latency_ms=float(latency) if latency else None,
+            latency_scale=float(os.getenv("LLM_REPLAY_LATENCY_SCALE", "1.0")),
+            strict=os.getenv("LLM_REPLAY_STRICT", "true").lower() != "false",
+        )
+
+    def _load(self) -> None:
+        for name in sorted(os.listdir(self.directory)):
+            if not name.endswith(".json"):
+                continue
+            try:
+                with open(os.path.join(self.directory, name)) as f:
+                    entry = json.load(f)
+            except (OSError, ValueError) as e:
+                logging.warning("Skipping LLM recording %s: %s", name, e)
+                continue
+            self._remember(entry)
+        logging.info("Loaded %d LLM recordings from %s", len(self._recordings), self.directory)
+
+    def _remember(self, entry: dict) -> None:
+        with self._lock:
+            if entry["key"] not in self._recordings:
+                self._by_kind.setdefault(entry["kind"], []).append(entry["key"])
+            self._recordings[entry["key"]] = entry
+
+    def _save(self, kind: str, key: str, response: object, duration: float, deltas: Optional[List[str]] = None,
+              first_delta: Optional[float] = None) -> None:
+        entry = {"kind": kind, "key": key, "response": response, "duration_s": round(duration, 4)}
+        if deltas is not None:
+            entry.update(deltas=deltas, first_delta_s=round(first_delta or 0.0, 4))
+        path = os.path.join(self.directory, f"{kind}-{key}.json")
+        tmp = f"{path}.{uuid.uuid4().hex}.tmp"
+        with open(tmp, "w") as f:
+            json.dump(entry, f)
+        os.replace(tmp, path)
+        self._remember(entry)
+
+    def _lookup(self, kind: str, key: str) -> dict:
+        entry = self._recordings.get(key)
+        if entry is not None:
+            return entry
+        candidates = self._by_kind.get(kind)
+        if self.strict or not candidates:
+            raise ReplayMissError(f"No recorded {kind} response for key {key} in {self.directory}")
+        return self._recordings[candidates[int(key, 16) % len(candidates)]]
+
+    def _delay(self, recorded: float) -> float:
+        if self.latency_ms is not None:
+            return self.latency_ms / 1000
+        return recorded * self.latency_scale
+
+    # Extraction
+
+    def extract(self, source: str, response_model: Type[T], model: str, loader: str = "pdf") -> T:
+        content = _file_digest(source) if loader == "pdf" else hashlib.sha256(source.encode()).hexdigest()
+        key = _digest("extract", response_model.__name__, model, loader, content)
+        if self.recording:
+            start = time.perf_counter()
+            result = self.inner.extract(source, response_model, model, loader)
+            self._save("extract", key, result.model_dump(), time.perf_counter() - start)
+            return result
+        entry = self._lookup("extract", key)
+        time.sleep(self._delay(entry["duration_s"]))
+        return response_model.model_validate(entry["response"])
+
+    async def complete(self, messages: List[dict], response_model: Type[T], model: str) -> T:
+        key = _digest("complete", response_model.__name__, model, messages)
+        if self.recording:
+            start = time.perf_counter()
+            result = await self.inner.complete(messages, response_model, model)
+            self._save("complete", key, result.model_dump(), time.perf_counter() - start)
+            return result
+        entry = self._lookup("complete", key)
+        await asyncio.sleep(self._delay(entry["duration_s"]))
+        return response_model.model_validate(entry["response"])
+
+    # Assistants
+
+    async def create_assistant(self, name: str, instructions: str, model: str) -> str:
+        key = _digest("assistant", name, instructions, model)
+        assistant_id = await self.inner.create_assistant(name, instructions, model) if self.recording else f"replay-asst-{key}"
+        self._assistants[assistant_id] = key
+        return assistant_id
+
+    async def create_thread(self, messages: Optional[List[dict]] = None) -> str:
+        thread_id = await self.inner.create_thread(messages) if self.recording else f"replay-thread-{uuid.uuid4().hex}"
+        self._threads[thread_id] = [{"role": m["role"], "content": m["content"]} for m in messages or []]
+        return thread_id
+
+    async def delete_thread(self, thread_id: str) -> None:
+        self._threads.pop(thread_id, None)
+        if self.recording:
+            await self.inner.delete_thread(thread_id)
+
+    async def add_message(self, thread_id: str, content: str) -> None:
+        self._threads.setdefault(thread_id, []).append({"role": "user", "content": content})
+        if self.recording:
+            await self.inner.add_message(thread_id, content)
+
+    def _run_key(self, thread_id: str, assistant_id: str) -> str:
+        return _digest("run", self._assistants.get(assistant_id, assistant_id), self._threads.get(thread_id, []))
+
+    async def stream_run(self, thread_id: str, assistant_id: str) -> AsyncIterator[str]:
+        key = self._run_key(thread_id, assistant_id)
+        deltas: List[str] = []
+        if self.recording:
+            start = time.perf_counter()
+            first_delta = None
+            async for delta in self.inner.stream_run(thread_id, assistant_id):
+                if first_delta is None:
+                    first_delta = time.perf_counter() - start
+                deltas.append(delta)
+                yield delta
+            self._save("run", key, "".join(deltas), time.perf_counter() - start, deltas, first_delta)
+        else:
+            entry = self._lookup("run", key)
+            deltas = entry.get("deltas") or [entry["response"]]
+            first = self._delay(entry.get("first_delta_s", entry["duration_s"]))
+            rest = 0.0 if self.latency_ms is not None else self._delay(entry["duration_s"]) - first
+            await asyncio.sleep(first)
+            for delta in deltas:
+                yield delta
+                if rest > 0:
+                    await asyncio.sleep(rest / len(deltas))
+        self._threads.setdefault(thread_id, []).append({"role": "assistant", "content": "".join(deltas)})
+
+    async def run(self, thread_id: str, assistant_id: str) -> Optional[str]:
+        key = self._run_key(thread_id, assistant_id)
+        if self.recording:
+            start = time.perf_counter()
+            reply = await self.inner.run(thread_id, assistant_id)
+            self._save("run", key, reply, time.perf_counter() - start)
+        else:
+            entry = self._lookup("run", key)
+            await asyncio.sleep(self._delay(entry["duration_s"]))
+            reply = entry["response"]
+        if reply is not None:
+            self._threads.setdefault(thread_id, []).append({"role": "assistant", "content": reply})
+        return reply
+
+
+@functools.lru_cache(maxsize=None)
+def get_llm_provider() -> LLMProvider:
+    """Process-wide provider chosen by LLM_PROVIDER: openai (default), record or replay."""
+    kind = os.getenv("LLM_PROVIDER", "openai")
+    if kind == "openai":
+        return OpenAIProvider()
+    if kind == "record":
+        return RecordReplayProvider.from_env(inner=OpenAIProvider())
+    if kind == "replay":
+        return RecordReplayProvider.from_env(inner=None)
+    raise ValueError(f"Unknown LLM_PROVIDER: {kind}")
@@ -0,0 +1,122 @@
+import os
+from typing import List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from analytics import transactions_frame
+from models import BankStatement, DistributionSummary, LoanScenario, LoanSimulationResult, TransactionModel
+from risk import month_coverage
+
+MAX_SCENARIOS = int(os.getenv("LOAN_SIM_MAX_SCENARIOS", "100000"))
+MAX_MONTHS = int(os.getenv("LOAN_SIM_MAX_MONTHS", "120"))
+# Months covering less than this share of their days are left out of the
+# history, unless that would leave fewer than two months.
+MIN_MONTH_COVERAGE = 0.75
+PERCENTILES = (5, 25, 50, 75, 95)
+
+
+def monthly_history(transactions: List[TransactionModel], opening_balance: Optional[float]) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Per calendar month: money in, money out, and the deepest dip below the month's opening balance.
+
+    The dip (zero or negative) is how far the balance fell within the month
+    before recovering; the simulation reapplies it so overdrafts between
+    month ends are not missed.
+    """
+    df = transactions_frame(transactions).dropna(subset=["date"]).sort_values("date", kind="stable")
+    if df.empty:
+        return np.empty(0), np.empty(0), np.empty(0)
+    months = pd.period_range(df["date"].iat[0], df["date"].iat[-1], freq="M")
+
+    balance = df["balance"].to_numpy()
+    first = opening_balance if opening_balance is not None else balance[0] - df["credit"].iat[0] + df["debit"].iat[0]
+    # Balance before each row: the previous row's, or the opening balance.
+    before = np.concatenate([[first], balance[:-1]])
+    codes = (df["date"].dt.year * 12 + df["date"].dt.month).to_numpy()
+    codes = codes - codes[0]
+    # Rows are date-sorted, so each month's rows are contiguous.
+    starts = np.minimum(np.searchsorted(codes, np.arange(len(months))), len(codes) - 1)
+    lowest = np.full(len(months), np.inf)
+    np.minimum.at(lowest, codes, balance)
+    # Months without rows have no dip.
+    dip = np.minimum(np.where(np.isfinite(lowest), lowest - before[starts], 0.0), 0.0)
+
+    income = np.bincount(codes, weights=df["credit"].to_numpy(), minlength=len(months))
+    expenses = np.bincount(codes, weights=df["debit"].to_numpy(), minlength=len(months))
+    full = month_coverage(df["date"], months) >= MIN_MONTH_COVERAGE
+    if full.sum() >= 2:
+        income, expenses, dip = income[full], expenses[full], dip[full]
+    return income, expenses, dip
+
+
+def _distribution(values: np.ndarray) -> DistributionSummary:
+    p = np.percentile(values, PERCENTILES)
+    return DistributionSummary(
+        mean=round(float(values.mean()), 2),
+        **{f"p{q}": round(float(v), 2) for q, v in zip(PERCENTILES, p)},
+    )
+
+
+def simulate_loan(summary: BankStatement, transactions: List[TransactionModel], scenario: LoanScenario) -> LoanSimulationResult:
+    """Monte Carlo the balance under ``scenario``'s repayment using the statement's own months.
+
+    ``bootstrap`` redraws whole historical months (income, expenses and
+    intra-month dip together, so their correlation is kept); ``normal``
+    draws monthly net flow from a normal fit and uses the average dip. All
+    scenarios run at once as a scenarios x months array.
+    """
+    if not 1 <= scenario.scenarios <= MAX_SCENARIOS:
+        raise ValueError(f"scenarios must be between 1 and {MAX_SCENARIOS}")
+    if not 1 <= scenario.months <= MAX_MONTHS:
+        raise ValueError(f"months must be between 1 and {MAX_MONTHS}")
+    if scenario.monthly_repayment < 0:
+        raise ValueError("monthly_repayment must not be negative")
+
+    income, expenses, dip = monthly_history(transactions, summary.opening_balance)
+    if len(income) == 0:
+        raise ValueError("No dated transactions to simulate from")
+    start = scenario.starting_balance
+    if start is None:
+        start = summary.closing_balance if summary.closing_balance is not None else float(transactions[-1].balance or 0.0)
+
+    rng = np.random.default_rng(scenario.seed)
+    shape = (scenario.scenarios, scenario.months)
+    net = income - expenses
+    if scenario.method == "normal":
+        flows = rng.normal(net.mean(), net.std(), size=shape)
+        dips = np.full(shape, dip.mean())
+    else:
+        draws = rng.integers(0, len(net), size=shape)
+        flows, dips = net[draws], dip[draws]
+    flows -= scenario.monthly_repayment
+
+    # Month-end balances; the repayment is assumed to leave at the start of
+    # each month, so the low point is the previous month end plus the dip,
+    # less the repayment.
+    month_end = start + np.cumsum(flows, axis=1)
+    month_start = np.concatenate([np.full((shape[0], 1), start), month_end[:, :-1]], axis=1)
+    lows = np.minimum(month_start - scenario.monthly_repayment + dips, month_end)
+    minimum = lows.min(axis=1)
+
+    overdrawn = lows < 0
+    ever = overdrawn.any(axis=1)
+    first_month = overdrawn.argmax(axis=1) + 1
+    monthly_outgoings = expenses.mean() + scenario.monthly_repayment
+    coverage = np.maximum(month_end[:, -1], 0.0) / monthly_outgoings if monthly_outgoings > 0 else np.zeros(shape[0])
+
+    return LoanSimulationResult(
+        method=scenario.method,
+        scenarios=scenario.scenarios,
+        months=scenario.months,
+        monthly_repayment=scenario.monthly_repayment,
+        starting_balance=round(float(start), 2),
+        history_months=len(income),
+        average_monthly_income=round(float(income.mean()), 2),
+        average_monthly_expenses=round(float(expenses.mean()), 2),
+        overdraft_probability=round(float(ever.mean()), 4),
+        overdraft_probability_by_month=np.round(np.maximum.accumulate(overdrawn, axis=1).mean(axis=0), 4).tolist(),
+        median_first_overdraft_month=int(np.median(first_month[ever])) if ever.any() else None,
+        minimum_balance=_distribution(minimum),
+        closing_balance=_distribution(month_end[:, -1]),
+        months_of_coverage=_distribution(coverage),
+    )
@@ -1,33 +1,77 @@
-from fastapi import FastAPI, File, UploadFile, HTTPException
-from fastapi.responses import JSONResponse
+from fastapi import FastAPI, Request, HTTPException
+from fastapi.responses import Response, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
-from typing import List, Optional, Union
+from typing import AsyncIterator, List, Optional, Union
 
-import shutil
 import os
+import zipfile
 import asyncio
 import logging
 import json
+import time
 from dotenv import load_dotenv
-from math import isclose
+from prometheus_client import CONTENT_TYPE_LATEST
 from models import *
-from dateutil import parser
 
-from extract_thinker import Extractor, DocumentLoaderPdfPlumber
-from openai import AsyncOpenAI
+from executor import ExtractionExecutor, ExecutorBusyError, ExecutorTimeoutError
+from extraction import extract_statement, extraction_cache_version
+from cache import ExtractionCache, sha256_file
+from analytics import compute_analysis, merge_qualitative
+from categorizer import Categorizer
+from loans import simulate_loan
+from uploads import InvalidUploadError, NotAPdfError, StoredUpload, UploadTooLargeError, receive_files, store_stream
+from sessions import QASession, SessionRegistry, new_session_id
+from context_builder import build_statement_context, warm_tokenizer
+from query_engine import TransactionIndex, answer_locally
+from reconcile import BalanceLedger, flag_transactions, suggest_repairs
+from statement_store import StatementStore
+from jobs import Job, JobQueue, JobQueueFullError
+from aggregation import combine_statements
+import ocr
+from llm import LLMRunError, get_llm_provider
+import metrics
+from metrics import stage
+from pipeline import Stage, StageGraph
 
 # --- Config & Setup ---
 load_dotenv()
-logging.basicConfig(level=logging.INFO)
+metrics.configure_logging()
 DASHBOARD_ASSISTANT_ID = os.getenv("DASHBOARD_ASSISTANT_ID")
+# "local" serves the locally computed analysis alone. "hybrid" also asks the
+# dashboard assistant for the free-text fields, and finalize waits for it
+# (up to FINALIZE_DASHBOARD_TIMEOUT_SECONDS).
+DASHBOARD_MODE = os.getenv("DASHBOARD_MODE", "local")
 UPLOAD_DIR = "uploads"
+MAX_BATCH_ZIP_MEMBERS = int(os.getenv("BATCH_MAX_ZIP_MEMBERS", "24"))
+# Per statement (PDF or zip member), and per request body. Upload bodies are
+# streamed to disk and refused as soon as they pass either limit.
+MAX_UPLOAD_BYTES = int(os.getenv("UPLOAD_MAX_BYTES", str(25 << 20)))
+MAX_BATCH_UPLOAD_BYTES = int(os.getenv("BATCH_MAX_UPLOAD_BYTES", str(200 << 20)))
+# Allowance for multipart boundaries and headers around the file itself.
+MULTIPART_OVERHEAD_BYTES = 64 << 10
+# Finalize runs Q&A setup, the local analysis and (in hybrid mode) the
+# dashboard assistant concurrently. Q&A setup that outlasts FINALIZE_QA_WAIT_SECONDS finishes in
+# the background; chat requests for that session wait for it.
+FINALIZE_QA_TIMEOUT_SECONDS = float(os.getenv("FINALIZE_QA_TIMEOUT_SECONDS", "60"))
+FINALIZE_QA_WAIT_SECONDS = float(os.getenv("FINALIZE_QA_WAIT_SECONDS", "2"))
+FINALIZE_DASHBOARD_TIMEOUT_SECONDS = float(os.getenv("FINALIZE_DASHBOARD_TIMEOUT_SECONDS", "60"))
 os.makedirs(UPLOAD_DIR, exist_ok=True)
 
-openAIClient = AsyncOpenAI(api_key=os.getenv("OPENAI_API_KEY"))
-
-# FIX: This is a hack for MVP, should implement thread management to support multiple users and statements
-qa_engine_assistant_thread_id = None
-qa_engine_assistant_id = None
+llm = get_llm_provider()
+extraction_executor = ExtractionExecutor.from_env()
+extraction_cache = ExtractionCache.from_env(extraction_cache_version())
+statement_store = StatementStore.from_env()
+categorizer = Categorizer.from_env()
+metrics.register_caches({
+    "extraction": extraction_cache.stats, "ocr": ocr.cache_stats, "categories": categorizer.memo.stats,
+})
+metrics.register_gauge("finsight_extraction_pending", "Extraction jobs running or queued",
+                       lambda: extraction_executor.pending)
+
+# One shared Q&A assistant per process; each session gets its own thread
+# carrying that statement's data. Set QA_ASSISTANT_ID to reuse one across restarts.
+QA_ASSISTANT_ID = os.getenv("QA_ASSISTANT_ID")
+qa_assistant_lock = asyncio.Lock()
 
 # --- FastAPI App ---
 app = FastAPI()
@@ -39,120 +83,359 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+@app.middleware("http")
+async def trace_and_time_requests(request: Request, call_next):
+    trace_id = metrics.new_trace_id(request.headers.get(metrics.TRACE_HEADER))
+    start = time.perf_counter()
+    status = 500
+    with stage("http"):
+        try:
+            response = await call_next(request)
+            status = response.status_code
+        finally:
+            route = request.scope.get("route")
+            metrics.HTTP_SECONDS.labels(
+                request.method, getattr(route, "path", "unmatched"), str(status)
+            ).observe(time.perf_counter() - start)
+    response.headers[metrics.TRACE_HEADER] = trace_id
+    return response
+
+@app.on_event("startup")
+async def start_session_sweeper() -> None:
+    app.state.session_sweeper = asyncio.create_task(qa_sessions.run_sweeper())
+
+@app.on_event("startup")
+async def load_tokenizer() -> None:
+    # Fetched here, not on the first finalize request.
+    await asyncio.to_thread(warm_tokenizer)
+
+@app.on_event("shutdown")
+def shutdown_extraction_executor() -> None:
+    extraction_executor.shutdown()
+    ocr.shutdown()
+    app.state.session_sweeper.cancel()
+
 # -- API Routes --
 @app.get("/", response_model=dict)
 async def root() -> dict:
     return {"message": "Bank Statement Analysis API"}
 
+@app.get("/metrics")
+async def prometheus_metrics() -> Response:
+    return Response(metrics.latest(), media_type=CONTENT_TYPE_LATEST)
+
 @app.post("/finalize-statement/", response_model=AnalysisResult)
 async def finalize_statement(data: FinalizedStatementRequest) -> AnalysisResult:
-    global qa_engine_assistant_thread_id
-    print("Finalized statement:", data)
+    logging.info("Finalizing statement %s with %d transactions",
+                 data.summary.filename, len(data.finalizedTransactions))
 
-    await create_q_and_a_assistant_thread(data)
+    session_id = data.session_id or new_session_id()
 
-    res = await generate_dashboard_with_assistant(data)
-    print("Financial data", res)
-    return AnalysisResult(**json.loads(res))
+    async def qa_session(_) -> QASession:
+        return await create_q_and_a_assistant_thread(data, session_id)
 
-@app.post("/upload-statement/", response_model=AnalysisResponse)
-async def upload_bank_statement(file: UploadFile = File(...)) -> Union[AnalysisResponse, JSONResponse]:
-    if not file.filename.endswith(".pdf"):
-        raise HTTPException(status_code=400, detail="Only PDF files are supported.")
+    async def dashboard(_) -> AnalysisResult:
+        return AnalysisResult(**json.loads(await generate_dashboard_with_assistant(data)))
 
-    file_location = os.path.join(UPLOAD_DIR, file.filename)
-    try:
-        with open(file_location, "wb") as buffer:
-            shutil.copyfileobj(file.file, buffer)
-        logging.info("File saved successfully: %s", file.filename)
+    async def categories(_) -> List[str]:
+        transactions = data.finalizedTransactions
+        return await categorizer.categorize([t.description for t in transactions], [t.debit for t in transactions])
 
-        statement_summary = await extract(file_location)
-        statement_summary.filename = file.filename
-
-        flagged = flag_inconsistencies(statement_summary)
-        print("Flagged transactions:", flagged)
-        return AnalysisResponse(
-            summary=statement_summary,
-            flagged=flagged
+    async def analysis(inputs) -> AnalysisResult:
+        return await asyncio.to_thread(
+            compute_analysis, data.summary, data.finalizedTransactions, categories=inputs["categories"]
         )
+
+    stages = [
+        Stage("qa_session", qa_session, timeout=FINALIZE_QA_TIMEOUT_SECONDS, detach_after=FINALIZE_QA_WAIT_SECONDS),
+        Stage("categories", categories),
+        Stage("analysis", analysis, after=("categories",)),
+    ]
+    if DASHBOARD_MODE == "hybrid" and DASHBOARD_ASSISTANT_ID:
+        stages.append(Stage("dashboard", dashboard, timeout=FINALIZE_DASHBOARD_TIMEOUT_SECONDS))
+    outcomes = await StageGraph("finalize", stages).run()
+
+    if not outcomes["analysis"].ok:
+        raise HTTPException(status_code=500, detail=f"Analysis failed: {outcomes['analysis'].error}")
+    result = outcomes["analysis"].value
+    if "dashboard" in outcomes:
+        if outcomes["dashboard"].ok:
+            result = merge_qualitative(result, outcomes["dashboard"].value)
+        else:
+            logging.warning("Dashboard assistant %s, serving local metrics only", outcomes["dashboard"].status)
+
+    qa = outcomes["qa_session"]
+    if qa.status == "pending":
+        qa_sessions.add_pending(session_id, qa.task)
+    result.session_id = session_id if qa.status in ("ok", "pending") else None
+    result.qa_status = "ready" if qa.ok else qa.status
+    return result
+
+@app.post("/simulate-loan/", response_model=LoanSimulationResult)
+async def simulate_loan_affordability(data: LoanSimulationRequest) -> LoanSimulationResult:
+    return await run_loan_simulation(data.summary, data.finalizedTransactions, data)
+
+async def run_loan_simulation(summary: BankStatement, transactions: List[TransactionModel],
+                              scenario: LoanScenario) -> LoanSimulationResult:
+    try:
+        with stage("loan_simulation"):
+            return await asyncio.to_thread(simulate_loan, summary, transactions, scenario)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@app.post("/finalize-combined/", response_model=CombinedAnalysisResult)
+async def finalize_combined_statements(data: CombinedStatementRequest) -> CombinedAnalysisResult:
+    statements = [s.summary.model_copy(update={"transactions": s.finalizedTransactions}) for s in data.statements]
+    for statement_id in data.statement_ids:
+        statements.append((await get_ledger(statement_id)).statement)
+    if not statements:
+        raise HTTPException(status_code=400, detail="No statements provided")
+
+    combined, report = combine_statements(statements)
+    analysis = await finalize_statement(FinalizedStatementRequest(
+        summary=combined.model_copy(update={"transactions": []}),
+        finalizedTransactions=combined.transactions,
+        session_id=data.session_id,
+    ))
+    return CombinedAnalysisResult(
+        analysis=analysis,
+        continuity_issues=report.continuity_issues,
+        duplicates_removed=report.duplicates_removed,
+        statement_count=len(statements),
+    )
+
+def multipart_body(field: str, many: bool = False) -> dict:
+    """OpenAPI request body for routes that read their multipart upload from the raw stream."""
+    schema = {"type": "string", "format": "binary"}
+    if many:
+        schema = {"type": "array", "items": schema}
+    return {"requestBody": {"required": True, "content": {"multipart/form-data": {"schema": {
+        "type": "object", "properties": {field: schema}, "required": [field],
+    }}}}}
+
+@app.post("/upload-statement/", response_model=AnalysisResponse, openapi_extra=multipart_body("file"))
+async def upload_bank_statement(request: Request) -> Union[AnalysisResponse, Response]:
+    uploads = await receive_uploads(request, MAX_UPLOAD_BYTES + MULTIPART_OVERHEAD_BYTES)
+    if len(uploads) != 1:
+        raise HTTPException(status_code=400, detail="Upload exactly one PDF file.")
+    upload = uploads[0]
+    logging.info("File saved successfully: %s (%d bytes)", upload.filename, upload.size)
+    try:
+        response = await process_statement(upload.path, upload.filename, upload.content_hash)
+        with stage("serialize_response"):
+            # Serialized here rather than by FastAPI so large statements are
+            # dumped once and the time shows up as its own stage.
+            return Response(response.model_dump_json(), media_type="application/json")
+    except ExecutorBusyError as e:
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": "5"})
+    except ExecutorTimeoutError as e:
+        raise HTTPException(status_code=504, detail=str(e))
     except Exception as e:
         logging.error("Error processing file: %s", e)
         raise HTTPException(status_code=500, detail=f"File parsing failed: {str(e)}")
 
+@app.post("/upload-statements/batch", response_model=JobStatus, status_code=202,
+          openapi_extra=multipart_body("files", many=True))
+async def upload_bank_statements_batch(request: Request) -> JobStatus:
+    saved: List[StoredUpload] = []
+    for upload in await receive_uploads(request, MAX_BATCH_UPLOAD_BYTES, archive_suffixes=(".zip",)):
+        if upload.filename.lower().endswith(".zip"):
+            saved.extend(await asyncio.to_thread(save_zip_statements, upload))
+        else:
+            saved.append(upload)
+    if not saved:
+        raise HTTPException(status_code=400, detail="No PDF statements found in upload.")
+
+    try:
+        job = batch_jobs.submit([(u.path, u.filename, u.content_hash) for u in saved])
+    except JobQueueFullError as e:
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": "30"})
+    return job.to_status()
+
+@app.get("/jobs/{job_id}", response_model=JobStatus)
+async def get_job_status(job_id: str) -> JobStatus:
+    return get_job(job_id).to_status()
+
+@app.get("/jobs/{job_id}/result", response_model=JobStatus)
+async def get_job_result(job_id: str) -> JobStatus:
+    return get_job(job_id).to_status(include_results=True)
+
+@app.get("/statements", response_model=List[StatementRecord])
+async def list_statements(account_number: Optional[str] = None, period_from: Optional[str] = None,
+                          period_to: Optional[str] = None, limit: int = 100) -> List[StatementRecord]:
+    return await asyncio.to_thread(statement_store.repository.find_statements, account_number, period_from, period_to, limit)
+
+@app.get("/statements/{statement_id}", response_model=AnalysisResponse)
+async def get_statement(statement_id: str) -> AnalysisResponse:
+    ledger = await get_ledger(statement_id)
+    return AnalysisResponse(
+        summary=ledger.statement,
+        flagged=[ledger.flags[i] for i in sorted(ledger.flags)],
+        statement_id=statement_id
+    )
+
+@app.patch("/statements/{statement_id}/transactions", response_model=ValidationDelta)
+async def edit_statement_transaction(statement_id: str, edit: TransactionEdit) -> ValidationDelta:
+    try:
+        delta = await asyncio.to_thread(statement_store.apply_edit, statement_id, edit.op, edit.index, edit.transaction)
+    except (IndexError, ValueError) as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if delta is None:
+        raise HTTPException(status_code=404, detail="Statement not found")
+    return delta
+
+@app.post("/statements/{statement_id}/finalize", response_model=AnalysisResult)
+async def finalize_stored_statement(statement_id: str, session_id: Optional[str] = None) -> AnalysisResult:
+    ledger = await get_ledger(statement_id)
+    result = await finalize_statement(FinalizedStatementRequest(
+        summary=ledger.statement.model_copy(update={"transactions": []}),
+        finalizedTransactions=ledger.statement.transactions,
+        session_id=session_id,
+    ))
+    await asyncio.to_thread(statement_store.save_analysis, statement_id, result)
+    return result
+
+@app.post("/statements/{statement_id}/simulate-loan", response_model=LoanSimulationResult)
+async def simulate_stored_statement_loan(statement_id: str, scenario: LoanScenario) -> LoanSimulationResult:
+    statement = (await get_ledger(statement_id)).statement
+    return await run_loan_simulation(statement, statement.transactions, scenario)
+
+@app.get("/statements/{statement_id}/analysis", response_model=AnalysisResult)
+async def get_statement_analysis(statement_id: str) -> AnalysisResult:
+    result = await asyncio.to_thread(statement_store.repository.load_analysis, statement_id)
+    if result is None:
+        raise HTTPException(status_code=404, detail="No analysis for this statement")
+    return result
+
+@app.get("/extraction-cache/stats", response_model=dict)
+async def extraction_cache_stats() -> dict:
+    return extraction_cache.stats()
+
 @app.post("/ask-question-in-thread/", response_model=ChatResponse)
 async def ask_question_in_thread(chat_request: ChatRequest) -> ChatResponse:
-    if qa_engine_assistant_thread_id is None:
-        raise HTTPException(status_code=400, detail="No thread ID provided")
-
-    res = await ask_question_in_thread(qa_engine_assistant_thread_id, chat_request.question)
-    print("Chat response:", res)
+    session = await get_chat_session(chat_request)
+    res = answer_locally(session.query_index, chat_request.question)
+    if res is None:
+        res = await ask_question_in_thread(session.thread_id, chat_request.question)
+    logging.debug("Chat response: %d characters", len(res))
     return ChatResponse(answer=res)
 
+@app.post("/ask-question-in-thread/stream")
+async def ask_question_in_thread_stream(chat_request: ChatRequest) -> StreamingResponse:
+    session = await get_chat_session(chat_request)
+
+    async def events() -> AsyncIterator[str]:
+        local_answer = answer_locally(session.query_index, chat_request.question)
+        if local_answer is not None:
+            yield sse_event("delta", {"text": local_answer})
+            yield sse_event("done", {})
+            return
+        try:
+            async for delta in stream_answer(session.thread_id, chat_request.question):
+                yield sse_event("delta", {"text": delta})
+            yield sse_event("done", {})
+        except Exception as e:
+            logging.error("Streaming answer failed: %s", e)
+            yield sse_event("error", {"detail": str(e)})
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
 # --- Core Logic Functions ---
 
 def flag_inconsistencies(statement: "BankStatement") -> List["FlaggedTransaction"]:
-    flagged = []
-    if statement.opening_balance is None or statement.closing_balance is None:
-        return flagged
-
-    prev_balance = statement.opening_balance
-
-    for i, tx in enumerate(statement.transactions):
-        net_change = (tx.credit or 0) - (tx.debit or 0)
-        expected = prev_balance + net_change
-
-        if not isclose(expected, tx.balance, abs_tol=0.01):
-            flagged.append(FlaggedTransaction(
-                index=i,
-                issue=f"Expected balance: {expected:.2f}, Found: {tx.balance:.2f}",
-                transaction=tx,
-                previous_balance=prev_balance,
-                current_balance=tx.balance
-            ))
-        prev_balance = tx.balance
-
-    if not isclose(prev_balance, statement.closing_balance, abs_tol=0.01):
-        flagged.append(FlaggedTransaction(
-            index=len(statement.transactions),
-            issue=f"Final balance mismatch. Expected: {statement.closing_balance:.2f}, Found: {prev_balance:.2f}"
-        ))
-
-    return flagged
+    with stage("flag_inconsistencies"):
+        return flag_transactions(statement)
 
 async def extract(file_path: str) -> "BankStatement":
-    extractor = Extractor()
-    extractor.load_document_loader(DocumentLoaderPdfPlumber())
-    extractor.load_llm("gpt-4o-mini")
-    result = extractor.extract(file_path, BankStatement)
+    return await extraction_executor.run(extract_statement, file_path)
+
+async def process_statement(file_location: str, filename: str, content_hash: Optional[str] = None) -> AnalysisResponse:
+    if content_hash is None:
+        with stage("hash_upload"):
+            content_hash = await asyncio.to_thread(sha256_file, file_location)
+    cached = await asyncio.to_thread(extraction_cache.get, content_hash)
+    if cached is not None:
+        logging.info("Extraction cache hit for %s (%s)", filename, content_hash)
+        cached.summary.filename = filename
+        cached.statement_id = await asyncio.to_thread(statement_store.put, cached.summary, content_hash)
+        return cached
+
+    with stage("extract"):
+        statement_summary = await extract(file_location)
+    statement_summary.filename = filename
+
+    flagged = flag_inconsistencies(statement_summary)
+    logging.info("Flagged %d of %d transactions in %s", len(flagged), len(statement_summary.transactions), filename)
+    with stage("suggest_repairs"):
+        repairs = suggest_repairs(statement_summary)
+    response = AnalysisResponse(
+        summary=statement_summary,
+        flagged=flagged,
+        repairs=repairs
+    )
+    await asyncio.to_thread(extraction_cache.put, content_hash, response)
+    response.statement_id = await asyncio.to_thread(statement_store.put, statement_summary, content_hash)
+    return response
 
-    for attr in ["period_start", "period_end"]:
-        try:
-            setattr(result, attr, parser.parse(getattr(result, attr)).date().isoformat())
-        except Exception as e:
-            logging.warning("Failed to parse %s: %s", attr, e)
+batch_jobs = JobQueue.from_env(handler=process_statement)
 
-    for txn in result.transactions:
-        try:
-            txn.date = parser.parse(txn.date).date().isoformat()
-        except Exception as e:
-            logging.warning("Bad txn date '%s': %s", txn.date, e)
-        logging.info("%s | %s | %0.2f | %0.2f | %0.2f", txn.date, txn.description, txn.credit, txn.debit, txn.balance)
+async def get_ledger(statement_id: str) -> BalanceLedger:
+    ledger = await asyncio.to_thread(statement_store.get, statement_id)
+    if ledger is None:
+        raise HTTPException(status_code=404, detail=f"Statement not found: {statement_id}")
+    return ledger
 
-    return result
+def get_job(job_id: str) -> Job:
+    job = batch_jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+async def receive_uploads(request: Request, max_request_bytes: int, archive_suffixes: tuple = ()) -> List[StoredUpload]:
+    try:
+        with stage("upload_write"):
+            return await receive_files(
+                request.stream(), request.headers.get("content-type", ""), request.headers.get("content-length"),
+                UPLOAD_DIR, MAX_UPLOAD_BYTES, max_request_bytes, archive_suffixes,
+            )
+    except UploadTooLargeError as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except (NotAPdfError, InvalidUploadError) as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+def save_zip_statements(upload: StoredUpload) -> List[StoredUpload]:
+    """Unpack an uploaded zip and remove it. Blocking; run it off the event loop."""
+    saved = []
+    try:
+        with zipfile.ZipFile(upload.path) as archive:
+            members = [m for m in archive.infolist() if not m.is_dir() and m.filename.lower().endswith(".pdf")]
+            if len(members) > MAX_BATCH_ZIP_MEMBERS:
+                raise HTTPException(status_code=400, detail=f"Zip contains more than {MAX_BATCH_ZIP_MEMBERS} statements.")
+            for member in members:
+                # Members are read through the same size and header checks as
+                # direct uploads, so a small zip cannot inflate past the limit.
+                with archive.open(member) as source:
+                    saved.append(store_stream(source, os.path.basename(member.filename), UPLOAD_DIR, MAX_UPLOAD_BYTES))
+    except zipfile.BadZipFile:
+        raise HTTPException(status_code=400, detail=f"Invalid zip file: {upload.filename}")
+    except UploadTooLargeError as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except NotAPdfError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    finally:
+        os.remove(upload.path)
+    return saved
 
 
 # -- Assistant Functions --
-async def create_q_and_a_assistant_thread(finalized_statement: FinalizedStatementRequest):
-    global qa_engine_assistant_thread_id
-    global qa_engine_assistant_id
-
-    SYSTEM_PROMPT = f"""
+QA_SYSTEM_PROMPT = """
 You are a financial assistant that analyzes structured personal bank statements using only the provided data.
 
-Do not respond unless the user asks a specific financial question. Do not say "I'm ready" or "How can I help?" or provide any output unless a question is asked.
-
-Data:
-{json.dumps(finalized_statement.model_dump())}
+The statement data is provided as the first message of the thread. Do not respond to it. Do not say "I'm ready" or "How can I help?" or provide any output unless a question is asked.
 
 Rules:
 - Answer only when the user asks a financial question.
@@ -164,81 +447,93 @@ Rules:
 Do not generate any output until the user asks a question.
 """
 
-    print("System prompt: ", SYSTEM_PROMPT)
-    assistant = await openAIClient.beta.assistants.create(
-    name="QA Chatbot Assistant",
-    instructions=SYSTEM_PROMPT,
-    tools=[],
-    model="gpt-4o-mini"
+async def get_qa_assistant_id() -> str:
+    global QA_ASSISTANT_ID
+    async with qa_assistant_lock:
+        if QA_ASSISTANT_ID is None:
+            with stage("assistant_create"):
+                QA_ASSISTANT_ID = await llm.create_assistant(
+                    name="QA Chatbot Assistant",
+                    instructions=QA_SYSTEM_PROMPT,
+                    model="gpt-4o-mini"
+                )
+            logging.info("Created shared QA assistant %s", QA_ASSISTANT_ID)
+    return QA_ASSISTANT_ID
+
+async def delete_session_thread(session: QASession) -> None:
+    await llm.delete_thread(session.thread_id)
+
+qa_sessions = SessionRegistry.from_env(on_evict=delete_session_thread)
+metrics.register_gauge("finsight_qa_sessions", "Open Q&A chat sessions", lambda: len(qa_sessions))
+
+async def get_chat_session(chat_request: ChatRequest) -> QASession:
+    session = await qa_sessions.wait(chat_request.session_id) if chat_request.session_id else None
+    if session is None:
+        raise HTTPException(status_code=400, detail="Unknown or expired chat session")
+    return session
+
+def build_query_index(finalized_statement: FinalizedStatementRequest) -> TransactionIndex:
+    transactions = finalized_statement.finalizedTransactions
+    return TransactionIndex(
+        transactions,
+        finalized_statement.summary.currency,
+        categorizer.categorize_local([t.description for t in transactions])[0],
     )
 
-
-    thread = await openAIClient.beta.threads.create()
-
-    qa_engine_assistant_thread_id = thread.id
-    qa_engine_assistant_id = assistant.id
-    return 
+async def create_q_and_a_assistant_thread(finalized_statement: FinalizedStatementRequest, session_id: str) -> QASession:
+    # Tokenizing the context and indexing the rows are CPU-bound; both run in
+    # worker threads so the other finalize stages keep going meanwhile.
+    index_task = asyncio.create_task(asyncio.to_thread(build_query_index, finalized_statement))
+    try:
+        with stage("build_context"):
+            context = await asyncio.to_thread(build_statement_context, finalized_statement)
+        logging.info("Q&A context for session %s: %d tokens, %d months summarised",
+                     session_id, context.token_count, len(context.summarized_months))
+        with stage("thread_create"):
+            thread_id = await llm.create_thread([{"role": "user", "content": f"Data:\n{context.text}"}])
+        query_index = await index_task
+    finally:
+        index_task.cancel()
+
+    session = QASession(session_id=session_id, thread_id=thread_id, query_index=query_index)
+    qa_sessions.put(session)
+    return session
+
+def sse_event(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
 
 # Bank QA Assistant chat
-async def ask_question_in_thread(thread_id: str, question: str) -> str:
-    # 1. Add user message
-    await openAIClient.beta.threads.messages.create(
-        thread_id=thread_id,
-        role="user",
-        content=[{"type": "text", "text": question}]
-    )
-
-    # 2. Start run
-    run = await openAIClient.beta.threads.runs.create(
-        thread_id=thread_id,
-        assistant_id=qa_engine_assistant_id
-    )
-
-    # 3. Wait for run to complete
-    while True:
-        status = await openAIClient.beta.threads.runs.retrieve(thread_id=thread_id, run_id=run.id)
-        if status.status == "completed":
-            break
-        elif status.status in {"failed", "cancelled", "expired"}:
-            raise HTTPException(status_code=500, detail=f"Run failed: {status.status}")
-        await asyncio.sleep(1)
-
-    # 4. Fetch only messages generated after this run
-    messages = await openAIClient.beta.threads.messages.list(thread_id=thread_id, limit=20)
-
-    # Find the latest assistant message associated with this run
-    for message in messages.data:
-        if message.run_id == run.id and message.role == "assistant":
-            print("Assistant reply:", message)
-            return message.content[0].text.value
+async def stream_answer(thread_id: str, question: str) -> AsyncIterator[str]:
+    await llm.add_message(thread_id, question)
+    assistant_id = await get_qa_assistant_id()
+    try:
+        with stage("assistant_stream"):
+            async for delta in llm.stream_run(thread_id, assistant_id):
+                yield delta
+    except LLMRunError as e:
+        raise HTTPException(status_code=500, detail=str(e))
 
-    raise HTTPException(status_code=500, detail="No new assistant reply found.")
+async def ask_question_in_thread(thread_id: str, question: str) -> str:
+    answer = "".join([delta async for delta in stream_answer(thread_id, question)])
+    if not answer:
+        raise HTTPException(status_code=500, detail="No new assistant reply found.")
+    return answer
 
 
 # Dashboard Assistant  
 async def generate_dashboard_with_assistant(data: FinalizedStatementRequest) -> str:
-    thread = await openAIClient.beta.threads.create()
-    await openAIClient.beta.threads.messages.create(
-        thread_id=thread.id,
-        role="user",
-        content=json.dumps(data.dict())
-    )
-    run = await openAIClient.beta.threads.runs.create(
-        thread_id=thread.id,
-        assistant_id=DASHBOARD_ASSISTANT_ID
-    )
-
-    while True:
-        status = await openAIClient.beta.threads.runs.retrieve(thread_id=thread.id, run_id=run.id)
-        if status.status == "completed":
-            break
-        elif status.status in {"failed", "cancelled", "expired"}:
-            raise HTTPException(status_code=500, detail=f"Run failed: {status.status}")
-        await asyncio.sleep(1)
-
-    messages = await openAIClient.beta.threads.messages.list(thread_id=thread.id)
-    for message in reversed(messages.data):
-        if message.role == "assistant":
-            return message.content[0].text.value
-
-    raise HTTPException(status_code=500, detail="No assistant reply found.")
+    thread_id = await llm.create_thread([{"role": "user", "content": json.dumps(data.dict())}])
+    try:
+        with stage("dashboard_run"):
+            reply = await llm.run(thread_id, DASHBOARD_ASSISTANT_ID)
+    except LLMRunError as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    finally:
+        # One-shot thread; also runs when the finalize stage times out.
+        try:
+            await llm.delete_thread(thread_id)
+        except Exception as e:
+            logging.warning("Failed to delete dashboard thread %s: %s", thread_id, e)
+    if reply is None:
+        raise HTTPException(status_code=500, detail="No assistant reply found.")
+    return reply
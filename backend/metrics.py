@@ -0,0 +1,106 @@
+import contextvars
+import logging
+import os
+import time
+import uuid
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, Optional
+
+from prometheus_client import REGISTRY, Counter, Gauge, Histogram, generate_latest
+from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily
+
+# Metrics live in each process's default registry; stages that run inside a
+# process-pool worker (EXTRACTION_POOL=process, OCR) are not visible here.
+
+LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+
+STAGE_SECONDS = Histogram("finsight_stage_seconds", "Time spent per pipeline stage", ["stage"], buckets=LATENCY_BUCKETS)
+STAGE_ERRORS = Counter("finsight_stage_errors_total", "Pipeline stages that raised", ["stage"])
+IN_FLIGHT = Gauge("finsight_in_flight", "Pipeline stages currently running", ["stage"])
+HTTP_SECONDS = Histogram(
+    "finsight_http_request_seconds", "HTTP request latency", ["method", "route", "status"], buckets=LATENCY_BUCKETS
+)
+LLM_TOKENS = Counter("finsight_llm_tokens_total", "Tokens used per LLM call type", ["call", "kind"])
+LLM_CALLS = Counter("finsight_llm_calls_total", "LLM calls", ["call"])
+
+TRACE_HEADER = "X-Request-ID"
+trace_id_var: contextvars.ContextVar[str] = contextvars.ContextVar("trace_id", default="-")
+
+
+def new_trace_id(incoming: Optional[str] = None) -> str:
+    trace_id = (incoming or uuid.uuid4().hex[:16])[:64]
+    trace_id_var.set(trace_id)
+    return trace_id
+
+
+@contextmanager
+def stage(name: str) -> Iterator[None]:
+    """Time a block as pipeline stage ``name`` and count it as in flight meanwhile."""
+    IN_FLIGHT.labels(name).inc()
+    start = time.perf_counter()
+    try:
+        yield
+    except BaseException:
+        STAGE_ERRORS.labels(name).inc()
+        raise
+    finally:
+        elapsed = time.perf_counter() - start
+        IN_FLIGHT.labels(name).dec()
+        STAGE_SECONDS.labels(name).observe(elapsed)
+        logging.debug("stage=%s duration_ms=%.1f", name, elapsed * 1000)
+
+
+def record_tokens(call: str, prompt_tokens: Optional[int], completion_tokens: Optional[int]) -> None:
+    LLM_CALLS.labels(call).inc()
+    if prompt_tokens:
+        LLM_TOKENS.labels(call, "prompt").inc(prompt_tokens)
+    if completion_tokens:
+        LLM_TOKENS.labels(call, "completion").inc(completion_tokens)
+
+
+class CacheCollector:
+    """Exposes a cache's own hit/miss counters, read at scrape time."""
+
+    def __init__(self, caches: Dict[str, Callable[[], dict]]):
+        self.caches = caches
+
+    def collect(self):
+        lookups = CounterMetricFamily("finsight_cache_lookups", "Cache lookups by result", labels=["cache", "result"])
+        ratio = GaugeMetricFamily("finsight_cache_hit_ratio", "Cache hits over lookups since start", labels=["cache"])
+        for name, stats_fn in self.caches.items():
+            stats = stats_fn()
+            lookups.add_metric([name, "hit"], stats["hits"])
+            lookups.add_metric([name, "miss"], stats["misses"])
+            ratio.add_metric([name], stats["hit_ratio"])
+        yield lookups
+        yield ratio
+
+
+def register_caches(caches: Dict[str, Callable[[], dict]]) -> None:
+    REGISTRY.register(CacheCollector(caches))
+
+
+def register_gauge(name: str, description: str, fn: Callable[[], float]) -> None:
+    Gauge(name, description).set_function(fn)
+
+
+def latest() -> bytes:
+    return generate_latest(REGISTRY)
+
+
+# --- Logging ---
+
+class TraceIdFilter(logging.Filter):
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.trace_id = trace_id_var.get()
+        return True
+
+
+def configure_logging(level: int = logging.INFO) -> None:
+    """Set up root logging, with the request trace ID on every line when LOG_TRACE_IDS is on."""
+    if os.getenv("LOG_TRACE_IDS", "false").lower() == "true":
+        logging.basicConfig(level=level, format="%(asctime)s %(levelname)s [%(trace_id)s] %(name)s: %(message)s")
+        for handler in logging.getLogger().handlers:
+            handler.addFilter(TraceIdFilter())
+    else:
+        logging.basicConfig(level=level)
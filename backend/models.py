@@ -1,5 +1,5 @@
 from pydantic import BaseModel
-from typing import List, Optional
+from typing import List, Literal, Optional
 
 class TransactionModel(BaseModel):
     date: str
@@ -20,6 +20,15 @@ class BankStatement(BaseModel):
     currency: Optional[str]
     transactions: List[TransactionModel]
 
+class StatementChunk(BaseModel):
+    account_number: Optional[str] = None
+    period_start: Optional[str] = None
+    period_end: Optional[str] = None
+    opening_balance: Optional[float] = None
+    closing_balance: Optional[float] = None
+    currency: Optional[str] = None
+    transactions: List[TransactionModel]
+
 class FlaggedTransaction(BaseModel):
     index: int
     issue: str
@@ -27,13 +36,76 @@ class FlaggedTransaction(BaseModel):
     previous_balance: Optional[float] = None
     current_balance: Optional[float] = None
 
+class RepairSuggestion(BaseModel):
+    index: int
+    kind: str
+    description: str
+    confidence: float
+    replacement: Optional[TransactionModel] = None
+
 class AnalysisResponse(BaseModel):
     summary: BankStatement
     flagged: List[FlaggedTransaction]
+    repairs: List[RepairSuggestion] = []
+    statement_id: Optional[str] = None
+
+class JobFileResult(BaseModel):
+    filename: str
+    status: str
+    error: Optional[str] = None
+    result: Optional[AnalysisResponse] = None
+
+class JobStatus(BaseModel):
+    job_id: str
+    status: str
+    total: int
+    completed: int
+    failed: int
+    progress: float
+    files: List[JobFileResult]
+
+class StatementRecord(BaseModel):
+    statement_id: str
+    filename: str
+    account_number: str
+    period_start: str
+    period_end: str
+    opening_balance: Optional[float]
+    closing_balance: Optional[float]
+    currency: Optional[str]
+    transaction_count: int
+    analyzed: bool
+    updated_at: float
+
+class TransactionEdit(BaseModel):
+    op: Literal["update", "insert", "delete"]
+    index: int
+    transaction: Optional[TransactionModel] = None
+
+class ValidationDelta(BaseModel):
+    from_index: int
+    flagged: List[FlaggedTransaction]
+    cleared: List[int]
+    row_count: int
+    expected_closing_balance: float
 
 class FinalizedStatementRequest(BaseModel):
     summary: BankStatement
     finalizedTransactions: List[TransactionModel]
+    session_id: Optional[str] = None
+
+class CombinedStatementRequest(BaseModel):
+    statements: List[FinalizedStatementRequest] = []
+    statement_ids: List[str] = []
+    session_id: Optional[str] = None
+
+class ContinuityIssue(BaseModel):
+    account_number: str
+    previous_filename: str
+    next_filename: str
+    closing_balance: float
+    opening_balance: float
+    gap: float
 
 class IncomeSource(BaseModel):
     description_pattern: str
@@ -81,6 +153,8 @@ class IrregularActivity(BaseModel):
     type: str
     month: str
     details: str
+    # Evidence: positions in finalizedTransactions.
+    rows: List[int] = []
 
 
 class CashFlowStability(BaseModel):
@@ -100,14 +174,18 @@ class SuspiciousTransactionPattern(BaseModel):
     pattern: str
     occurrences: int
     flagged_as: str
+    rows: List[int] = []
 
 
 class UseOfCredit(BaseModel):
     present: bool
+    markers: List[str] = []
+    rows: List[int] = []
 
 
 class RiskFlags(BaseModel):
     frequent_low_balance: bool
+    low_balance_days: Optional[int] = None
     suspicious_transaction_patterns: List[SuspiciousTransactionPattern]
     use_of_credit: UseOfCredit
 
@@ -119,9 +197,58 @@ class AnalysisResult(BaseModel):
     cash_flow_stability: CashFlowStability
     loan_affordability_indicators: LoanAffordabilityIndicators
     risk_flags: RiskFlags
+    session_id: Optional[str] = None
+    # "ready", or "pending" while the chat session is still being set up;
+    # "failed"/"timeout" leave session_id unset.
+    qa_status: Optional[str] = None
+
+class LoanScenario(BaseModel):
+    monthly_repayment: float
+    months: int = 36
+    scenarios: int = 10000
+    # Defaults to the statement's closing balance.
+    starting_balance: Optional[float] = None
+    method: Literal["bootstrap", "normal"] = "bootstrap"
+    seed: Optional[int] = None
+
+class LoanSimulationRequest(LoanScenario):
+    summary: BankStatement
+    finalizedTransactions: List[TransactionModel]
+
+class DistributionSummary(BaseModel):
+    mean: float
+    p5: float
+    p25: float
+    p50: float
+    p75: float
+    p95: float
+
+class LoanSimulationResult(BaseModel):
+    method: str
+    scenarios: int
+    months: int
+    monthly_repayment: float
+    starting_balance: float
+    history_months: int
+    average_monthly_income: float
+    average_monthly_expenses: float
+    overdraft_probability: float
+    # Chance of having been overdrawn by the end of each simulated month.
+    overdraft_probability_by_month: List[float]
+    median_first_overdraft_month: Optional[int]
+    minimum_balance: DistributionSummary
+    closing_balance: DistributionSummary
+    months_of_coverage: DistributionSummary
+
+class CombinedAnalysisResult(BaseModel):
+    analysis: AnalysisResult
+    continuity_issues: List[ContinuityIssue]
+    duplicates_removed: int
+    statement_count: int
 
 class ChatResponse(BaseModel):
     answer: str
     
 class ChatRequest(BaseModel):
-    question: str
\ No newline at end of file
+    question: str
+    session_id: Optional[str] = None
\ No newline at end of file
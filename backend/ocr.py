@@ -0,0 +1,150 @@
+import hashlib
+import logging
+import multiprocessing
+import os
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional
+
+import pdfplumber
+from pypdf import PdfReader
+
+OCR_DPI = int(os.getenv("OCR_DPI", "300"))
+OCR_WORKERS = int(os.getenv("OCR_WORKERS", str(os.cpu_count() or 2)))
+OCR_CACHE_DIR = os.getenv("OCR_CACHE_DIR", os.path.join("cache", "ocr"))
+# Pages with fewer characters than this in their text layer are treated as scanned.
+MIN_TEXT_CHARS = 20
+
+_pool: Optional[ProcessPoolExecutor] = None
+_hits = 0
+_misses = 0
+
+
+def ocr_available() -> bool:
+    try:
+        import pdf2image  # noqa: F401
+        import pytesseract  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def scanned_pages(path: str) -> List[int]:
+    with pdfplumber.open(path) as pdf:
+        return [i for i, page in enumerate(pdf.pages) if len(page.chars) < MIN_TEXT_CHARS]
+
+
+def page_hashes(path: str, pages: List[int]) -> Dict[int, str]:
+    # Hash the page's content stream together with the raw data of every
+    # image it draws; scanned pages share identical content streams, so the
+    # image bytes are what tells them apart.
+    reader = PdfReader(path)
+    hashes = {}
+    for i in pages:
+        page = reader.pages[i]
+        digest = hashlib.sha256()
+        contents = page.get_contents()
+        if contents is not None:
+            digest.update(contents.get_data())
+        xobjects = page.get("/Resources", {}).get("/XObject", {})
+        for name in sorted(xobjects):
+            digest.update(xobjects[name].get_object().get_data() or b"")
+        digest.update(f"{OCR_DPI}".encode())
+        hashes[i] = digest.hexdigest()
+    return hashes
+
+
+def _ocr_page(path: str, page_number: int, dpi: int, y_tolerance: int = 10) -> str:
+    # Runs in a worker process: rasterise just this page, OCR it and rebuild
+    # lines from word positions, so only one page image is in memory per worker.
+    from pdf2image import convert_from_path
+    import pytesseract
+
+    image = convert_from_path(path, dpi=dpi, first_page=page_number + 1, last_page=page_number + 1)[0]
+    try:
+        ocr_data = pytesseract.image_to_data(image, output_type=pytesseract.Output.DICT)
+    finally:
+        image.close()
+
+    lines = defaultdict(list)
+    for i, raw in enumerate(ocr_data["text"]):
+        word = raw.strip()
+        if not word:
+            continue
+        y_group = round(ocr_data["top"][i] / y_tolerance) * y_tolerance
+        lines[y_group].append((ocr_data["left"][i], word))
+
+    return "\n".join(
+        " ".join(word for _, word in sorted(lines[y])) for y in sorted(lines)
+    ) + "\n"
+
+
+def _get_pool() -> ProcessPoolExecutor:
+    global _pool
+    if _pool is None:
+        _pool = ProcessPoolExecutor(max_workers=OCR_WORKERS)
+    return _pool
+
+
+def cache_stats() -> dict:
+    lookups = _hits + _misses
+    return {"hits": _hits, "misses": _misses, "hit_ratio": _hits / lookups if lookups else 0.0}
+
+
+def shutdown() -> None:
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(cancel_futures=True)
+        _pool = None
+
+
+def _cache_path(page_hash: str) -> str:
+    return os.path.join(OCR_CACHE_DIR, page_hash[:2], f"{page_hash}.txt")
+
+
+def ocr_pages(path: str, pages: List[int]) -> Dict[int, str]:
+    """OCR the given pages across the process pool, reusing cached text.
+
+    Pages are OCR'd one by one when this already runs in a child process.
+    """
+    if not pages:
+        return {}
+    if not ocr_available():
+        logging.warning("%d scanned pages in %s but pdf2image/pytesseract are not installed", len(pages), path)
+        return {i: "" for i in pages}
+
+    global _hits, _misses
+    # Inside a worker of the process-mode extraction executor, OCR serially
+    # rather than starting a second pool from every worker.
+    in_worker = multiprocessing.parent_process() is not None
+    hashes = page_hashes(path, pages)
+    texts: Dict[int, str] = {}
+    pending = {}
+    for i in pages:
+        cached = _cache_path(hashes[i])
+        if os.path.exists(cached):
+            with open(cached, encoding="utf-8") as f:
+                texts[i] = f.read()
+        elif in_worker:
+            pending[i] = None
+        else:
+            pending[i] = _get_pool().submit(_ocr_page, path, i, OCR_DPI)
+
+    for i, future in pending.items():
+        try:
+            texts[i] = future.result() if future is not None else _ocr_page(path, i, OCR_DPI)
+        except Exception as e:
+            logging.warning("OCR failed on page %d of %s: %s", i + 1, path, e)
+            texts[i] = ""
+            continue
+        cached = _cache_path(hashes[i])
+        os.makedirs(os.path.dirname(cached), exist_ok=True)
+        tmp = f"{cached}.{os.getpid()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.write(texts[i])
+        os.replace(tmp, cached)
+
+    _hits += len(pages) - len(pending)
+    _misses += len(pending)
+    logging.info("OCR'd %d pages of %s (%d from cache)", len(pages), path, len(pages) - len(pending))
+    return texts
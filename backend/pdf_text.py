@@ -0,0 +1,47 @@
+from collections import defaultdict
+from typing import Dict, Iterator, List, Optional
+
+import pdfplumber
+
+
+def page_count(path: str) -> int:
+    with pdfplumber.open(path) as pdf:
+        return len(pdf.pages)
+
+
+def page_to_text(page, y_tolerance: int = 1) -> str:
+    # Rebuild reading-order lines from character positions; pdfplumber's own
+    # extract_text merges table columns unpredictably on most bank layouts.
+    lines = defaultdict(list)
+    for char in page.chars:
+        y = round(char["top"] / y_tolerance) * y_tolerance
+        lines[y].append(char)
+
+    text_lines = []
+    for _, line_chars in sorted(lines.items(), key=lambda item: item[0]):
+        line_chars_sorted = sorted(line_chars, key=lambda c: c["x0"])
+        text_lines.append("".join(c["text"] for c in line_chars_sorted).rstrip())
+    return "\n".join(text_lines) + "\n"
+
+
+def extract_from_pdf_in_batches(path: str, batch_size: int = 5, y_tolerance: int = 1) -> Iterator[str]:
+    try:
+        with pdfplumber.open(path) as pdf:
+            total_pages = len(pdf.pages)
+            for i in range(0, total_pages, batch_size):
+                yield "".join(
+                    page_to_text(pdf.pages[j], y_tolerance)
+                    for j in range(i, min(i + batch_size, total_pages))
+                )
+    except Exception as e:
+        raise ValueError(f"PDF parsing failed: {e}")
+
+
+def page_texts(path: str, overrides: Optional[Dict[int, str]] = None, y_tolerance: int = 1) -> List[str]:
+    """Text of every page, taking pages listed in ``overrides`` (e.g. OCR output) from there."""
+    overrides = overrides or {}
+    with pdfplumber.open(path) as pdf:
+        return [
+            overrides[i] if i in overrides else page_to_text(page, y_tolerance)
+            for i, page in enumerate(pdf.pages)
+        ]
@@ -0,0 +1,107 @@
+import asyncio
+import logging
+import time
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from metrics import stage as timed_stage
+
+
+@dataclass
+class Stage:
+    """One step of a StageGraph.
+
+    ``fn`` receives the values of the stages listed in ``after``. A stage
+    exceeding ``timeout`` is cancelled. With ``detach_after`` set, the graph
+    stops waiting for the stage after that many seconds and reports it as
+    pending while it keeps running in the background.
+    """
+    name: str
+    fn: Callable[[Dict[str, Any]], Awaitable[Any]]
+    after: Tuple[str, ...] = ()
+    timeout: Optional[float] = None
+    detach_after: Optional[float] = None
+
+
+@dataclass
+class StageOutcome:
+    status: str  # ok | failed | timeout | skipped | pending
+    value: Any = None
+    error: Optional[BaseException] = None
+    elapsed: float = 0.0
+    # Still-running task of a detached stage.
+    task: Optional["asyncio.Task[StageOutcome]"] = field(default=None, repr=False)
+
+    @property
+    def ok(self) -> bool:
+        return self.status == "ok"
+
+
+class StageGraph:
+    """Runs stages as soon as their dependencies finish, independent ones concurrently."""
+
+    def __init__(self, name: str, stages: List[Stage]):
+        self.name = name
+        self.stages = {s.name: s for s in stages}
+        if len(self.stages) != len(stages):
+            raise ValueError("Duplicate stage names")
+        self.order = self._topological_order()
+
+    def _topological_order(self) -> List[str]:
+        order: List[str] = []
+        state: Dict[str, str] = {}
+
+        def visit(name: str) -> None:
+            if state.get(name) == "done":
+                return
+            if state.get(name) == "visiting":
+                raise ValueError(f"Stage graph has a cycle through {name}")
+            if name not in self.stages:
+                raise ValueError(f"Unknown stage dependency: {name}")
+            state[name] = "visiting"
+            for dep in self.stages[name].after:
+                visit(dep)
+            state[name] = "done"
+            order.append(name)
+
+        for name in self.stages:
+            visit(name)
+        return order
+
+    async def _run_stage(self, stage: Stage, tasks: Dict[str, "asyncio.Task[StageOutcome]"]) -> StageOutcome:
+        inputs = {}
+        for dep in stage.after:
+            outcome = await asyncio.shield(tasks[dep])
+            if not outcome.ok:
+                return StageOutcome(status="skipped", error=outcome.error)
+            inputs[dep] = outcome.value
+
+        start = time.perf_counter()
+        try:
+            with timed_stage(f"{self.name}_{stage.name}"):
+                value = await asyncio.wait_for(stage.fn(inputs), timeout=stage.timeout)
+        except asyncio.TimeoutError as e:
+            logging.warning("%s stage %s timed out after %ss", self.name, stage.name, stage.timeout)
+            return StageOutcome(status="timeout", error=e, elapsed=time.perf_counter() - start)
+        except Exception as e:
+            logging.warning("%s stage %s failed: %s", self.name, stage.name, e)
+            return StageOutcome(status="failed", error=e, elapsed=time.perf_counter() - start)
+        return StageOutcome(status="ok", value=value, elapsed=time.perf_counter() - start)
+
+    async def run(self) -> Dict[str, StageOutcome]:
+        start = time.perf_counter()
+        tasks: Dict[str, "asyncio.Task[StageOutcome]"] = {}
+        for name in self.order:
+            tasks[name] = asyncio.create_task(self._run_stage(self.stages[name], tasks))
+
+        outcomes: Dict[str, StageOutcome] = {}
+        for name in self.order:
+            stage, task = self.stages[name], tasks[name]
+            if stage.detach_after is not None:
+                remaining = max(0.0, stage.detach_after - (time.perf_counter() - start))
+                done, _ = await asyncio.wait({task}, timeout=remaining)
+                if not done:
+                    outcomes[name] = StageOutcome(status="pending", elapsed=time.perf_counter() - start, task=task)
+                    continue
+            outcomes[name] = await task
+        return outcomes
@@ -0,0 +1,218 @@
+import re
+from functools import cached_property
+from typing import Callable, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from analytics import transactions_frame
+from categorizer import CATEGORY_KEYWORDS
+from models import TransactionModel
+from recurring import RecurringSeries, detect_recurring
+
+MONTHS = {m: i for i, m in enumerate(
+    ["january", "february", "march", "april", "may", "june", "july", "august", "september", "october", "november", "december"], 1)}
+MONTHS.update({name[:3]: i for name, i in list(MONTHS.items())})
+MONTH_RE = re.compile(r"\b(" + "|".join(sorted(MONTHS, key=len, reverse=True)) + r")\b(?:\s+(\d{4}))?")
+# Month names that are also common words; they only count as a month next to
+# a year or after a preposition ("in may", "may 2024").
+AMBIGUOUS_MONTHS = {"may"}
+MONTH_PREPOSITION_RE = re.compile(r"\b(?:in|during|for|of|since|from|until|till|by|before|after|through|last|this)\s+$")
+TOTALS_RE = re.compile(
+    r"\b(?:total|how much)\s+(?:money\s+)?(?:(?:did|have|do)\s+(?:i|we)\s+)?(?:my\s+|the\s+)?"
+    r"(income|money in|earned|earn|received|receive|deposits|spent|spend|spending|expenses|money out)\b"
+)
+# Comparisons, averages, per-period rates, year ranges and "can I afford"
+# questions are beyond the filters here; a plain total would look like an
+# answer to them, so they go to the assistant.
+BEYOND_FILTERS_RE = re.compile(
+    r"\b(?:compared?|comparison|versus|vs|than|average|avg|mean|typical(?:ly)?|per\s+(?:day|week|month|year)"
+    r"|(?:last|this|previous|next)\s+year|year\s+on\s+year|afford|budget|categor(?:y|ies))\b"
+)
+
+
+class TransactionIndex:
+    """Date-sorted, column-oriented copy of a statement's transactions."""
+
+    def __init__(self, transactions: List[TransactionModel], currency: Optional[str] = None,
+                 categories: Optional[List[Optional[str]]] = None):
+        self.transactions = transactions
+        df = transactions_frame(transactions)
+        df["category"] = categories if categories is not None else None
+        df = df.dropna(subset=["date"]).sort_values("date", kind="stable").reset_index(drop=True)
+        df["month"] = df["date"].dt.to_period("M")
+        df["text"] = df["description"].str.lower()
+        self.df = df
+        self.currency = currency or ""
+        self.dates = df["date"].to_numpy()
+
+    @cached_property
+    def recurring(self) -> List[RecurringSeries]:
+        return detect_recurring(self.transactions)
+
+    def money(self, value: float) -> str:
+        return f"{self.currency} {value:,.2f}".strip()
+
+    @property
+    def latest_month(self) -> Optional[pd.Period]:
+        return self.df["month"].iloc[-1] if len(self.df) else None
+
+    def in_month(self, month: Optional[pd.Period]) -> pd.DataFrame:
+        return self.df if month is None else self.df[self.df["month"] == month]
+
+    def matching(self, df: pd.DataFrame, term: str) -> pd.DataFrame:
+        keywords = CATEGORY_KEYWORDS.get(term, [term])
+        pattern = "|".join(re.escape(k) for k in keywords)
+        mask = df["text"].str.contains(pattern, regex=True)
+        if term in CATEGORY_KEYWORDS:
+            # Also rows the categorizer placed there, e.g. via the LLM.
+            mask |= df["category"] == term
+        return df[mask]
+
+    def balance_at(self, when: pd.Timestamp) -> Optional[Tuple[pd.Timestamp, float]]:
+        i = int(np.searchsorted(self.dates, np.datetime64(when), side="right")) - 1
+        if i < 0:
+            return None
+        row = self.df.iloc[i]
+        return row["date"], row["balance"]
+
+
+def _parse_month(question: str, index: TransactionIndex) -> Tuple[bool, Optional[pd.Period]]:
+    """Return (month_mentioned, month). month is None for "all time"."""
+    latest = index.latest_month
+    if latest is None:
+        return False, None
+    if re.search(r"\blast month\b|\bprevious month\b", question):
+        return True, latest - 1
+    if re.search(r"\bthis month\b|\blatest month\b", question):
+        return True, latest
+    for match in MONTH_RE.finditer(question):
+        if (match.group(1) in AMBIGUOUS_MONTHS and not match.group(2)
+                and not MONTH_PREPOSITION_RE.search(question[:match.start()])):
+            continue
+        year = int(match.group(2)) if match.group(2) else latest.year
+        return True, pd.Period(year=year, month=MONTHS[match.group(1)], freq="M")
+    return False, None
+
+
+def _month_label(month: Optional[pd.Period]) -> str:
+    return f" in {month.strftime('%B %Y')}" if month is not None else ""
+
+
+def _lowest_balance(q: str, index: TransactionIndex) -> Optional[str]:
+    if not re.search(r"\b(lowest|minimum|min)\b.*\bbalance\b", q):
+        return None
+    _, month = _parse_month(q, index)
+    df = index.in_month(month)
+    if df.empty:
+        return f"There are no transactions{_month_label(month)}."
+    row = df.loc[df["balance"].idxmin()]
+    return f"The lowest balance{_month_label(month)} was {index.money(row['balance'])} on {row['date'].date().isoformat()}."
+
+
+def _highest_balance(q: str, index: TransactionIndex) -> Optional[str]:
+    if not re.search(r"\b(highest|maximum|max|peak)\b.*\bbalance\b", q):
+        return None
+    _, month = _parse_month(q, index)
+    df = index.in_month(month)
+    if df.empty:
+        return f"There are no transactions{_month_label(month)}."
+    row = df.loc[df["balance"].idxmax()]
+    return f"The highest balance{_month_label(month)} was {index.money(row['balance'])} on {row['date'].date().isoformat()}."
+
+
+def _balance_at_date(q: str, index: TransactionIndex) -> Optional[str]:
+    match = re.search(r"\bbalance\b.*\b(?:on|at|as of)\s+(.+?)\??$", q)
+    if not match:
+        return None
+    text = match.group(1)
+    when = pd.to_datetime(text, errors="coerce", dayfirst=not re.match(r"\d{4}-", text))
+    if pd.isna(when):
+        return None
+    found = index.balance_at(when)
+    if found is None:
+        return f"There are no transactions on or before {when.date().isoformat()}."
+    date, balance = found
+    return f"The balance on {when.date().isoformat()} was {index.money(balance)} (last transaction on {date.date().isoformat()})."
+
+
+def _largest_transactions(q: str, index: TransactionIndex) -> Optional[str]:
+    match = re.search(r"\b(largest|biggest|highest|top)\s+(\d+\s+)?(transactions?|payments?|expenses?|purchases?|debits?|deposits?|credits?|incomes?)\b(?!\s+(?:categor|type|kind|source))", q)
+    if not match or BEYOND_FILTERS_RE.search(q):
+        return None
+    n = int(match.group(2)) if match.group(2) else (1 if not match.group(3).endswith("s") else 5)
+    column = "credit" if re.match(r"deposit|credit|income", match.group(3)) else "debit"
+    _, month = _parse_month(q, index)
+    df = index.in_month(month)
+    top = df[df[column] > 0].nlargest(n, column)
+    if top.empty:
+        return f"There are no matching transactions{_month_label(month)}."
+    lines = [f"- {r['date'].date().isoformat()} {r['description']}: {index.money(r[column])}" for _, r in top.iterrows()]
+    kind = "credits" if column == "credit" else "debits"
+    return f"Largest {kind}{_month_label(month)}:\n" + "\n".join(lines)
+
+
+def _spent_on(q: str, index: TransactionIndex) -> Optional[str]:
+    match = re.search(r"\b(?:spent|spend|paid|pay)\s+(?:on|at|to|for)\s+([a-z0-9&' .-]+?)(?:\s+(?:in|during|last|this|for|over)\b.*)?\??$", q)
+    if not match or BEYOND_FILTERS_RE.search(q):
+        return None
+    term = match.group(1).strip()
+    if term not in CATEGORY_KEYWORDS and index.matching(index.df, term).empty:
+        # Not a category and not in any description: probably not a payee.
+        return None
+    _, month = _parse_month(q, index)
+    df = index.matching(index.in_month(month), term)
+    total = df["debit"].sum()
+    return f"Spent on {term}{_month_label(month)}: {index.money(total)} across {int((df['debit'] > 0).sum())} transactions."
+
+
+def _totals(q: str, index: TransactionIndex) -> Optional[str]:
+    match = TOTALS_RE.search(q)
+    if not match or BEYOND_FILTERS_RE.search(q):
+        return None
+    column = "credit" if match.group(1) in {"income", "money in", "earned", "earn", "received", "receive", "deposits"} else "debit"
+    _, month = _parse_month(q, index)
+    df = index.in_month(month)
+    label = "Money in" if column == "credit" else "Money out"
+    return f"{label}{_month_label(month)}: {index.money(df[column].sum())}."
+
+
+def _recurring(q: str, index: TransactionIndex) -> Optional[str]:
+    if not re.search(r"\b(recurring|regular|repeat(ing)?|subscriptions?|standing orders?|direct debits?)\b", q):
+        return None
+    income = re.search(r"\b(income|salary|salaries|deposits?|credits?|paid in)\b", q) is not None
+    direction = "credit" if income else "debit"
+    series = [s for s in index.recurring if s.direction == direction]
+    label = "income" if income else "payments"
+    if not series:
+        return f"No recurring {label} were found."
+    lines = [
+        f"- {s.description}: {s.period}, {s.occurrences} {'credits' if income else 'payments'}, "
+        f"average {index.money(s.average_amount)}, next expected around {s.next_expected.isoformat()} "
+        f"(confidence {s.confidence:.0%})"
+        for s in series[:10]
+    ]
+    return f"Recurring {label}:\n" + "\n".join(lines)
+
+
+INTENTS: List[Callable[[str, TransactionIndex], Optional[str]]] = [
+    _recurring,
+    _lowest_balance,
+    _highest_balance,
+    _balance_at_date,
+    _largest_transactions,
+    _spent_on,
+    _totals,
+]
+
+
+def answer_locally(index: Optional[TransactionIndex], question: str) -> Optional[str]:
+    """Answer simple filter/aggregate questions directly, or return None."""
+    if index is None or index.df.empty:
+        return None
+    q = question.strip().lower()
+    for intent in INTENTS:
+        answer = intent(q, index)
+        if answer is not None:
+            return answer
+    return None
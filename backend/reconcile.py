@@ -0,0 +1,298 @@
+from dataclasses import dataclass
+from typing import List, Optional
+
+import numpy as np
+
+from models import BankStatement, FlaggedTransaction, RepairSuggestion, TransactionModel, ValidationDelta
+
+BALANCE_TOLERANCE = 0.01
+
+
+@dataclass
+class BalanceArrays:
+    credit: np.ndarray
+    debit: np.ndarray
+    balance: np.ndarray
+    opening: float
+
+    @classmethod
+    def from_transactions(cls, transactions: List[TransactionModel], opening: float) -> "BalanceArrays":
+        n = len(transactions)
+        credit = np.fromiter((t.credit or 0 for t in transactions), dtype=float, count=n)
+        debit = np.fromiter((t.debit or 0 for t in transactions), dtype=float, count=n)
+        balance = np.fromiter((t.balance for t in transactions), dtype=float, count=n)
+        return cls(credit, debit, balance, opening)
+
+    @property
+    def previous(self) -> np.ndarray:
+        return np.concatenate(([self.opening], self.balance[:-1]))
+
+    @property
+    def net(self) -> np.ndarray:
+        return self.credit - self.debit
+
+    @property
+    def expected(self) -> np.ndarray:
+        return self.previous + self.net
+
+
+def mismatch_mask(arrays: BalanceArrays) -> np.ndarray:
+    return ~np.isclose(arrays.expected, arrays.balance, rtol=0, atol=BALANCE_TOLERANCE)
+
+
+def flag_transactions(statement: BankStatement) -> List[FlaggedTransaction]:
+    flagged: List[FlaggedTransaction] = []
+    if statement.opening_balance is None or statement.closing_balance is None:
+        return flagged
+
+    arrays = BalanceArrays.from_transactions(statement.transactions, statement.opening_balance)
+    previous = arrays.previous
+    expected = arrays.expected
+    # Only the mismatching rows are turned back into Pydantic objects.
+    for i in np.flatnonzero(mismatch_mask(arrays)).tolist():
+        tx = statement.transactions[i]
+        flagged.append(FlaggedTransaction(
+            index=i,
+            issue=f"Expected balance: {expected[i]:.2f}, Found: {tx.balance:.2f}",
+            transaction=tx,
+            previous_balance=float(previous[i]),
+            current_balance=tx.balance
+        ))
+
+    last_balance = arrays.balance[-1] if len(arrays.balance) else statement.opening_balance
+    if not np.isclose(last_balance, statement.closing_balance, rtol=0, atol=BALANCE_TOLERANCE):
+        flagged.append(FlaggedTransaction(
+            index=len(statement.transactions),
+            issue=f"Final balance mismatch. Expected: {statement.closing_balance:.2f}, Found: {last_balance:.2f}"
+        ))
+
+    return flagged
+
+
+def suggest_repairs(statement: BankStatement) -> List[RepairSuggestion]:
+    """Propose likely fixes for rows whose running balance does not add up.
+
+    Every check is a vectorised comparison over the whole statement; the
+    suggestions are built only for rows that are actually mismatched.
+    """
+    if statement.opening_balance is None or not statement.transactions:
+        return []
+
+    txs = statement.transactions
+    arrays = BalanceArrays.from_transactions(txs, statement.opening_balance)
+    previous, net, balance = arrays.previous, arrays.net, arrays.balance
+    mismatched = mismatch_mask(arrays)
+    if not mismatched.any():
+        return []
+
+    def close(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+        return np.isclose(a, b, rtol=0, atol=BALANCE_TOLERANCE)
+
+    # Does the next row reconcile against this row's reported balance? Used to
+    # tell a one-off error in this row apart from a knock-on effect.
+    next_ok = np.append(~mismatched[1:], True)
+    previous_ok = np.insert(~mismatched[:-1], 0, True)
+    has_amount = np.abs(net) > BALANCE_TOLERANCE
+
+    swapped = mismatched & has_amount & close(previous - net, balance)
+    sign_dropped = mismatched & (np.abs(balance) > BALANCE_TOLERANCE) & close(previous + net, -balance)
+    # With the sign restored, does the following row reconcile too?
+    sign_next_ok = np.append(close(-balance[:-1] + net[1:], balance[1:]), True)
+    dates = np.array([t.date for t in txs], dtype=object)
+    descriptions = np.array([t.description for t in txs], dtype=object)
+    same_as_previous = np.zeros(len(txs), dtype=bool)
+    same_as_previous[1:] = (
+        (dates[1:] == dates[:-1]) & (descriptions[1:] == descriptions[:-1])
+        & close(arrays.credit[1:], arrays.credit[:-1]) & close(arrays.debit[1:], arrays.debit[:-1])
+        & close(balance[1:], balance[:-1])
+    )
+    duplicated = mismatched & same_as_previous & has_amount
+    # This row's balance is wrong but the next row carries on from the
+    # correct figure, e.g. a misread digit.
+    corrected = previous + net
+    balance_misread = mismatched & np.append(
+        ~next_ok[:-1] & close(corrected[:-1] + net[1:], balance[1:]), False
+    ) & ~swapped & ~sign_dropped & ~duplicated
+    # A row right after a mismatched one is usually just the knock-on effect.
+    missing = mismatched & previous_ok & next_ok & ~swapped & ~sign_dropped & ~duplicated
+
+    repairs: List[RepairSuggestion] = []
+    for i in np.flatnonzero(duplicated).tolist():
+        repairs.append(RepairSuggestion(
+            index=i,
+            kind="duplicate_row",
+            description="Row repeats the previous row exactly (likely a page-break duplicate); delete it.",
+            confidence=0.95,
+        ))
+    for i in np.flatnonzero(swapped).tolist():
+        tx = txs[i]
+        repairs.append(RepairSuggestion(
+            index=i,
+            kind="swap_credit_debit",
+            description=f"Balance reconciles if credit and debit are swapped ({tx.debit:.2f} in, {tx.credit:.2f} out).",
+            confidence=0.9 if next_ok[i] else 0.7,
+            replacement=tx.model_copy(update={"credit": tx.debit, "debit": tx.credit}),
+        ))
+    for i in np.flatnonzero(sign_dropped).tolist():
+        tx = txs[i]
+        repairs.append(RepairSuggestion(
+            index=i,
+            kind="sign_flip",
+            description=f"Balance reconciles if its sign is flipped ({-tx.balance:.2f}).",
+            confidence=0.95 if sign_next_ok[i] else 0.75,
+            replacement=tx.model_copy(update={"balance": -tx.balance}),
+        ))
+    for i in np.flatnonzero(balance_misread).tolist():
+        tx = txs[i]
+        repairs.append(RepairSuggestion(
+            index=i,
+            kind="balance_misread",
+            description=f"Balance looks misread; {corrected[i]:.2f} reconciles with both neighbouring rows.",
+            confidence=0.9,
+            replacement=tx.model_copy(update={"balance": float(corrected[i])}),
+        ))
+    for i in np.flatnonzero(missing).tolist():
+        gap = float(balance[i] - previous[i] - net[i])
+        tx = txs[i]
+        repairs.append(RepairSuggestion(
+            index=i,
+            kind="missing_row",
+            description=f"A {'credit' if gap > 0 else 'debit'} of {abs(gap):.2f} appears to be missing before this row.",
+            # The same gap can also come from a misread amount on this row.
+            confidence=0.6,
+            replacement=TransactionModel(
+                date=tx.date,
+                description="Missing transaction",
+                credit=gap if gap > 0 else 0.0,
+                debit=-gap if gap < 0 else 0.0,
+                balance=float(previous[i] + gap),
+            ),
+        ))
+
+    repairs.sort(key=lambda r: (r.index, -r.confidence))
+    return repairs
+
+
+# --- Incremental re-validation ---
+
+class BalanceLedger:
+    """Server-side copy of a statement that re-checks balances incrementally.
+
+    ``running`` is the prefix sum opening + cumsum(credit - debit), i.e. the
+    balance implied by the opening balance and every amount so far. An edit
+    at index i only recomputes ``running`` and the row checks from i forward.
+    """
+
+    def __init__(self, statement: BankStatement):
+        self.statement = statement
+        opening = statement.opening_balance or 0.0
+        self.arrays = BalanceArrays.from_transactions(statement.transactions, opening)
+        self.running = opening + np.cumsum(self.arrays.net)
+        self.flags = {f.index: f for f in flag_transactions(statement)}
+
+    def __len__(self) -> int:
+        return len(self.statement.transactions)
+
+    @property
+    def checks_enabled(self) -> bool:
+        return self.statement.opening_balance is not None and self.statement.closing_balance is not None
+
+    def apply(self, op: str, index: int, transaction: Optional[TransactionModel] = None) -> ValidationDelta:
+        n = len(self)
+        if op == "update":
+            if transaction is None:
+                raise ValueError("update requires a transaction")
+            if not 0 <= index < n:
+                raise IndexError(f"Cannot update row {index} of {n}")
+            self.statement.transactions[index] = transaction
+            self._set_row(index, transaction)
+            shift = 0
+        elif op == "insert":
+            if transaction is None:
+                raise ValueError("insert requires a transaction")
+            if not 0 <= index <= n:
+                raise IndexError(f"Cannot insert at row {index} of {n}")
+            self.statement.transactions.insert(index, transaction)
+            a = self.arrays
+            a.credit = np.insert(a.credit, index, transaction.credit or 0)
+            a.debit = np.insert(a.debit, index, transaction.debit or 0)
+            a.balance = np.insert(a.balance, index, transaction.balance)
+            self.running = np.insert(self.running, index, 0.0)
+            shift = 1
+        elif op == "delete":
+            if not 0 <= index < n:
+                raise IndexError(f"Cannot delete row {index} of {n}")
+            del self.statement.transactions[index]
+            a = self.arrays
+            a.credit, a.debit, a.balance = (np.delete(x, index) for x in (a.credit, a.debit, a.balance))
+            self.running = np.delete(self.running, index)
+            shift = -1
+        else:
+            raise ValueError(f"Unknown edit operation: {op}")
+
+        self._recompute_running(index)
+        return self._revalidate(index, shift)
+
+    def _set_row(self, index: int, transaction: TransactionModel) -> None:
+        self.arrays.credit[index] = transaction.credit or 0
+        self.arrays.debit[index] = transaction.debit or 0
+        self.arrays.balance[index] = transaction.balance
+
+    def _recompute_running(self, start: int) -> None:
+        if start >= len(self.running):
+            return
+        base = self.running[start - 1] if start > 0 else self.arrays.opening
+        self.running[start:] = base + np.cumsum(self.arrays.net[start:])
+
+    def _tail_flags(self, start: int) -> dict:
+        if not self.checks_enabled:
+            return {}
+        a = self.arrays
+        txs = self.statement.transactions
+        n = len(txs)
+        previous = np.concatenate(([a.opening], a.balance))[start:n]
+        expected = previous + a.net[start:]
+        bad = ~np.isclose(expected, a.balance[start:], rtol=0, atol=BALANCE_TOLERANCE)
+        flags = {}
+        for offset in np.flatnonzero(bad).tolist():
+            i = start + offset
+            flags[i] = FlaggedTransaction(
+                index=i,
+                issue=f"Expected balance: {expected[offset]:.2f}, Found: {txs[i].balance:.2f}",
+                transaction=txs[i],
+                previous_balance=float(previous[offset]),
+                current_balance=txs[i].balance
+            )
+        closing = self.statement.closing_balance
+        last_balance = a.balance[-1] if n else a.opening
+        if not np.isclose(last_balance, closing, rtol=0, atol=BALANCE_TOLERANCE):
+            flags[n] = FlaggedTransaction(
+                index=n,
+                issue=f"Final balance mismatch. Expected: {closing:.2f}, Found: {last_balance:.2f}"
+            )
+        return flags
+
+    def _revalidate(self, start: int, shift: int) -> ValidationDelta:
+        # Old flags past the edit move with their rows, so compare against
+        # them in the new index space and only report what really changed.
+        before = {}
+        for i, flag in self.flags.items():
+            if i < start or (shift < 0 and i == start):
+                continue
+            new_index = i + shift
+            before[new_index] = flag.model_copy(update={"index": new_index})
+
+        after = self._tail_flags(start)
+        changed = [f for i, f in sorted(after.items()) if i not in before or before[i].model_dump() != f.model_dump()]
+        cleared = sorted(i for i in before if i not in after)
+
+        self.flags = {i: f for i, f in self.flags.items() if i < start}
+        self.flags.update(after)
+        expected_closing = float(self.running[-1]) if len(self.running) else self.arrays.opening
+        return ValidationDelta(
+            from_index=start,
+            flagged=changed,
+            cleared=cleared,
+            row_count=len(self),
+            expected_closing_balance=round(expected_closing, 2),
+        )
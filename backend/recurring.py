@@ -0,0 +1,152 @@
+import os
+from dataclasses import dataclass, field
+from datetime import date, timedelta
+from typing import List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from categorizer import normalize_description
+from models import IncomeSource, TransactionModel
+
+# Amounts within this fraction of a series' smallest amount belong to it.
+AMOUNT_TOLERANCE = float(os.getenv("RECURRING_AMOUNT_TOLERANCE", "0.25"))
+MIN_CONFIDENCE = float(os.getenv("RECURRING_MIN_CONFIDENCE", "0.5"))
+MAX_INCOME_SOURCES = 5
+
+# Period name -> (days, allowed deviation of a single gap in days).
+PERIODS = {
+    "weekly": (7.0, 1.5),
+    "fortnightly": (14.0, 2.5),
+    "monthly": (30.44, 4.0),
+}
+
+
+@dataclass
+class RecurringSeries:
+    description: str  # normalized description shared by the series
+    direction: str  # "credit" or "debit"
+    period: str
+    occurrences: int
+    average_amount: float
+    confidence: float
+    last_date: date
+    next_expected: date
+    # Row positions in the transactions passed to detect_recurring.
+    rows: List[int] = field(default_factory=list, repr=False)
+
+
+def _columns(transactions: List[TransactionModel]) -> pd.DataFrame:
+    df = pd.DataFrame({
+        "description": [normalize_description(t.description) for t in transactions],
+        "credit": [t.credit for t in transactions],
+        "debit": [t.debit for t in transactions],
+        "date": pd.to_datetime([t.date for t in transactions], errors="coerce", format="mixed"),
+    })
+    for col in ("credit", "debit"):
+        df[col] = pd.to_numeric(df[col], errors="coerce").fillna(0.0)
+    df["is_credit"] = df["credit"] > 0
+    df["amount"] = np.where(df["is_credit"], df["credit"], df["debit"])
+    return df[(df["amount"] > 0) & df["date"].notna()]
+
+
+def _classify(gaps: np.ndarray) -> Optional[Tuple[str, float]]:
+    """Period whose length is closest to the median gap, with the share of gaps that fit it."""
+    median = float(np.median(gaps))
+    name, (days, slack) = min(PERIODS.items(), key=lambda p: abs(p[1][0] - median))
+    if abs(median - days) > slack:
+        return None
+    return name, float((np.abs(gaps - days) <= slack).mean())
+
+
+def _series(rows: np.ndarray, days: np.ndarray, amounts: np.ndarray, description: str,
+            direction: str) -> Optional[RecurringSeries]:
+    order = np.argsort(days, kind="stable")
+    rows, days, amounts = rows[order], days[order], amounts[order]
+    gaps = np.diff(days).astype(float)
+    classified = _classify(gaps)
+    if classified is None:
+        return None
+    period, regularity = classified
+
+    mean = float(amounts.mean())
+    stability = 1.0 - min(1.0, float(amounts.std()) / mean)
+    # Three regular gaps are enough to be sure; one is a hint at best.
+    support = min(1.0, len(gaps) / 3)
+    confidence = regularity * support * (0.5 + 0.5 * stability)
+
+    last = days[-1].astype(date)
+    return RecurringSeries(
+        description=description,
+        direction=direction,
+        period=period,
+        occurrences=len(rows),
+        average_amount=round(mean, 2),
+        confidence=round(confidence, 2),
+        last_date=last,
+        next_expected=last + timedelta(days=round(PERIODS[period][0])),
+        rows=rows.tolist(),
+    )
+
+
+def detect_recurring(transactions: List[TransactionModel], min_confidence: float = MIN_CONFIDENCE) -> List[RecurringSeries]:
+    """Find payments and income that repeat weekly, fortnightly or monthly.
+
+    Transactions are sorted by direction, normalized description and
+    amount; each run of the same description whose amounts stay within
+    AMOUNT_TOLERANCE of its smallest is one candidate series, and its date
+    gaps are matched against PERIODS. The sort dominates: O(n log n).
+    """
+    df = _columns(transactions)
+    if len(df) < 2:
+        return []
+    codes, descriptions = pd.factorize(df["description"])
+    is_credit = df["is_credit"].to_numpy()
+    amounts = df["amount"].to_numpy()
+    order = np.lexsort((amounts, codes, is_credit))
+    codes, is_credit, amounts = codes[order], is_credit[order], amounts[order]
+    rows = df.index.to_numpy()[order]
+    days = df["date"].to_numpy().astype("datetime64[D]")[order]
+
+    found: List[RecurringSeries] = []
+
+    def close(start: int, end: int) -> None:
+        if end - start >= 2:
+            series = _series(rows[start:end], days[start:end], amounts[start:end], descriptions[codes[start]],
+                             "credit" if is_credit[start] else "debit")
+            if series is not None and series.confidence >= min_confidence:
+                found.append(series)
+
+    start = 0
+    for i in range(1, len(rows)):
+        if (codes[i] != codes[start] or is_credit[i] != is_credit[start]
+                or amounts[i] > amounts[start] * (1 + AMOUNT_TOLERANCE) + 0.01):
+            close(start, i)
+            start = i
+    close(start, len(rows))
+    found.sort(key=lambda s: (-s.confidence, -s.occurrences * s.average_amount))
+    return found
+
+
+def income_sources(transactions: List[TransactionModel],
+                   recurring: Optional[List[RecurringSeries]] = None) -> List[IncomeSource]:
+    """Recurring credits, largest first; the biggest one-off credit groups when nothing recurs."""
+    if recurring is None:
+        recurring = detect_recurring(transactions)
+    series = sorted(
+        (s for s in recurring if s.direction == "credit"),
+        key=lambda s: s.occurrences * s.average_amount, reverse=True,
+    )
+    if series:
+        return [
+            IncomeSource(description_pattern=s.description, occurrences=s.occurrences, average_amount=s.average_amount)
+            for s in series[:MAX_INCOME_SOURCES]
+        ]
+
+    df = _columns(transactions)
+    credits = df[df["is_credit"]]
+    grouped = credits.groupby("description")["amount"].agg(["size", "mean", "sum"]).nlargest(MAX_INCOME_SOURCES, "sum")
+    return [
+        IncomeSource(description_pattern=name, occurrences=int(r["size"]), average_amount=round(float(r["mean"]), 2))
+        for name, r in grouped.iterrows()
+    ]
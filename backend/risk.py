@@ -0,0 +1,228 @@
+import os
+import re
+from dataclasses import dataclass
+from typing import List, Tuple
+
+import numpy as np
+import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+
+from models import IrregularActivity, SuspiciousTransactionPattern, UseOfCredit
+
+# Months compared against the trailing window of earlier months.
+SPIKE_WINDOW_MONTHS = 6
+SPIKE_MIN_MONTHS = 3
+SPIKE_Z = float(os.getenv("RISK_SPIKE_Z", "3.5"))
+SPIKE_MIN_SCALE = 0.1
+ROUND_AMOUNT_UNIT = 100
+ROUND_AMOUNT_MIN_COUNT = 3
+# Cash reporting threshold; amounts within STRUCTURING_BAND below it look
+# like they were split to stay under it.
+REPORTING_THRESHOLD = float(os.getenv("RISK_REPORTING_THRESHOLD", "10000"))
+STRUCTURING_BAND = 0.1
+STRUCTURING_MIN_COUNT = 2
+PASS_THROUGH_MIN_AMOUNT = float(os.getenv("RISK_PASS_THROUGH_MIN_AMOUNT", "500"))
+PASS_THROUGH_DAYS = 2
+PASS_THROUGH_TOLERANCE = 0.1
+LOW_BALANCE_MIN_DAYS = 3
+MAX_EVIDENCE_ROWS = 20
+
+# Cash handling only: plain transfers and payroll direct deposits are not.
+CASH_RE = re.compile(
+    r"\b(?:atm|cashpoint|cash (?:withdrawal|wdl|deposit|dep|machine)|bureau de change|money ?gram|western union)\b"
+)
+CREDIT_RE = re.compile(
+    r"\b(?:loan|credit card|creditcard|cc payment|card repayment|repayment|amex|american express|barclaycard|mbna|"
+    r"capital one|klarna|clearpay|afterpay|paypal credit|overdraft|finance|hire purchase|interest charged?)\b"
+)
+
+
+@dataclass
+class RiskReport:
+    irregular_activity: List[IrregularActivity]
+    suspicious_transaction_patterns: List[SuspiciousTransactionPattern]
+    use_of_credit: UseOfCredit
+    low_balance_days: int
+    frequent_low_balance: bool
+
+
+def _evidence(rows: np.ndarray) -> List[int]:
+    return [int(r) for r in rows[:MAX_EVIDENCE_ROWS]]
+
+
+def _money(value: float) -> str:
+    return f"{value:,.2f}"
+
+
+def month_coverage(dates: pd.Series, months: pd.PeriodIndex) -> np.ndarray:
+    """Share of each month's days that fall between the first and last of ``dates``."""
+    start = np.maximum(months.start_time.to_numpy(), dates.min().normalize().to_datetime64())
+    end = np.minimum(months.end_time.normalize().to_numpy(), dates.max().normalize().to_datetime64())
+    return ((end - start).astype("timedelta64[D]").astype(int) + 1) / months.days_in_month.to_numpy()
+
+
+def _robust_z(values: np.ndarray) -> np.ndarray:
+    """Score each value against the median and MAD of the SPIKE_WINDOW_MONTHS values before it.
+
+    The scale is floored at SPIKE_MIN_SCALE of the median so a perfectly
+    steady history does not turn every small change into a spike. NaN
+    where there is too little history.
+    """
+    history = np.concatenate([np.full(SPIKE_WINDOW_MONTHS, np.nan), values[:-1]])
+    windows = sliding_window_view(history, SPIKE_WINDOW_MONTHS)
+    enough = (~np.isnan(windows)).sum(axis=1) >= SPIKE_MIN_MONTHS
+    z = np.full(len(values), np.nan)
+    if not enough.any():
+        return z
+    windows = windows[enough]
+    median = np.nanmedian(windows, axis=1)
+    mad = np.nanmedian(np.abs(windows - median[:, None]), axis=1) * 1.4826
+    scale = np.maximum(mad, SPIKE_MIN_SCALE * np.abs(median))
+    with np.errstate(divide="ignore", invalid="ignore"):
+        z[enough] = np.where(scale > 0, (values[enough] - median) / scale, np.nan)
+    return z
+
+
+def monthly_spikes(df: pd.DataFrame) -> List[IrregularActivity]:
+    """Months whose money in or out is SPIKE_Z robust deviations off the months before."""
+    dated = df.dropna(subset=["date"])
+    if dated.empty:
+        return []
+    month = dated["date"].dt.to_period("M")
+    months = pd.period_range(month.min(), month.max(), freq="M")
+    totals = dated.groupby(month)[["credit", "debit"]].sum().reindex(months, fill_value=0.0)
+    # Scale up partial first and last months to a full month so statement
+    # edges do not read as dips.
+    scaled = totals.to_numpy() / month_coverage(dated["date"], months)[:, None]
+
+    found = []
+    for c, (column, label) in enumerate((("credit", "income"), ("debit", "spending"))):
+        z = _robust_z(scaled[:, c])
+        for i in np.nonzero(np.abs(np.nan_to_num(z)) >= SPIKE_Z)[0]:
+            period = months[i]
+            in_month = dated[(month == period) & (dated[column] > 0)]
+            rows = in_month[column].sort_values(ascending=False).index.to_numpy()
+            typical = np.nanmedian(scaled[max(0, i - SPIKE_WINDOW_MONTHS):i, c])
+            found.append(IrregularActivity(
+                type=f"{label}_{'spike' if z[i] > 0 else 'dip'}",
+                month=str(period),
+                details=f"Money {'in' if column == 'credit' else 'out'} {_money(totals[column].iat[i])} "
+                        f"against a typical {_money(typical)} (robust z={z[i]:.1f})",
+                rows=_evidence(rows),
+            ))
+    return found
+
+
+def low_balance(df: pd.DataFrame, threshold: float) -> Tuple[int, int, List[IrregularActivity]]:
+    """Days ending below ``threshold``, days covered, and IrregularActivity for months with several low days."""
+    dated = df.dropna(subset=["date"])
+    if dated.empty:
+        return 0, 0, []
+    day = dated["date"].dt.normalize()
+    closing = dated.groupby(day)["balance"].last()
+    closing = closing.reindex(pd.date_range(closing.index.min(), closing.index.max(), freq="D")).ffill()
+    low = closing < threshold
+    per_month = low.groupby(low.index.to_period("M")).sum()
+
+    found = []
+    low_rows = dated.index.to_numpy()[(dated["balance"] < threshold).to_numpy()]
+    low_months = dated["date"].dt.to_period("M").to_numpy()[(dated["balance"] < threshold).to_numpy()]
+    for period, days in per_month[per_month >= LOW_BALANCE_MIN_DAYS].items():
+        found.append(IrregularActivity(
+            type="low_balance",
+            month=str(period),
+            details=f"{int(days)} days ended below {_money(threshold)}",
+            rows=_evidence(low_rows[low_months == period]),
+        ))
+    return int(low.sum()), len(low), found
+
+
+def suspicious_patterns(df: pd.DataFrame) -> List[SuspiciousTransactionPattern]:
+    text = df["description"].str.lower()
+    cash = text.str.contains(CASH_RE).to_numpy()
+    credit, debit = df["credit"].to_numpy(), df["debit"].to_numpy()
+    amount = np.maximum(credit, debit)
+    rows = df.index.to_numpy()
+    found = []
+
+    round_cash = cash & (amount >= ROUND_AMOUNT_UNIT) & (np.mod(amount, ROUND_AMOUNT_UNIT) == 0)
+    if round_cash.sum() >= ROUND_AMOUNT_MIN_COUNT:
+        found.append(SuspiciousTransactionPattern(
+            pattern=f"Repeated round-number cash movements (multiples of {ROUND_AMOUNT_UNIT})",
+            occurrences=int(round_cash.sum()),
+            flagged_as="round_cash_amounts",
+            rows=_evidence(rows[round_cash]),
+        ))
+
+    near_threshold = (amount >= REPORTING_THRESHOLD * (1 - STRUCTURING_BAND)) & (amount < REPORTING_THRESHOLD)
+    if near_threshold.sum() >= STRUCTURING_MIN_COUNT:
+        found.append(SuspiciousTransactionPattern(
+            pattern=f"Amounts just below the {_money(REPORTING_THRESHOLD)} reporting threshold",
+            occurrences=int(near_threshold.sum()),
+            flagged_as="structuring",
+            rows=_evidence(rows[near_threshold]),
+        ))
+
+    pass_through = _pass_through(df)
+    if len(pass_through):
+        found.append(SuspiciousTransactionPattern(
+            pattern=f"Large credits paid back out within {PASS_THROUGH_DAYS} days",
+            occurrences=len(pass_through) // 2,
+            flagged_as="pass_through",
+            rows=_evidence(pass_through),
+        ))
+    return found
+
+
+def _pass_through(df: pd.DataFrame) -> np.ndarray:
+    """Rows of large credits and the similar debits that follow them within PASS_THROUGH_DAYS."""
+    dated = df.dropna(subset=["date"])
+    days = dated["date"].to_numpy().astype("datetime64[D]").astype(np.int64)
+    credit, debit = dated["credit"].to_numpy(), dated["debit"].to_numpy()
+    rows = dated.index.to_numpy()
+
+    is_in = credit >= PASS_THROUGH_MIN_AMOUNT
+    is_out = debit >= PASS_THROUGH_MIN_AMOUNT * (1 - PASS_THROUGH_TOLERANCE)
+    if not is_in.any() or not is_out.any():
+        return np.empty(0, dtype=int)
+    out_order = np.argsort(days[is_out], kind="stable")
+    out_days, out_amounts, out_rows = days[is_out][out_order], debit[is_out][out_order], rows[is_out][out_order]
+
+    # Debits dated within the window of each large credit, found by binary search.
+    in_days, in_amounts, in_rows = days[is_in], credit[is_in], rows[is_in]
+    lo = np.searchsorted(out_days, in_days, side="left")
+    hi = np.searchsorted(out_days, in_days + PASS_THROUGH_DAYS, side="right")
+    matched = []
+    used = set()
+    for i in np.nonzero(hi > lo)[0]:
+        window = np.arange(lo[i], hi[i])
+        close = window[np.abs(out_amounts[window] - in_amounts[i]) <= in_amounts[i] * PASS_THROUGH_TOLERANCE]
+        close = [j for j in close if j not in used]
+        if close:
+            used.add(close[0])
+            matched.extend((in_rows[i], out_rows[close[0]]))
+    return np.array(matched, dtype=int)
+
+
+def use_of_credit(df: pd.DataFrame) -> UseOfCredit:
+    text = df["description"].str.lower()
+    markers = text.str.extract(f"({CREDIT_RE.pattern})", expand=False)
+    hit = markers.notna().to_numpy()
+    overdrawn = (df["balance"] < 0).to_numpy()
+    found = sorted(set(markers.dropna()))
+    if overdrawn.any():
+        found.append("overdrawn balance")
+    rows = df.index.to_numpy()[hit | overdrawn]
+    return UseOfCredit(present=bool(len(rows)), markers=found, rows=_evidence(rows))
+
+
+def assess_risk(df: pd.DataFrame, low_balance_threshold: float, low_balance_frequency: float) -> RiskReport:
+    """Rule-based risk flags over a transactions_frame; evidence rows index the frame."""
+    days_low, days_total, low_balance_activity = low_balance(df, low_balance_threshold)
+    return RiskReport(
+        irregular_activity=monthly_spikes(df) + low_balance_activity,
+        suspicious_transaction_patterns=suspicious_patterns(df),
+        use_of_credit=use_of_credit(df),
+        low_balance_days=days_low,
+        frequent_low_balance=bool(days_total and days_low / days_total >= low_balance_frequency),
+    )
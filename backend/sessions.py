@@ -0,0 +1,116 @@
+import asyncio
+import logging
+import os
+import time
+import uuid
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, Optional, Set
+
+
+@dataclass
+class QASession:
+    session_id: str
+    thread_id: str
+    # In-memory TransactionIndex used to answer simple questions locally.
+    query_index: Optional[Any] = None
+    created_at: float = field(default_factory=time.time)
+    last_used: float = field(default_factory=time.time)
+
+
+def new_session_id() -> str:
+    return uuid.uuid4().hex
+
+
+class SessionRegistry:
+    """Maps chat session IDs to assistant threads.
+
+    Bounded by ``max_sessions`` (least recently used sessions are evicted
+    first) and by ``ttl_seconds`` of inactivity. Evicted sessions are passed
+    to ``on_evict`` in the background so their remote threads get deleted.
+    """
+
+    def __init__(self, on_evict: Callable[[QASession], Awaitable[None]],
+                 max_sessions: int = 500, ttl_seconds: float = 3600):
+        self.on_evict = on_evict
+        self.max_sessions = max_sessions
+        self.ttl_seconds = ttl_seconds
+        self._sessions: "OrderedDict[str, QASession]" = OrderedDict()
+        self._cleanup_tasks: Set[asyncio.Task] = set()
+        # Sessions whose thread is still being created, by session ID.
+        self._pending: Dict[str, asyncio.Task] = {}
+
+    @classmethod
+    def from_env(cls, on_evict: Callable[[QASession], Awaitable[None]]) -> "SessionRegistry":
+        return cls(
+            on_evict=on_evict,
+            max_sessions=int(os.getenv("QA_MAX_SESSIONS", "500")),
+            ttl_seconds=float(os.getenv("QA_SESSION_TTL_SECONDS", "3600")),
+        )
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    def get(self, session_id: str) -> Optional[QASession]:
+        session = self._sessions.get(session_id)
+        if session is None:
+            return None
+        now = time.time()
+        if now - session.last_used > self.ttl_seconds:
+            self._evict(session_id)
+            return None
+        session.last_used = now
+        self._sessions.move_to_end(session_id)
+        return session
+
+    def add_pending(self, session_id: str, task: asyncio.Task) -> None:
+        """Track a still-running setup task that will ``put`` the session when done."""
+        self._pending[session_id] = task
+        task.add_done_callback(lambda _: self._pending.pop(session_id, None))
+
+    async def wait(self, session_id: str) -> Optional[QASession]:
+        """Like ``get``, but first waits for the session's setup if it is still pending."""
+        task = self._pending.get(session_id)
+        if task is not None:
+            await asyncio.wait({task})
+        return self.get(session_id)
+
+    def put(self, session: QASession) -> None:
+        previous = self._sessions.pop(session.session_id, None)
+        if previous is not None and previous.thread_id != session.thread_id:
+            self._schedule_cleanup(previous)
+        self._sessions[session.session_id] = session
+        while len(self._sessions) > self.max_sessions:
+            self._evict(next(iter(self._sessions)))
+
+    def remove(self, session_id: str) -> None:
+        if session_id in self._sessions:
+            self._evict(session_id)
+
+    def sweep(self) -> int:
+        cutoff = time.time() - self.ttl_seconds
+        expired = [sid for sid, s in self._sessions.items() if s.last_used < cutoff]
+        for session_id in expired:
+            self._evict(session_id)
+        return len(expired)
+
+    async def run_sweeper(self, interval: float = 60.0) -> None:
+        while True:
+            await asyncio.sleep(interval)
+            expired = self.sweep()
+            if expired:
+                logging.info("Expired %d chat sessions", expired)
+
+    def _evict(self, session_id: str) -> None:
+        self._schedule_cleanup(self._sessions.pop(session_id))
+
+    def _schedule_cleanup(self, session: QASession) -> None:
+        task = asyncio.create_task(self._cleanup(session))
+        self._cleanup_tasks.add(task)
+        task.add_done_callback(self._cleanup_tasks.discard)
+
+    async def _cleanup(self, session: QASession) -> None:
+        try:
+            await self.on_evict(session)
+        except Exception as e:
+            logging.warning("Failed to clean up session %s: %s", session.session_id, e)
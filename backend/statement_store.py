@@ -0,0 +1,81 @@
+import os
+import threading
+import uuid
+from collections import OrderedDict
+from typing import Optional
+
+from models import AnalysisResult, BankStatement, TransactionModel, ValidationDelta
+from reconcile import BalanceLedger
+from storage import StatementRepository
+
+
+class StatementStore:
+    """Statements under review, persisted in SQLite with an LRU of live ledgers.
+
+    Methods block on SQLite and Parquet I/O; async callers run them in a
+    worker thread. One lock serializes access to the ledgers.
+    """
+
+    def __init__(self, repository: StatementRepository, max_statements: int = 1000):
+        self.repository = repository
+        self.max_statements = max_statements
+        self._ledgers: "OrderedDict[str, BalanceLedger]" = OrderedDict()
+        self._lock = threading.RLock()
+
+    @classmethod
+    def from_env(cls) -> "StatementStore":
+        return cls(
+            repository=StatementRepository.from_env(),
+            max_statements=int(os.getenv("STATEMENT_STORE_MAX", "1000")),
+        )
+
+    def put(self, statement: BankStatement, content_hash: Optional[str] = None) -> str:
+        """Store ``statement`` as a new statement and return its ID.
+
+        Every upload gets its own statement, even of a PDF seen before, so
+        edits to one never show up in another; ``content_hash`` is only
+        recorded for lookups.
+        """
+        with self._lock:
+            statement_id = uuid.uuid4().hex
+            ledger = BalanceLedger(statement.model_copy(deep=True))
+            self.repository.save_statement(statement_id, ledger.statement, list(ledger.flags.values()), content_hash)
+            self._remember(statement_id, ledger)
+            return statement_id
+
+    def get(self, statement_id: str) -> Optional[BalanceLedger]:
+        with self._lock:
+            ledger = self._ledgers.get(statement_id)
+            if ledger is not None:
+                self._ledgers.move_to_end(statement_id)
+                return ledger
+            statement = self.repository.load_statement(statement_id)
+            if statement is None:
+                return None
+            ledger = BalanceLedger(statement)
+            self._remember(statement_id, ledger)
+            return ledger
+
+    def apply_edit(self, statement_id: str, op: str, index: int, transaction: Optional[TransactionModel]) -> Optional[ValidationDelta]:
+        with self._lock:
+            ledger = self.get(statement_id)
+            if ledger is None:
+                return None
+            delta = ledger.apply(op, index, transaction)
+            self.repository.save_transactions_from(
+                statement_id, ledger.statement.transactions, delta.from_index, list(ledger.flags.values())
+            )
+            return delta
+
+    def save_analysis(self, statement_id: str, result: AnalysisResult) -> None:
+        with self._lock:
+            self.repository.save_analysis(statement_id, result)
+            ledger = self.get(statement_id)
+            if ledger is not None:
+                self.repository.snapshot_parquet(statement_id, ledger.statement)
+
+    def _remember(self, statement_id: str, ledger: BalanceLedger) -> None:
+        self._ledgers[statement_id] = ledger
+        self._ledgers.move_to_end(statement_id)
+        while len(self._ledgers) > self.max_statements:
+            self._ledgers.popitem(last=False)
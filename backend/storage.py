@@ -0,0 +1,215 @@
+import logging
+import os
+import sqlite3
+import threading
+import time
+from typing import List, Optional
+
+import pandas as pd
+
+from models import AnalysisResult, BankStatement, FlaggedTransaction, StatementRecord, TransactionModel
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS statements (
+    id TEXT PRIMARY KEY,
+    content_hash TEXT,
+    filename TEXT NOT NULL,
+    account_number TEXT NOT NULL,
+    period_start TEXT NOT NULL,
+    period_end TEXT NOT NULL,
+    opening_balance REAL,
+    closing_balance REAL,
+    money_in REAL,
+    money_out REAL,
+    currency TEXT,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_statements_account ON statements(account_number);
+CREATE INDEX IF NOT EXISTS idx_statements_period ON statements(period_start, period_end);
+CREATE INDEX IF NOT EXISTS idx_statements_hash ON statements(content_hash);
+
+CREATE TABLE IF NOT EXISTS transactions (
+    statement_id TEXT NOT NULL REFERENCES statements(id) ON DELETE CASCADE,
+    position INTEGER NOT NULL,
+    date TEXT NOT NULL,
+    description TEXT NOT NULL,
+    credit REAL NOT NULL,
+    debit REAL NOT NULL,
+    balance REAL NOT NULL,
+    PRIMARY KEY (statement_id, position)
+);
+CREATE INDEX IF NOT EXISTS idx_transactions_date ON transactions(date);
+
+CREATE TABLE IF NOT EXISTS flags (
+    statement_id TEXT NOT NULL REFERENCES statements(id) ON DELETE CASCADE,
+    idx INTEGER NOT NULL,
+    issue TEXT NOT NULL,
+    previous_balance REAL,
+    current_balance REAL,
+    PRIMARY KEY (statement_id, idx)
+);
+
+CREATE TABLE IF NOT EXISTS analyses (
+    statement_id TEXT PRIMARY KEY REFERENCES statements(id) ON DELETE CASCADE,
+    result TEXT NOT NULL,
+    created_at REAL NOT NULL
+);
+"""
+
+STATEMENT_COLUMNS = [
+    "filename", "account_number", "period_start", "period_end", "opening_balance",
+    "closing_balance", "money_in", "money_out", "currency",
+]
+
+
+class StatementRepository:
+    """SQLite persistence for statements, transactions, flags and analyses.
+
+    Transactions can additionally be written as Parquet snapshots,
+    partitioned by account, for offline analytics.
+    """
+
+    def __init__(self, path: str, parquet_dir: Optional[str] = None):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.parquet_dir = parquet_dir
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA foreign_keys=ON")
+        self._db.executescript(SCHEMA)
+
+    @classmethod
+    def from_env(cls) -> "StatementRepository":
+        return cls(
+            path=os.getenv("STATEMENT_DB_PATH", os.path.join("data", "finsight.sqlite3")),
+            parquet_dir=os.getenv("PARQUET_DIR", os.path.join("data", "parquet")) or None,
+        )
+
+    # --- Writes ---
+
+    def save_statement(self, statement_id: str, statement: BankStatement, flags: List[FlaggedTransaction],
+                       content_hash: Optional[str] = None) -> None:
+        now = time.time()
+        with self._lock:
+            self._db.execute("BEGIN")
+            try:
+                self._db.execute(
+                    f"INSERT OR REPLACE INTO statements (id, content_hash, {', '.join(STATEMENT_COLUMNS)}, created_at, updated_at) "
+                    f"VALUES (?, ?, {', '.join('?' * len(STATEMENT_COLUMNS))}, ?, ?)",
+                    (statement_id, content_hash, *(getattr(statement, c) for c in STATEMENT_COLUMNS), now, now),
+                )
+                self._write_transactions(statement_id, statement.transactions, 0)
+                self._write_flags(statement_id, flags)
+                self._db.execute("COMMIT")
+            except Exception:
+                self._db.execute("ROLLBACK")
+                raise
+
+    def save_transactions_from(self, statement_id: str, transactions: List[TransactionModel], start: int,
+                               flags: List[FlaggedTransaction]) -> None:
+        """Rewrite rows from ``start`` onwards after an edit, plus the flags."""
+        with self._lock:
+            self._db.execute("BEGIN")
+            try:
+                self._write_transactions(statement_id, transactions, start)
+                self._write_flags(statement_id, flags)
+                self._db.execute("UPDATE statements SET updated_at = ? WHERE id = ?", (time.time(), statement_id))
+                self._db.execute("COMMIT")
+            except Exception:
+                self._db.execute("ROLLBACK")
+                raise
+
+    def save_analysis(self, statement_id: str, result: AnalysisResult) -> None:
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO analyses (statement_id, result, created_at) VALUES (?, ?, ?)",
+                (statement_id, result.model_dump_json(), time.time()),
+            )
+
+    def _write_transactions(self, statement_id: str, transactions: List[TransactionModel], start: int) -> None:
+        self._db.execute("DELETE FROM transactions WHERE statement_id = ? AND position >= ?", (statement_id, start))
+        self._db.executemany(
+            "INSERT INTO transactions (statement_id, position, date, description, credit, debit, balance) VALUES (?, ?, ?, ?, ?, ?, ?)",
+            ((statement_id, start + i, t.date, t.description, t.credit, t.debit, t.balance)
+             for i, t in enumerate(transactions[start:])),
+        )
+
+    def _write_flags(self, statement_id: str, flags: List[FlaggedTransaction]) -> None:
+        self._db.execute("DELETE FROM flags WHERE statement_id = ?", (statement_id,))
+        self._db.executemany(
+            "INSERT INTO flags (statement_id, idx, issue, previous_balance, current_balance) VALUES (?, ?, ?, ?, ?)",
+            ((statement_id, f.index, f.issue, f.previous_balance, f.current_balance) for f in flags),
+        )
+
+    # --- Reads ---
+
+    def load_statement(self, statement_id: str) -> Optional[BankStatement]:
+        with self._lock:
+            row = self._db.execute(
+                f"SELECT {', '.join(STATEMENT_COLUMNS)} FROM statements WHERE id = ?", (statement_id,)
+            ).fetchone()
+            if row is None:
+                return None
+            rows = self._db.execute(
+                "SELECT date, description, credit, debit, balance FROM transactions WHERE statement_id = ? ORDER BY position",
+                (statement_id,),
+            ).fetchall()
+        return BankStatement(
+            **dict(zip(STATEMENT_COLUMNS, row)),
+            transactions=[TransactionModel(date=d, description=desc, credit=c, debit=db, balance=b) for d, desc, c, db, b in rows],
+        )
+
+    def load_analysis(self, statement_id: str) -> Optional[AnalysisResult]:
+        with self._lock:
+            row = self._db.execute("SELECT result FROM analyses WHERE statement_id = ?", (statement_id,)).fetchone()
+        return AnalysisResult.model_validate_json(row[0]) if row else None
+
+    def find_statements(self, account_number: Optional[str] = None, period_from: Optional[str] = None,
+                        period_to: Optional[str] = None, limit: int = 100) -> List[StatementRecord]:
+        clauses, params = [], []
+        if account_number:
+            clauses.append("s.account_number = ?")
+            params.append(account_number)
+        if period_from:
+            clauses.append("s.period_end >= ?")
+            params.append(period_from)
+        if period_to:
+            clauses.append("s.period_start <= ?")
+            params.append(period_to)
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        with self._lock:
+            rows = self._db.execute(
+                f"SELECT s.id, s.filename, s.account_number, s.period_start, s.period_end, s.opening_balance, "
+                f"s.closing_balance, s.currency, s.updated_at, "
+                f"(SELECT COUNT(*) FROM transactions t WHERE t.statement_id = s.id), "
+                f"EXISTS (SELECT 1 FROM analyses a WHERE a.statement_id = s.id) "
+                f"FROM statements s {where} ORDER BY s.period_start DESC LIMIT ?",
+                (*params, limit),
+            ).fetchall()
+        return [StatementRecord(
+            statement_id=r[0], filename=r[1], account_number=r[2], period_start=r[3], period_end=r[4],
+            opening_balance=r[5], closing_balance=r[6], currency=r[7], updated_at=r[8],
+            transaction_count=r[9], analyzed=bool(r[10]),
+        ) for r in rows]
+
+    # --- Parquet snapshots ---
+
+    def snapshot_parquet(self, statement_id: str, statement: BankStatement) -> Optional[str]:
+        if not self.parquet_dir:
+            return None
+        df = pd.DataFrame([t.model_dump() for t in statement.transactions],
+                          columns=["date", "description", "credit", "debit", "balance"])
+        df.insert(0, "statement_id", statement_id)
+        df.insert(1, "account_number", statement.account_number)
+        df["date"] = pd.to_datetime(df["date"], errors="coerce", format="mixed")
+        account = "".join(ch if ch.isalnum() else "_" for ch in statement.account_number) or "unknown"
+        directory = os.path.join(self.parquet_dir, f"account={account}")
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, f"{statement_id}.parquet")
+        try:
+            df.to_parquet(path, index=False)
+        except ImportError as e:
+            logging.warning("Parquet snapshots need pyarrow: %s", e)
+            return None
+        return path
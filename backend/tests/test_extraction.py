@@ -0,0 +1,34 @@
+import logging
+
+from extraction import merge_chunks
+from models import StatementChunk, TransactionModel
+
+
+def _chunk(rows, opening=None, closing=None):
+    return StatementChunk(opening_balance=opening, closing_balance=closing, transactions=[
+        TransactionModel(date=d, description=s, credit=c, debit=db, balance=b) for d, s, c, db, b in rows
+    ])
+
+
+def test_overlap_with_rerendered_dates_is_dropped_by_balance():
+    first = _chunk([
+        ("2024-01-02", "TESCO", 0.0, 20.0, 980.0),
+        ("2024-01-05", "RENT", 0.0, 500.0, 480.0),
+    ], opening=1000.0)
+    # The second batch repeats RENT with the date read differently.
+    second = _chunk([
+        ("05/01/2024", "RENT PAYMENT", 0.0, 500.0, 480.0),
+        ("2024-01-09", "SALARY", 1500.0, 0.0, 1980.0),
+    ], opening=980.0, closing=1980.0)
+    merged = merge_chunks([first, second])
+    assert [t.description for t in merged.transactions] == ["TESCO", "RENT", "SALARY"]
+    assert merged.closing_balance == 1980.0
+
+
+def test_gap_between_batches_keeps_rows_and_is_logged(caplog):
+    first = _chunk([("2024-01-02", "TESCO", 0.0, 20.0, 980.0)], opening=1000.0, closing=980.0)
+    second = _chunk([("2024-01-09", "SALARY", 1500.0, 0.0, 1950.0)], opening=450.0)
+    with caplog.at_level(logging.WARNING):
+        merged = merge_chunks([first, second], filename="jan.pdf")
+    assert len(merged.transactions) == 2
+    assert "Balance gap at batch boundary 1 of jan.pdf" in caplog.text
@@ -0,0 +1,48 @@
+import pytest
+
+from models import TransactionModel
+from query_engine import TransactionIndex, answer_locally
+
+
+@pytest.fixture
+def index():
+    rows = [
+        ("2024-04-05", "SALARY ACME LTD", 2000.0, 0.0, 2500.0),
+        ("2024-04-12", "TESCO STORES", 0.0, 80.0, 2420.0),
+        ("2024-05-05", "SALARY ACME LTD", 2000.0, 0.0, 4420.0),
+        ("2024-05-14", "TESCO STORES", 0.0, 120.0, 4300.0),
+        ("2024-06-05", "SALARY ACME LTD", 2000.0, 0.0, 6300.0),
+        ("2024-06-20", "RENT", 0.0, 900.0, 5400.0),
+    ]
+    return TransactionIndex([TransactionModel(date=d, description=s, credit=c, debit=db, balance=b)
+                             for d, s, c, db, b in rows], currency="GBP")
+
+
+def test_totals_for_named_month(index):
+    assert answer_locally(index, "How much did I spend in May?") == "Money out in May 2024: GBP 120.00."
+    assert answer_locally(index, "Total income may 2024") == "Money in in May 2024: GBP 2,000.00."
+
+
+def test_may_as_a_verb_is_not_a_month(index):
+    answer = answer_locally(index, "What is the total spending, may I ask?")
+    assert answer == "Money out: GBP 1,100.00."
+
+
+def test_spent_on_category_or_payee(index):
+    assert answer_locally(index, "How much did I spend on groceries in May?") == (
+        "Spent on groceries in May 2024: GBP 120.00 across 1 transactions.")
+    assert answer_locally(index, "What did I pay to tesco?") == "Spent on tesco: GBP 200.00 across 2 transactions."
+
+
+@pytest.mark.parametrize("question", [
+    "May I see a breakdown of my finances?",
+    "How much of my income goes to rent?",
+    "What was the total number of transactions with a description I don't recognise?",
+    "How much could I save if I cut spending?",
+    "Can I afford to pay for a holiday in March?",
+    "What did I spend on average per week?",
+    "How much did I spend on eating out compared to last year?",
+    "What's the top expense category?",
+])
+def test_questions_left_to_the_assistant(index, question):
+    assert answer_locally(index, question) is None
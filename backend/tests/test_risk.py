@@ -0,0 +1,29 @@
+from analytics import transactions_frame
+from models import TransactionModel
+from risk import suspicious_patterns
+
+
+def _frame(rows):
+    return transactions_frame([TransactionModel(date=d, description=s, credit=c, debit=db, balance=b)
+                               for d, s, c, db, b in rows])
+
+
+def test_atm_withdrawals_in_round_amounts_are_flagged():
+    df = _frame([
+        ("2024-01-03", "ATM WITHDRAWAL HIGH ST", 0.0, 200.0, 1800.0),
+        ("2024-01-10", "ATM WITHDRAWAL HIGH ST", 0.0, 300.0, 1500.0),
+        ("2024-01-17", "CASH DEPOSIT BRANCH", 500.0, 0.0, 2000.0),
+    ])
+    flagged = {p.flagged_as: p for p in suspicious_patterns(df)}
+    assert flagged["round_cash_amounts"].occurrences == 3
+
+
+def test_salary_direct_deposits_and_transfers_are_not_cash():
+    df = _frame([
+        ("2024-01-28", "DIRECT DEPOSIT ACME PAYROLL", 3000.0, 0.0, 3000.0),
+        ("2024-02-01", "TRANSFER TO SAVINGS", 0.0, 500.0, 2500.0),
+        ("2024-02-28", "DIRECT DEPOSIT ACME PAYROLL", 3000.0, 0.0, 5500.0),
+        ("2024-03-01", "TRANSFER TO SAVINGS", 0.0, 500.0, 5000.0),
+        ("2024-03-28", "DIRECT DEPOSIT ACME PAYROLL", 3000.0, 0.0, 8000.0),
+    ])
+    assert "round_cash_amounts" not in {p.flagged_as for p in suspicious_patterns(df)}
@@ -0,0 +1,118 @@
+import asyncio
+import hashlib
+import os
+import tempfile
+
+import pytest
+
+os.environ.setdefault("OPENAI_API_KEY", "test")
+os.environ.setdefault("EXTRACTION_CACHE_PATH", "")
+os.environ.setdefault("CATEGORY_CACHE_PATH", "")
+os.environ.setdefault("PARQUET_DIR", "")
+os.environ.setdefault("STATEMENT_DB_PATH", os.path.join(tempfile.mkdtemp(), "statements.sqlite3"))
+os.environ.setdefault("UPLOAD_MAX_BYTES", str(1 << 20))
+
+import main  # noqa: E402
+
+BOUNDARY = "finsight-test-boundary"
+CHUNK = 64 << 10
+
+
+def _part_header(field, filename):
+    return (f"--{BOUNDARY}\r\nContent-Disposition: form-data; name=\"{field}\"; filename=\"{filename}\"\r\n"
+            f"Content-Type: application/pdf\r\n\r\n").encode()
+
+
+def _post(path, chunks):
+    """Send ``chunks`` to the app as a chunked body without Content-Length; return the status."""
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "POST",
+        "scheme": "http", "path": path, "raw_path": path.encode(), "query_string": b"", "root_path": "",
+        "headers": [(b"content-type", f"multipart/form-data; boundary={BOUNDARY}".encode()),
+                    (b"transfer-encoding", b"chunked")],
+        "client": ("test", 1), "server": ("test", 80),
+    }
+    chunks = iter(chunks)
+    messages = []
+
+    async def run():
+        finished = asyncio.Event()
+        body_done = False
+
+        async def receive():
+            nonlocal body_done
+            # Like uvicorn: after the last body chunk, or once the response
+            # is out, the only thing left to receive is the disconnect.
+            if body_done or finished.is_set():
+                await finished.wait()
+                return {"type": "http.disconnect"}
+            chunk = next(chunks, None)
+            if chunk is None:
+                body_done = True
+                return {"type": "http.request", "body": b"", "more_body": False}
+            return {"type": "http.request", "body": chunk, "more_body": True}
+
+        async def send(message):
+            messages.append(message)
+            if message["type"] == "http.response.body" and not message.get("more_body"):
+                finished.set()
+
+        await main.app(scope, receive, send)
+
+    asyncio.run(run())
+    return next(m["status"] for m in messages if m["type"] == "http.response.start")
+
+
+@pytest.fixture
+def upload_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(main, "UPLOAD_DIR", str(tmp_path))
+    return tmp_path
+
+
+@pytest.fixture
+def consumed(monkeypatch):
+    """Number of body chunks the upload handler pulled from the request stream."""
+    count = [0]
+    receive_files = main.receive_files
+
+    async def counting(stream, *args):
+        async def counted():
+            async for chunk in stream:
+                count[0] += 1
+                yield chunk
+        return await receive_files(counted(), *args)
+
+    monkeypatch.setattr(main, "receive_files", counting)
+    return count
+
+
+def test_chunked_oversized_upload_is_rejected_while_streaming(upload_dir, consumed):
+    total = 64  # 4 MB of body against a 1 MB file limit
+    body = [_part_header("file", "big.pdf") + b"%PDF-1.4\n"] + [b"0" * CHUNK] * total
+    assert _post("/upload-statement/", body) == 413
+    assert consumed[0] <= (1 << 20) // CHUNK + 1
+    assert os.listdir(upload_dir) == []
+
+
+def test_non_pdf_is_rejected_on_the_first_bytes(upload_dir, consumed):
+    body = [_part_header("files", "notes.pdf") + b"hello"] + [b"0" * CHUNK] * 32
+    assert _post("/upload-statements/batch", body) == 400
+    assert consumed[0] == 1
+    assert os.listdir(upload_dir) == []
+
+
+def test_pdf_is_stored_under_its_content_hash(upload_dir, monkeypatch):
+    seen = []
+
+    async def process_statement(path, filename, content_hash=None):
+        seen.append((path, filename, content_hash))
+        raise RuntimeError("stop after storing")
+
+    monkeypatch.setattr(main, "process_statement", process_statement)
+    pdf = b"%PDF-1.4\n" + b"x" * (3 * CHUNK)
+    body = [_part_header("file", "a.pdf") + pdf[:CHUNK], pdf[CHUNK:], f"\r\n--{BOUNDARY}--\r\n".encode()]
+    assert _post("/upload-statement/", body) == 500
+
+    digest = hashlib.sha256(pdf).hexdigest()
+    assert seen == [(os.path.join(str(upload_dir), f"{digest}.pdf"), "a.pdf", digest)]
+    assert os.listdir(upload_dir) == [f"{digest}.pdf"]
@@ -0,0 +1,242 @@
+import asyncio
+import contextlib
+import hashlib
+import os
+import tempfile
+from dataclasses import dataclass, field
+from typing import AsyncIterator, BinaryIO, List, Optional, Sequence
+
+from multipart.multipart import MultipartParser, parse_options_header
+
+CHUNK_SIZE = 1 << 20
+PDF_MAGIC = b"%PDF"
+
+
+class UploadTooLargeError(Exception):
+    pass
+
+
+class NotAPdfError(Exception):
+    pass
+
+
+class InvalidUploadError(Exception):
+    pass
+
+
+@dataclass
+class StoredUpload:
+    path: str
+    filename: str
+    content_hash: str
+    size: int
+
+
+class _Sink:
+    """One file on its way to disk: a temp file in ``upload_dir``, its sha256 and size.
+
+    ``check`` runs on the bytes as they arrive and raises as soon as the file
+    is over ``max_bytes`` or does not start with ``magic``; ``write`` does the
+    blocking hashing and disk I/O.
+    """
+
+    def __init__(self, upload_dir: str, filename: str, max_bytes: int, magic: Optional[bytes]):
+        self.filename = filename
+        self.upload_dir = upload_dir
+        self.max_bytes = max_bytes
+        self.magic = magic
+        self.size = 0
+        self.head = b""
+        self.digest = hashlib.sha256()
+        fd, self.temp_path = tempfile.mkstemp(dir=upload_dir, suffix=".part")
+        self.file = os.fdopen(fd, "wb")
+
+    def check(self, data: bytes) -> None:
+        self.size += len(data)
+        if self.size > self.max_bytes:
+            raise UploadTooLargeError(f"{self.filename} is larger than {self.max_bytes} bytes.")
+        if self.magic and len(self.head) < len(self.magic):
+            self.head += data[:len(self.magic) - len(self.head)]
+            if not self.magic.startswith(self.head):
+                raise NotAPdfError(f"Not a PDF file: {self.filename}")
+
+    def write(self, pieces: Sequence[bytes]) -> None:
+        for data in pieces:
+            self.digest.update(data)
+            self.file.write(data)
+
+    def finish(self, content_addressed: bool) -> StoredUpload:
+        """Close the file; content-addressed files are renamed to ``<sha256>.pdf``."""
+        self.file.close()
+        if self.size == 0:
+            raise NotAPdfError(f"Empty file: {self.filename}")
+        if self.magic and self.head != self.magic:
+            raise NotAPdfError(f"Not a PDF file: {self.filename}")
+        content_hash = self.digest.hexdigest()
+        path = self.temp_path
+        if content_addressed:
+            path = os.path.join(self.upload_dir, f"{content_hash}.pdf")
+            os.replace(self.temp_path, path)
+        return StoredUpload(path=path, filename=self.filename, content_hash=content_hash, size=self.size)
+
+    def discard(self) -> None:
+        self.file.close()
+        with contextlib.suppress(FileNotFoundError):
+            os.remove(self.temp_path)
+
+
+def store_stream(source: BinaryIO, filename: str, upload_dir: str, max_bytes: int,
+                 chunk_size: int = CHUNK_SIZE) -> StoredUpload:
+    """Copy a PDF from a blocking file object to ``upload_dir/<sha256>.pdf``.
+
+    Identical uploads share one file; a rejected or failed copy leaves
+    nothing behind.
+    """
+    sink = _Sink(upload_dir, filename, max_bytes, PDF_MAGIC)
+    try:
+        for chunk in iter(lambda: source.read(chunk_size), b""):
+            sink.check(chunk)
+            sink.write([chunk])
+        return sink.finish(content_addressed=True)
+    except BaseException:
+        sink.discard()
+        raise
+
+
+@dataclass
+class _Part:
+    headers: dict = field(default_factory=dict)
+    sink: Optional[_Sink] = None
+    stored: Optional[StoredUpload] = None
+    archive: bool = False
+    pending: List[bytes] = field(default_factory=list)
+    pending_bytes: int = 0
+    ended: bool = False
+
+
+class _MultipartReceiver:
+    """Feeds a request body through python-multipart, one sink per file part."""
+
+    def __init__(self, boundary: bytes, upload_dir: str, max_file_bytes: int, max_archive_bytes: int,
+                 archive_suffixes: Sequence[str]):
+        self.upload_dir = upload_dir
+        self.max_file_bytes = max_file_bytes
+        self.max_archive_bytes = max_archive_bytes
+        self.archive_suffixes = tuple(archive_suffixes)
+        self.parts: List[_Part] = []
+        self._header_field = b""
+        self._header_value = b""
+        self.parser = MultipartParser(boundary, {
+            "on_part_begin": self._on_part_begin,
+            "on_part_data": self._on_part_data,
+            "on_part_end": self._on_part_end,
+            "on_header_field": self._on_header_field,
+            "on_header_value": self._on_header_value,
+            "on_header_end": self._on_header_end,
+            "on_headers_finished": self._on_headers_finished,
+        })
+
+    @property
+    def current(self) -> _Part:
+        return self.parts[-1]
+
+    def _on_part_begin(self) -> None:
+        self.parts.append(_Part())
+
+    def _on_header_field(self, data: bytes, start: int, end: int) -> None:
+        self._header_field += data[start:end]
+
+    def _on_header_value(self, data: bytes, start: int, end: int) -> None:
+        self._header_value += data[start:end]
+
+    def _on_header_end(self) -> None:
+        self.current.headers[self._header_field.lower()] = self._header_value
+        self._header_field = self._header_value = b""
+
+    def _on_headers_finished(self) -> None:
+        _, options = parse_options_header(self.current.headers.get(b"content-disposition", b""))
+        if b"filename" not in options:
+            return  # a plain form field; its data is ignored
+        filename = os.path.basename(options[b"filename"].decode("utf-8", "replace"))
+        if filename.lower().endswith(self.archive_suffixes):
+            self.current.archive = True
+            self.current.sink = _Sink(self.upload_dir, filename, self.max_archive_bytes, None)
+        elif filename.lower().endswith(".pdf"):
+            self.current.sink = _Sink(self.upload_dir, filename, self.max_file_bytes, PDF_MAGIC)
+        else:
+            kinds = " or ".join(["PDF"] + [s.lstrip(".").upper() for s in self.archive_suffixes])
+            raise InvalidUploadError(f"Only {kinds} files are supported: {filename}")
+
+    def _on_part_data(self, data: bytes, start: int, end: int) -> None:
+        part = self.current
+        if part.sink is not None:
+            piece = data[start:end]
+            part.sink.check(piece)
+            part.pending.append(piece)
+            part.pending_bytes += len(piece)
+
+    def _on_part_end(self) -> None:
+        self.current.ended = True
+
+    async def flush(self, final: bool = False) -> None:
+        """Write buffered bytes in CHUNK_SIZE batches, and finish ended parts, on worker threads."""
+        for part in self.parts:
+            if part.sink is None or part.stored is not None:
+                continue
+            if part.pending and (part.ended or final or part.pending_bytes >= CHUNK_SIZE):
+                pieces, part.pending, part.pending_bytes = part.pending, [], 0
+                await asyncio.to_thread(part.sink.write, pieces)
+            if part.ended:
+                part.stored = await asyncio.to_thread(part.sink.finish, not part.archive)
+
+    def discard(self) -> None:
+        for part in self.parts:
+            if part.sink is not None and part.stored is None:
+                part.sink.discard()
+            elif part.archive and part.stored is not None:
+                with contextlib.suppress(FileNotFoundError):
+                    os.remove(part.stored.path)
+
+
+async def receive_files(stream: AsyncIterator[bytes], content_type: str, content_length: Optional[str],
+                        upload_dir: str, max_file_bytes: int, max_request_bytes: int,
+                        archive_suffixes: Sequence[str] = ()) -> List[StoredUpload]:
+    """Stream a multipart/form-data body straight to disk, file by file.
+
+    Nothing is buffered beyond CHUNK_SIZE per file: each PDF part is hashed
+    and written as it arrives and ends up at ``upload_dir/<sha256>.pdf``.
+    Reading stops with UploadTooLargeError once the body passes
+    ``max_request_bytes`` or a PDF passes ``max_file_bytes``, whether or not
+    a Content-Length was sent. Parts named with one of ``archive_suffixes``
+    are kept at a temp path (up to ``max_request_bytes``) that the caller
+    removes once it has unpacked them. On any error every partial file is
+    removed.
+    """
+    if content_length and content_length.isdigit() and int(content_length) > max_request_bytes:
+        raise UploadTooLargeError(f"Upload larger than {max_request_bytes} bytes.")
+    mime, params = parse_options_header(content_type or "")
+    if mime != b"multipart/form-data" or b"boundary" not in params:
+        raise InvalidUploadError("Expected a multipart/form-data upload.")
+
+    receiver = _MultipartReceiver(params[b"boundary"], upload_dir, max_file_bytes, max_request_bytes, archive_suffixes)
+    received = 0
+    try:
+        async for chunk in stream:
+            received += len(chunk)
+            if received > max_request_bytes:
+                raise UploadTooLargeError(f"Upload larger than {max_request_bytes} bytes.")
+            try:
+                receiver.parser.write(chunk)
+            except (UploadTooLargeError, NotAPdfError, InvalidUploadError):
+                raise
+            except Exception as e:
+                raise InvalidUploadError(f"Malformed multipart upload: {e}")
+            await receiver.flush()
+        receiver.parser.finalize()
+        if any(p.sink is not None and not p.ended for p in receiver.parts):
+            raise InvalidUploadError("Upload ended in the middle of a file.")
+        await receiver.flush(final=True)
+    except BaseException:
+        receiver.discard()
+        raise
+    return [p.stored for p in receiver.parts if p.stored is not None]
@@ -14,6 +14,7 @@ export default function App() {
   const [showDashboard, setShowDashboard] = useState(false)
   const [financialData, setFinancialData] = useState<any | null>(null)
   const [processingInsights, setProcessingInsights] = useState(false)
+  const [statementId, setStatementId] = useState<string | null>(null)
   const onDataUpdate = (newData: any[]) => {
     console.log("onDataUpdate", newData)
   }
@@ -40,16 +41,22 @@ export default function App() {
       if (data.summary && data.summary.transactions) {
 
         const flaggedIndexes = new Set((data.flagged || []).map((f: any) => f.index));
+        // Repairs are sorted by confidence per row, so the first one wins
+        const topRepair = (idx: number) => (data.repairs || []).find((r: any) => r.index === idx);
 
         const transactions = data.summary.transactions.map((item: any, idx: number) => ({
           ...item,
           id: idx,
           needsReview: flaggedIndexes.has(idx),
           issue: flaggedIndexes.has(idx)
-            ? (data.flagged.find((f: any) => f.index === idx)?.issue || '')
+            ? [
+              data.flagged.find((f: any) => f.index === idx)?.issue || '',
+              topRepair(idx) ? `Suggestion: ${topRepair(idx).description}` : '',
+            ].filter(Boolean).join(' ')
             : '',
         }));
         setProcessedData(transactions);
+        setStatementId(data.statement_id || null);
         setCurrency(data.summary.currency);
         setStatementInfo(data.summary);
       } else {
@@ -61,6 +68,46 @@ export default function App() {
       setIsProcessing(false);
     }
   }
+  // Re-check balances on the server from the edited row onwards and apply
+  // only the flags that changed
+  const revalidate = async (op: 'update' | 'insert', index: number, row: any) => {
+    if (!statementId) return
+    try {
+      const response = await fetch(`http://localhost:8000/statements/${statementId}/transactions`, {
+        method: 'PATCH',
+        headers: {
+          'Content-Type': 'application/json',
+        },
+        body: JSON.stringify({
+          op,
+          index,
+          transaction: {
+            date: row.date,
+            description: row.description,
+            credit: Number(row.credit) || 0,
+            debit: Number(row.debit) || 0,
+            balance: Number(row.balance) || 0,
+          },
+        }),
+      })
+      if (!response.ok) return
+      const delta = await response.json()
+      const cleared = new Set<number>(delta.cleared)
+      const issues = new Map<number, string>(delta.flagged.map((f: any) => [f.index, f.issue]))
+      setProcessedData((rows) =>
+        rows && rows.map((item) =>
+          issues.has(item.id)
+            ? { ...item, needsReview: true, issue: issues.get(item.id) }
+            : cleared.has(item.id)
+              ? { ...item, needsReview: false, issue: '' }
+              : item,
+        )
+      )
+    } catch (err) {
+      console.error('Re-validation failed:', err)
+    }
+  }
+
   const handleCellEdit = (id: number, field: string, value: any) => {
     if (!processedData) return
 
@@ -68,17 +115,15 @@ export default function App() {
 
     if (existing) {
       // Update existing row
+      const updated = {
+        ...existing,
+        [field]: value,
+        needsReview: false,
+      }
       setProcessedData(
-        processedData.map((item) =>
-          item.id === id
-            ? {
-              ...item,
-              [field]: value,
-              needsReview: false,
-            }
-            : item,
-        )
+        processedData.map((item) => (item.id === id ? updated : item))
       )
+      revalidate('update', id, updated)
     } else {
       // Create new row and insert it
       const newRow = {
@@ -94,29 +139,39 @@ export default function App() {
       }
 
       setProcessedData([...processedData, newRow])
+      revalidate('insert', processedData.length, newRow)
     }
   }
 
   const handleFinalize = async () => {
-    const transformedData = processedData?.map(item => ({
-      date: item.date,
-      description: item.description,
-      credit: item.credit,
-      debit: item.debit,
-      balance: item.balance
-    }));
     setProcessingInsights(true)
-    const res = {
-      summary: statementInfo,
-      finalizedTransactions: transformedData
+    // The server already holds the reviewed statement with every edit applied,
+    // so only its ID needs to be sent
+    let response: Response
+    if (statementId) {
+      response = await fetch(`http://localhost:8000/statements/${statementId}/finalize`, {
+        method: 'POST',
+      });
+    } else {
+      const transformedData = processedData?.map(item => ({
+        date: item.date,
+        description: item.description,
+        credit: item.credit,
+        debit: item.debit,
+        balance: item.balance
+      }));
+      const res = {
+        summary: statementInfo,
+        finalizedTransactions: transformedData
+      }
+      response = await fetch('http://localhost:8000/finalize-statement/', {
+        method: 'POST',
+        headers: {
+          'Content-Type': 'application/json',
+        },
+        body: JSON.stringify(res),
+      });
     }
-    const response = await fetch('http://localhost:8000/finalize-statement/', {
-      method: 'POST',
-      headers: {
-        'Content-Type': 'application/json',
-      },
-      body: JSON.stringify(res),
-    });
     const financialData = await response.json()
     setFinancialData(financialData)
     setProcessingInsights(false)
@@ -4,7 +4,10 @@ interface Message {
     type: 'user' | 'ai'
     content: string
 }
-export const ChatInterface = () => {
+interface ChatInterfaceProps {
+    sessionId?: string
+}
+export const ChatInterface = ({ sessionId }: ChatInterfaceProps) => {
     const [messages, setMessages] = useState<Message[]>([
         {
             type: 'ai',
@@ -27,27 +30,47 @@ export const ChatInterface = () => {
         setInput('')
         setIsLoading(true)
         try {
-            const response = await fetch('http://localhost:8000/ask-question-in-thread', {
+            const response = await fetch('http://localhost:8000/ask-question-in-thread/stream', {
                 method: 'POST',
                 headers: {
                     'Content-Type': 'application/json',
                 },
-                body: JSON.stringify({ question }),
+                body: JSON.stringify({ question, session_id: sessionId }),
             })
 
-            if (!response.ok) {
+            if (!response.ok || !response.body) {
                 throw new Error('Failed to fetch response')
             }
 
-            const data = await response.json()
+            // Render the answer token by token as server-sent events arrive
+            setMessages((prev) => [...prev, { type: 'ai', content: '' }])
+            setIsLoading(false)
+            const appendToAnswer = (text: string) => {
+                setMessages((prev) => {
+                    const last = prev[prev.length - 1]
+                    return [...prev.slice(0, -1), { ...last, content: last.content + text }]
+                })
+            }
 
-            setMessages((prev) => [
-                ...prev,
-                {
-                    type: 'ai',
-                    content: data.answer,
-                },
-            ])
+            const reader = response.body.getReader()
+            const decoder = new TextDecoder()
+            let buffer = ''
+            while (true) {
+                const { done, value } = await reader.read()
+                if (done) break
+                buffer += decoder.decode(value, { stream: true })
+                const events = buffer.split('\n\n')
+                buffer = events.pop() || ''
+                for (const rawEvent of events) {
+                    const event = rawEvent.match(/^event: (.*)$/m)?.[1]
+                    const data = JSON.parse(rawEvent.match(/^data: (.*)$/m)?.[1] || '{}')
+                    if (event === 'delta') {
+                        appendToAnswer(data.text)
+                    } else if (event === 'error') {
+                        throw new Error(data.detail)
+                    }
+                }
+            }
         } catch (error) {
             console.error('Error:', error)
             setMessages((prev) => [
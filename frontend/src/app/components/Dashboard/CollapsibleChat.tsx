@@ -2,7 +2,11 @@ import React, { useState } from 'react';
 import { ChatInterface } from './ChatInterface';
 import { MessageCircleIcon, XIcon, ChevronDownIcon } from 'lucide-react';
 
-export const CollapsibleChat: React.FC = () => {
+interface CollapsibleChatProps {
+  sessionId?: string;
+}
+
+export const CollapsibleChat: React.FC<CollapsibleChatProps> = ({ sessionId }) => {
   const [open, setOpen] = useState(false);
 
   return (
@@ -29,7 +33,7 @@ export const CollapsibleChat: React.FC = () => {
             </div>
           </div>
           <div className="flex-1 overflow-y-auto p-2" style={{ maxHeight: '500px' }}>
-            <ChatInterface />
+            <ChatInterface sessionId={sessionId} />
           </div>
         </div>
       ) : (
@@ -66,6 +66,7 @@ interface FinancialData {
       present: boolean;
     };
   };
+  session_id?: string;
 }
 
 interface DashboardProps {
@@ -105,7 +106,7 @@ const Dashboard = ({ financialData, currency }: DashboardProps) => {
         <div>
           <RiskFlags data={financialData.risk_flags} />
         </div>
-        <CollapsibleChat />
+        <CollapsibleChat sessionId={financialData.session_id} />
       </div>
     </div>;
 };